@@ -0,0 +1,224 @@
+# batch_classify.py
+import argparse
+import csv
+import json
+import logging
+import os
+import queue
+import sys
+import threading
+import time
+import numpy as np
+from config import MODEL_PATH, IMAGE_SIZE, PREDICT_BATCH_SIZE, LOAD_WORKERS
+from model_inference import ImagePredictor
+from preprocessing import load_image_array, feature_length
+
+logger = logging.getLogger(__name__)
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp')
+OUTPUT_FIELDS = ['caminho', 'classe', 'confianca', 'erro']
+_FIM = object() # Marca de fim de fila
+
+
+def iter_image_paths(source):
+    """Gera caminhos de imagens de um diretório (recursivo, em ordem estável) ou de stdin ('-')."""
+    if source == '-':
+        for line in sys.stdin:
+            path = line.strip()
+            if path:
+                yield path
+        return
+
+    for root, dirs, files in os.walk(source):
+        dirs.sort()
+        for file in sorted(files):
+            if file.lower().endswith(IMAGE_EXTENSIONS):
+                yield os.path.join(root, file)
+
+
+class ResultWriter:
+    """Grava resultados em JSONL ou CSV à medida que ficam prontos.
+
+    O próprio arquivo de saída serve de checkpoint: ao retomar, os caminhos já
+    gravados são lidos e pulados, e uma linha final incompleta é descartada.
+    """
+
+    def __init__(self, output_path, fmt, resume=False):
+        self.output_path = output_path
+        self.fmt = fmt
+        self.done = set()
+
+        if resume and os.path.exists(output_path):
+            self._load_checkpoint()
+            self.file = open(output_path, 'a', newline='', encoding='utf-8')
+        else:
+            self.file = open(output_path, 'w', newline='', encoding='utf-8')
+        # Um checkpoint vazio (execução interrompida antes do primeiro lote) também precisa do cabeçalho
+        if fmt == 'csv' and os.path.getsize(output_path) == 0:
+            csv.writer(self.file).writerow(OUTPUT_FIELDS)
+
+        self.csv_writer = csv.writer(self.file) if fmt == 'csv' else None
+
+    def _load_checkpoint(self):
+        with open(self.output_path, 'rb') as f:
+            data = f.read()
+        # Descarta a última linha se a execução anterior foi interrompida no meio dela
+        complete = data[:data.rfind(b'\n') + 1]
+        if len(complete) != len(data):
+            with open(self.output_path, 'r+b') as f:
+                f.truncate(len(complete))
+
+        lines = complete.decode('utf-8').splitlines()
+        if self.fmt == 'csv':
+            rows = csv.reader(lines[1:])
+            self.done.update(row[0] for row in rows if row)
+        else:
+            self.done.update(json.loads(line)['caminho'] for line in lines if line.strip())
+        logger.info(f"Retomando: {len(self.done)} imagens já classificadas em {self.output_path}.")
+
+    def write(self, results):
+        for r in results:
+            if self.csv_writer is not None:
+                self.csv_writer.writerow([r[k] if r[k] is not None else '' for k in OUTPUT_FIELDS])
+            else:
+                self.file.write(json.dumps(r, ensure_ascii=False) + '\n')
+        # Cada lote gravado é um checkpoint
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+class BatchClassifier:
+    """Pipeline produtor/consumidor: threads decodificam imagens em filas limitadas
+    e a thread principal as agrupa em lotes para ImagePredictor.predict_arrays."""
+
+    def __init__(self, predictor, batch_size=PREDICT_BATCH_SIZE, workers=LOAD_WORKERS, queue_size=None):
+        self.predictor = predictor
+        self.batch_size = max(1, batch_size)
+        self.workers = max(1, workers)
+        queue_size = queue_size or self.batch_size * 4
+        self.paths = queue.Queue(maxsize=queue_size)
+        self.decoded = queue.Queue(maxsize=queue_size)
+        self._producer_error = None
+
+    def _produce(self, paths, skip):
+        try:
+            for path in paths:
+                if path not in skip:
+                    self.paths.put(path)
+        except Exception as e:
+            # Guardada para ser relançada na thread principal depois que os workers terminarem
+            self._producer_error = e
+        finally:
+            for _ in range(self.workers):
+                self.paths.put(_FIM)
+
+    def _decode(self):
+        while True:
+            path = self.paths.get()
+            if path is _FIM:
+                self.decoded.put(_FIM)
+                return
+            try:
+                self.decoded.put((path, load_image_array(path, IMAGE_SIZE), None))
+            except Exception as e:
+                logger.error(f"Erro ao pré-processar a imagem {path}: {e}")
+                self.decoded.put((path, None, "Erro: Falha ao processar imagem"))
+
+    def _classify(self, items, buffer):
+        results = []
+        valid = []
+        for path, array, erro in items:
+            if erro is None:
+                buffer[len(valid)] = array
+                valid.append(path)
+            else:
+                results.append({'caminho': path, 'classe': None, 'confianca': 0.0, 'erro': erro})
+
+        if valid:
+            try:
+                for path, (classe, confianca) in zip(valid, self.predictor.predict_arrays(buffer[:len(valid)])):
+                    results.append({'caminho': path, 'classe': classe, 'confianca': confianca, 'erro': None})
+            except Exception as e:
+                logger.error(f"Erro durante a previsão de um lote: {e}", exc_info=True)
+                results.extend({'caminho': p, 'classe': None, 'confianca': 0.0, 'erro': "Erro na previsão"}
+                               for p in valid)
+        return results
+
+    def run(self, paths, writer, progress_interval=1.0):
+        """Classifica todos os `paths` e grava via `writer`. Retorna o número de imagens processadas."""
+        threads = [threading.Thread(target=self._produce, args=(paths, writer.done), daemon=True)]
+        threads += [threading.Thread(target=self._decode, daemon=True) for _ in range(self.workers)]
+        for t in threads:
+            t.start()
+
+        buffer = np.empty((self.batch_size, feature_length(IMAGE_SIZE)), dtype=np.uint8)
+        finished_workers = 0
+        total = 0
+        start = last_report = time.perf_counter()
+        pending = []
+
+        while finished_workers < self.workers:
+            try:
+                item = self.decoded.get(timeout=0.1)
+            except queue.Empty:
+                item = None
+            if item is _FIM:
+                finished_workers += 1
+            elif item is not None:
+                pending.append(item)
+
+            # Envia o lote quando está cheio ou quando a fila esvaziou (não segura resultados prontos)
+            if len(pending) >= self.batch_size or (pending and (item is None or finished_workers == self.workers)):
+                writer.write(self._classify(pending, buffer))
+                total += len(pending)
+                pending = []
+
+            now = time.perf_counter()
+            if now - last_report >= progress_interval:
+                sys.stderr.write(f"\r{total} imagens | {total / (now - start):.1f} imagens/s")
+                sys.stderr.flush()
+                last_report = now
+
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - start
+        sys.stderr.write(f"\r{total} imagens | {total / elapsed if elapsed else 0.0:.1f} imagens/s\n")
+        if self._producer_error is not None:
+            logger.error(f"Falha ao listar as imagens de entrada após {total} imagens: {self._producer_error}")
+            raise self._producer_error
+        logger.info(f"Classificação em lote concluída: {total} imagens em {elapsed:.1f}s.")
+        return total
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Classifica imagens em lote e grava os resultados em JSONL ou CSV.")
+    parser.add_argument('entrada', help="Diretório com imagens (busca recursiva) ou '-' para ler caminhos de stdin")
+    parser.add_argument('-o', '--saida', required=True, help="Arquivo de saída (.jsonl ou .csv)")
+    parser.add_argument('--formato', choices=['jsonl', 'csv'], help="Padrão: deduzido da extensão da saída")
+    parser.add_argument('--modelo', default=MODEL_PATH)
+    parser.add_argument('--batch-size', type=int, default=PREDICT_BATCH_SIZE)
+    parser.add_argument('--workers', type=int, default=LOAD_WORKERS, help="Threads de decodificação")
+    parser.add_argument('--retomar', action='store_true', help="Pula as imagens já presentes no arquivo de saída")
+    args = parser.parse_args(argv)
+
+    fmt = args.formato or ('csv' if args.saida.lower().endswith('.csv') else 'jsonl')
+    predictor = ImagePredictor(args.modelo)
+    if predictor.model is None:
+        logger.error("Modelo não carregado. Abortando classificação em lote.")
+        return 1
+
+    writer = ResultWriter(args.saida, fmt, resume=args.retomar)
+    try:
+        BatchClassifier(predictor, batch_size=args.batch_size, workers=args.workers).run(
+            iter_image_paths(args.entrada), writer)
+    finally:
+        writer.close()
+    return 0
+
+
+if __name__ == "__main__":
+    from logging_config import setup_logging
+    setup_logging()
+    sys.exit(main())
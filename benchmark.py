@@ -0,0 +1,470 @@
+# benchmark.py
+import argparse
+import glob
+import io
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import time
+import joblib
+import numpy as np
+from config import BASE_DIR, DATASET_DIR, MODEL_PATH, CLASS_LABELS, PREDICT_BATCH_SIZE, RANDOM_STATE, LOAD_WORKERS
+from config import BENCHMARK_SYNTHETIC_DIR, BENCHMARK_SYNTHETIC_IMAGE_SIZE, BENCHMARK_RESULTS_PATH, BENCHMARK_BASELINE_DIR
+from config import BENCHMARK_REGRESSION_THRESHOLD, BENCHMARK_MAX_TRAIN_SAMPLES, BENCHMARK_LATENCY_SAMPLES
+from config import BENCHMARK_BATCH_SAMPLES
+
+logger = logging.getLogger(__name__)
+
+
+def dataset_image_paths(dataset_dir=DATASET_DIR):
+    """Lista as imagens do dataset, classe por classe."""
+    paths = []
+    for class_name in CLASS_LABELS:
+        paths.extend(sorted(glob.glob(os.path.join(dataset_dir, class_name, '*'))))
+    return paths
+
+
+def benchmark_predict_batch(predictor, image_paths, batch_size=PREDICT_BATCH_SIZE, repeat=3):
+    """Compara a vazão (imagens/s) de predict_batch com um loop sobre predict_image."""
+    def melhor_tempo(func):
+        tempos = []
+        for _ in range(repeat):
+            inicio = time.perf_counter()
+            func()
+            tempos.append(time.perf_counter() - inicio)
+        return min(tempos)
+
+    tempo_loop = melhor_tempo(lambda: [predictor.predict_image(p) for p in image_paths])
+    tempo_lote = melhor_tempo(lambda: predictor.predict_batch(image_paths, batch_size=batch_size))
+
+    n = len(image_paths)
+    resultado = {
+        'imagens': n,
+        'batch_size': batch_size,
+        'loop_imagens_por_s': n / tempo_loop,
+        'lote_imagens_por_s': n / tempo_lote,
+        'aceleracao': tempo_loop / tempo_lote,
+    }
+    logger.info(f"predict_image (loop): {resultado['loop_imagens_por_s']:.1f} imagens/s | "
+                f"predict_batch: {resultado['lote_imagens_por_s']:.1f} imagens/s | "
+                f"aceleração: {resultado['aceleracao']:.2f}x")
+    return resultado
+
+
+def benchmark_feature_pipelines(trainer, X, y, kinds=None, n_latency=50):
+    """Treina um modelo por conjunto de features e compara acurácia, latência e tamanho do modelo.
+
+    A latência é a mediana de predict_proba em uma única imagem (o caso da GUI).
+    """
+    from features import FEATURE_PIPELINES
+
+    X_train, X_test, y_train, y_test = trainer.split_train_test(X, y)
+    original_kind = trainer.feature_pipeline
+    resultados = []
+    try:
+        for kind in kinds or FEATURE_PIPELINES:
+            trainer.feature_pipeline = kind
+            inicio = time.perf_counter()
+            model = trainer.train_model(X_train, y_train)
+            tempo_treino = time.perf_counter() - inicio
+            if model is None:
+                continue
+
+            latencias = []
+            for i in range(min(n_latency, len(X_test))):
+                inicio = time.perf_counter()
+                model.predict_proba(X_test[i:i + 1])
+                latencias.append(time.perf_counter() - inicio)
+
+            buffer = io.BytesIO()
+            joblib.dump(model, buffer)
+            resultados.append({
+                'features': kind,
+                'acuracia': float(model.score(X_test, y_test)),
+                'treino_s': tempo_treino,
+                'latencia_ms': float(np.median(latencias)) * 1000,
+                'tamanho_mb': buffer.tell() / 2**20,
+            })
+    finally:
+        trainer.feature_pipeline = original_kind
+
+    logger.info("features     acurácia  treino(s)  latência(ms)  modelo(MB)")
+    for r in resultados:
+        logger.info(f"{r['features']:<12} {r['acuracia']:>8.3f}  {r['treino_s']:>9.2f}  "
+                    f"{r['latencia_ms']:>12.2f}  {r['tamanho_mb']:>10.2f}")
+    return resultados
+
+
+def benchmark_numpy_kernel(model, X, batch_sizes=(1, 32, 1024), repeat=20):
+    """Compara latência e resultados de predict_proba: scikit-learn vs. RBFKernelSVM (float64 e float32).
+
+    `X` é repetido quando tem menos linhas que o maior lote. A diferença máxima de
+    probabilidade em relação ao scikit-learn serve de teste de equivalência.
+    """
+    from model_inference import RBFKernelSVM
+
+    avaliadores = {
+        'sklearn': model,
+        'numpy_float64': RBFKernelSVM.from_sklearn(model, dtype=np.float64),
+        'numpy_float32': RBFKernelSVM.from_sklearn(model, dtype=np.float32),
+    }
+    X = np.resize(X, (max(max(batch_sizes), len(X)), X.shape[1]))
+    referencia = model.predict_proba(X)
+
+    resultados = []
+    for nome, avaliador in avaliadores.items():
+        diferenca = float(np.abs(avaliador.predict_proba(X) - referencia).max())
+        for batch_size in batch_sizes:
+            lote = X[:batch_size]
+            tempos = []
+            for _ in range(repeat):
+                inicio = time.perf_counter()
+                avaliador.predict_proba(lote)
+                tempos.append(time.perf_counter() - inicio)
+            resultados.append({'avaliador': nome, 'batch_size': batch_size, 'diferenca_max': diferenca,
+                               'latencia_ms': float(np.median(tempos)) * 1000})
+
+    logger.info("avaliador       lote   latência(ms)  dif. máx. vs sklearn")
+    for r in resultados:
+        logger.info(f"{r['avaliador']:<14} {r['batch_size']:>5}  {r['latencia_ms']:>12.3f}  {r['diferenca_max']:>20.2e}")
+    return resultados
+
+
+def _time_subprocess(code):
+    """Executa `code` em um interpretador novo (sem módulos em cache) e retorna o tempo que ele imprime."""
+    output = subprocess.run([sys.executable, '-c', code], cwd=BASE_DIR, capture_output=True,
+                            text=True, check=True).stdout
+    return float(output.strip().splitlines()[-1])
+
+
+def benchmark_startup(image_path, model_path=MODEL_PATH, repeat=5):
+    """Mede, em processos novos, o tempo de importação da GUI e o tempo até a primeira previsão."""
+    import_code = "import time; t = time.perf_counter(); import gui; print(time.perf_counter() - t)"
+    first_prediction_code = (
+        "import time; t = time.perf_counter()\n"
+        "from model_inference import ImagePredictor\n"
+        f"p = ImagePredictor({model_path!r})\n"
+        f"p.predict_image({image_path!r})\n"
+        "print(time.perf_counter() - t)"
+    )
+    resultado = {
+        'importacao_gui_s': float(np.median([_time_subprocess(import_code) for _ in range(repeat)])),
+        'primeira_previsao_s': float(np.median([_time_subprocess(first_prediction_code) for _ in range(repeat)])),
+    }
+    logger.info(f"Importação da GUI: {resultado['importacao_gui_s'] * 1000:.0f} ms | "
+                f"Tempo até a primeira previsão: {resultado['primeira_previsao_s'] * 1000:.0f} ms")
+    return resultado
+
+
+def benchmark_logging(n_messages=20000):
+    """Custo por previsão de uma linha INFO no modo síncrono, assíncrono e assíncrono com amostragem.
+
+    Mede o tempo gasto na thread que loga (o que fica no caminho da previsão) e o tempo
+    total até todas as linhas estarem gravadas. O console é trocado por os.devnull.
+    """
+    import tempfile
+    from logging_config import create_handlers, PREDICTION_LOG
+
+    modos = [('síncrono', False, 1.0), ('assíncrono', True, 1.0), ('assíncrono 10%', True, 0.1)]
+    resultados = []
+    with tempfile.TemporaryDirectory() as tmp, open(os.devnull, 'w') as devnull:
+        for nome, async_mode, sample_rate in modos:
+            bench_logger = logging.getLogger(f"benchmark.logging.{len(resultados)}")
+            bench_logger.propagate = False
+            bench_logger.setLevel(logging.INFO)
+            handlers, listener = create_handlers(os.path.join(tmp, f"{len(resultados)}.log"), async_mode,
+                                                 sample_rate, stream=devnull)
+            for handler in handlers:
+                bench_logger.addHandler(handler)
+            if listener is not None:
+                listener.start()
+
+            inicio = time.perf_counter()
+            for i in range(n_messages):
+                bench_logger.info(f"Previsão: Gato com {i % 100 / 100:.2%} de certeza.", extra=PREDICTION_LOG)
+            tempo_chamadas = time.perf_counter() - inicio
+            if listener is not None:
+                listener.stop()
+            tempo_total = time.perf_counter() - inicio
+
+            for handler in handlers + (list(listener.handlers) if listener is not None else []):
+                handler.close()
+            resultados.append({'modo': nome, 'us_por_previsao': tempo_chamadas / n_messages * 1e6,
+                               'us_ate_gravar': tempo_total / n_messages * 1e6})
+
+    logger.info("modo              µs/previsão (thread que loga)   µs/linha até gravar")
+    for r in resultados:
+        logger.info(f"{r['modo']:<16} {r['us_por_previsao']:>30.2f}   {r['us_ate_gravar']:>19.2f}")
+    return resultados
+
+
+# --- Suíte completa com acompanhamento de regressões ---
+
+def _synthetic_image(source, rng, size):
+    """Variação de uma imagem real: recorte aleatório, espelhamento e brilho."""
+    from PIL import ImageEnhance, ImageOps
+    width, height = source.size
+    scale = rng.uniform(0.6, 1.0)
+    crop_w, crop_h = max(1, int(width * scale)), max(1, int(height * scale))
+    left = int(rng.integers(0, width - crop_w + 1))
+    top = int(rng.integers(0, height - crop_h + 1))
+    img = source.crop((left, top, left + crop_w, top + crop_h)).resize(size)
+    if rng.random() < 0.5:
+        img = ImageOps.mirror(img)
+    return ImageEnhance.Brightness(img).enhance(rng.uniform(0.7, 1.3))
+
+
+def generate_synthetic_dataset(n_images, output_dir=None, source_dir=DATASET_DIR, seed=RANDOM_STATE,
+                               size=BENCHMARK_SYNTHETIC_IMAGE_SIZE):
+    """Gera (ou reaproveita) um dataset com `n_images` JPEGs derivados das imagens de `source_dir`.
+
+    Cada imagem sintética herda a classe da imagem de origem e é determinística
+    (semente + índice), então execuções diferentes medem exatamente os mesmos dados.
+    Arquivos já existentes são mantidos. Retorna o diretório do dataset.
+    """
+    from PIL import Image
+    from concurrent.futures import ThreadPoolExecutor
+
+    output_dir = output_dir or os.path.join(BENCHMARK_SYNTHETIC_DIR, str(n_images))
+    sources = [(label, path) for label in CLASS_LABELS
+               for path in sorted(glob.glob(os.path.join(source_dir, label, '*')))]
+    if not sources:
+        raise FileNotFoundError(f"Nenhuma imagem de origem em {source_dir}")
+    for label in CLASS_LABELS:
+        os.makedirs(os.path.join(output_dir, label), exist_ok=True)
+
+    source_cache = {}
+
+    def gerar(i):
+        label, source_path = sources[i % len(sources)]
+        path = os.path.join(output_dir, label, f"sintetica_{i:06d}.jpg")
+        if os.path.exists(path):
+            return
+        source = source_cache.get(source_path)
+        if source is None:
+            with Image.open(source_path) as img:
+                img.draft('RGB', (size[0] * 2, size[1] * 2))
+                source = source_cache[source_path] = img.convert('RGB')
+        rng = np.random.default_rng([seed, i])
+        _synthetic_image(source, rng, size).save(path, quality=85)
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, LOAD_WORKERS)) as executor:
+        list(executor.map(gerar, range(n_images)))
+    logger.info(f"Dataset sintético com {n_images} imagens pronto em {output_dir} ({time.perf_counter() - inicio:.1f}s).")
+    return output_dir
+
+
+def _best_time(func, repeat):
+    """Menor tempo de `repeat` execuções (reduz o ruído em medições curtas)."""
+    tempos = []
+    for _ in range(repeat):
+        inicio = time.perf_counter()
+        func()
+        tempos.append(time.perf_counter() - inicio)
+    return min(tempos)
+
+
+def _percentiles_ms(tempos):
+    p50, p95, p99 = np.percentile(np.asarray(tempos) * 1000, [50, 95, 99])
+    return float(p50), float(p95), float(p99)
+
+
+def run_benchmark_suite(dataset_dir=DATASET_DIR, max_train=BENCHMARK_MAX_TRAIN_SAMPLES,
+                        n_latency=BENCHMARK_LATENCY_SAMPLES, n_batch=BENCHMARK_BATCH_SAMPLES,
+                        batch_size=PREDICT_BATCH_SIZE, repeat=3):
+    """Mede carregamento, treinamento e inferência sobre `dataset_dir`.
+
+    Métricas terminadas em '_por_s' são melhores quanto maiores; as demais (tempos)
+    quanto menores. Leitura do cache e predict_batch usam o melhor de `repeat` execuções. Retorna o dicionário {'metadados': ..., 'metricas': ...}.
+    """
+    import tempfile
+    import sklearn
+    from dataset_index import DatasetIndex
+    from feature_cache import FeatureCache
+    from model_inference import ImagePredictor
+    from model_training import ImageClassifierTrainer
+
+    metricas = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        trainer = ImageClassifierTrainer()
+        trainer.dataset_dir = dataset_dir
+        if trainer.dataset_index is not None:
+            # Índice próprio (não sobrescreve o do dataset real) e sem deduplicação: as imagens
+            # sintéticas são variações das mesmas fontes e seriam agrupadas como quase-duplicatas
+            trainer.dataset_index = DatasetIndex(os.path.join(tmp, 'dataset_index'))
+            trainer.deduplicate = False
+        paths, _ = trainer.list_dataset_files()
+
+        # Carregamento a frio (decodificação de todas as imagens) e com o cache de features já populado
+        trainer.feature_cache = None
+        inicio = time.perf_counter()
+        X, y = trainer.load_and_preprocess_data()
+        if X is None:
+            raise RuntimeError(f"Não foi possível carregar o dataset {dataset_dir}")
+        metricas['carregamento_imagens_por_s'] = len(X) / (time.perf_counter() - inicio)
+
+        trainer.feature_cache = FeatureCache(os.path.join(tmp, 'features'), trainer.image_size)
+        trainer.load_and_preprocess_data()
+        metricas['carregamento_cache_imagens_por_s'] = len(X) / _best_time(trainer.load_and_preprocess_data, repeat)
+
+        # Amostra aleatória (determinística) para o treino: o SVC cresce de forma superlinear
+        n_train = min(max_train, len(X))
+        train_idx = np.sort(np.random.default_rng(RANDOM_STATE).permutation(len(X))[:n_train])
+        inicio = time.perf_counter()
+        model = trainer.train_model(np.asarray(X[train_idx]), y[train_idx])
+        metricas['treino_s'] = time.perf_counter() - inicio
+        if model is None:
+            raise RuntimeError("Falha no treinamento durante o benchmark")
+
+        model_path = os.path.join(tmp, 'modelo.joblib')
+        joblib.dump(model, model_path)
+        predictor = ImagePredictor(model_path)
+        predictor.result_cache = None # Mede a previsão, não o cache de resultados
+
+        rng = np.random.default_rng(RANDOM_STATE + 1)
+        latency_paths = [paths[i] for i in rng.choice(len(paths), size=min(n_latency, len(paths)), replace=False)]
+        predictor.predict_image(latency_paths[0]) # Aquecimento
+        tempos = []
+        for path in latency_paths:
+            inicio = time.perf_counter()
+            predictor.predict_image(path)
+            tempos.append(time.perf_counter() - inicio)
+        (metricas['predict_image_p50_ms'], metricas['predict_image_p95_ms'],
+         metricas['predict_image_p99_ms']) = _percentiles_ms(tempos)
+
+        batch_paths = paths[:n_batch]
+        metricas['predict_batch_imagens_por_s'] = len(batch_paths) / _best_time(
+            lambda: predictor.predict_batch(batch_paths, batch_size=batch_size), repeat)
+
+    metadados = {
+        'dataset': os.path.relpath(dataset_dir, BASE_DIR),
+        'imagens': len(X),
+        'imagens_treino': n_train,
+        'batch_size': batch_size,
+        'motor': trainer.engine,
+        'features': trainer.feature_pipeline,
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'sklearn': sklearn.__version__,
+        'cpus': os.cpu_count(),
+        'data': time.strftime('%Y-%m-%dT%H:%M:%S'),
+    }
+    return {'metadados': metadados, 'metricas': metricas}
+
+
+def compare_with_baseline(resultados, baseline, threshold=BENCHMARK_REGRESSION_THRESHOLD):
+    """Lista as métricas que pioraram mais que `threshold` (fração) em relação ao baseline."""
+    for key in ('imagens', 'imagens_treino', 'motor', 'features'):
+        if resultados['metadados'].get(key) != baseline['metadados'].get(key):
+            logger.warning(f"Baseline medido com {key}={baseline['metadados'].get(key)!r}, "
+                           f"execução atual com {resultados['metadados'].get(key)!r}: a comparação pode não ser justa.")
+
+    regressoes = []
+    logger.info("métrica                              baseline        atual   variação")
+    for nome, atual in resultados['metricas'].items():
+        base = baseline['metricas'].get(nome)
+        if not base:
+            continue
+        maior_melhor = nome.endswith('_por_s')
+        variacao = atual / base - 1
+        piorou = variacao < -threshold if maior_melhor else variacao > threshold
+        logger.info(f"{nome:<34} {base:>10.3f} {atual:>12.3f} {variacao:>+9.1%}{'  REGRESSÃO' if piorou else ''}")
+        if piorou:
+            regressoes.append({'metrica': nome, 'baseline': base, 'atual': atual, 'variacao': variacao})
+    return regressoes
+
+
+def _parse_scale(value):
+    """'dataset', '10k', '100k' ou um número de imagens."""
+    if value == 'dataset':
+        return None
+    value = value.lower()
+    return int(float(value[:-1]) * 1000) if value.endswith('k') else int(value)
+
+
+def main_suite(args):
+    n_images = _parse_scale(args.escala)
+    dataset_dir = DATASET_DIR if n_images is None else generate_synthetic_dataset(n_images)
+    resultados = run_benchmark_suite(dataset_dir, batch_size=args.batch_size, repeat=args.repeat)
+    baseline_path = args.baseline or os.path.join(BENCHMARK_BASELINE_DIR, f"baseline_{args.escala}.json")
+
+    for nome, valor in resultados['metricas'].items():
+        logger.info(f"{nome}: {valor:.3f}")
+    os.makedirs(os.path.dirname(args.saida), exist_ok=True)
+    with open(args.saida, 'w', encoding='utf-8') as f:
+        json.dump(resultados, f, indent=2, ensure_ascii=False)
+    logger.info(f"Resultados salvos em: {args.saida}")
+
+    if args.salvar_baseline:
+        os.makedirs(os.path.dirname(baseline_path), exist_ok=True)
+        with open(baseline_path, 'w', encoding='utf-8') as f:
+            json.dump(resultados, f, indent=2, ensure_ascii=False)
+        logger.info(f"Baseline atualizado: {baseline_path}")
+        return 0
+    if not os.path.exists(baseline_path):
+        logger.warning(f"Baseline não encontrado em {baseline_path}. Use --salvar-baseline para criá-lo.")
+        return 0
+
+    with open(baseline_path, encoding='utf-8') as f:
+        baseline = json.load(f)
+    regressoes = compare_with_baseline(resultados, baseline, args.limite)
+    if regressoes:
+        logger.error(f"{len(regressoes)} métrica(s) piorou(aram) mais de {args.limite:.0%} em relação ao baseline.")
+        return 1
+    logger.info("Nenhuma regressão em relação ao baseline.")
+    return 0
+
+
+if __name__ == "__main__":
+    from logging_config import setup_logging
+    from model_inference import ImagePredictor
+    setup_logging()
+
+    parser = argparse.ArgumentParser(description="Benchmarks do classificador de imagens.")
+    parser.add_argument('benchmark', nargs='?', default='predict', choices=['predict', 'features', 'startup', 'kernel', 'logging', 'suite'],
+                        help="'predict': predict_batch vs. predict_image; 'features': acurácia x latência por FEATURE_PIPELINE; "
+                             "'startup': tempo de importação e até a primeira previsão; "
+                             "'kernel': kernel RBF em NumPy vs. scikit-learn nos lotes 1, 32 e 1024; "
+                             "'logging': custo por previsão do log síncrono vs. assíncrono; "
+                             "'suite': carregamento, treino e inferência comparados com o baseline")
+    parser.add_argument('--batch-size', type=int, default=PREDICT_BATCH_SIZE)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--escala', default='dataset',
+                        help="suite: 'dataset' (imagens de dataset/), '10k', '100k' ou N imagens sintéticas")
+    parser.add_argument('--saida', default=BENCHMARK_RESULTS_PATH, help="suite: arquivo JSON com os resultados")
+    parser.add_argument('--baseline', help="suite: resultados de referência (padrão: benchmarks/baseline_<escala>.json)")
+    parser.add_argument('--salvar-baseline', action='store_true', help="suite: grava os resultados como novo baseline")
+    parser.add_argument('--limite', type=float, default=BENCHMARK_REGRESSION_THRESHOLD,
+                        help="suite: piora relativa tolerada antes de falhar (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    if args.benchmark == 'suite':
+        sys.exit(main_suite(args))
+    elif args.benchmark == 'features':
+        from model_training import ImageClassifierTrainer
+        trainer = ImageClassifierTrainer()
+        X, y = trainer.load_and_preprocess_data()
+        if X is None:
+            raise SystemExit("Não foi possível carregar o dataset.")
+        benchmark_feature_pipelines(trainer, X, y)
+    elif args.benchmark == 'kernel':
+        predictor = ImagePredictor(MODEL_PATH, numpy_kernel_dtype=None)
+        if predictor.model is None:
+            raise SystemExit("Modelo não carregado. Execute model_training.py primeiro.")
+        arrays = (predictor.preprocess_image(p) for p in dataset_image_paths()[:256])
+        X = np.vstack([a for a in arrays if a is not None])
+        benchmark_numpy_kernel(predictor.model, X, repeat=args.repeat * 10)
+    elif args.benchmark == 'logging':
+        benchmark_logging()
+    elif args.benchmark == 'startup':
+        benchmark_startup(dataset_image_paths()[0], repeat=args.repeat)
+    else:
+        predictor = ImagePredictor(MODEL_PATH)
+        if predictor.model is None:
+            raise SystemExit("Modelo não carregado. Execute model_training.py primeiro.")
+        predictor.result_cache = None # As repetições do loop seriam respondidas pelo cache
+        benchmark_predict_batch(predictor, dataset_image_paths(), batch_size=args.batch_size, repeat=args.repeat)
@@ -8,9 +8,22 @@ BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 DATASET_DIR = os.path.join(BASE_DIR, 'dataset')
 MODEL_FILENAME = 'modelo_sklearn_gato_cachorro.joblib'
 MODEL_PATH = os.path.join(BASE_DIR, 'assets', MODEL_FILENAME)
+# Mesmo modelo em formato de arrays brutos, compartilhável por memory-map (ver model_inference.py)
+SHARED_MODEL_PATH = os.path.join(BASE_DIR, 'assets', 'modelo_sklearn_gato_cachorro.svm')
 GUI_ICON_PATH = os.path.join(BASE_DIR, 'assets', 'gato.ico')
 LOG_DIR = os.path.join(BASE_DIR, 'logs')
 LOG_FILE_NAME = 'app.log'
+LOG_ASYNC = True # Grava os logs em uma thread separada (QueueHandler/QueueListener), fora do caminho da previsão
+LOG_MAX_BYTES = 10 * 1024 * 1024 # Rotação do arquivo de log por tamanho
+LOG_BACKUP_COUNT = 5
+LOG_PREDICTION_SAMPLE_RATE = 1.0 # Fração das linhas INFO por previsão que são gravadas (ex.: 0.1 = 1 a cada 10)
+
+# --- Métricas de desempenho (metrics.py) ---
+METRICS_ENABLED = True
+METRICS_FILE_NAME = 'metrics.jsonl' # Uma linha JSON por janela, com histogramas de duração por span
+METRICS_FLUSH_INTERVAL_S = 60
+METRICS_PROFILER = None # None, 'cprofile' (grava logs/profile_<span>.prof) ou 'tracemalloc' (pico de memória do processo no span)
+METRICS_PROFILE_SPANS = [] # Spans perfilados; vazio = todos (um por vez, só o mais externo de cada thread)
 
 # --- Configurações do Modelo e Dados ---
 IMAGE_SIZE = (64, 64)
@@ -20,10 +33,114 @@ CLASS_LABELS = ['gato', 'cachorro'] # Para nomes de pastas do dataset e treiname
 # --- Configurações de Treinamento ---
 TEST_SIZE = 0.2
 RANDOM_STATE = 42
+LOAD_WORKERS = os.cpu_count() or 1 # Threads usadas para decodificar/redimensionar as imagens do dataset
+FEATURE_CACHE_ENABLED = True # Reaproveita imagens já pré-processadas entre execuções do treinamento
+FEATURE_CACHE_DIR = os.path.join(BASE_DIR, 'cache', 'features')
+# Imagens novas são anexadas ao fim da matriz do cache e as removidas só ficam marcadas como mortas;
+# a matriz é reescrita (compactada) quando a fração de linhas mortas passa deste limite
+FEATURE_CACHE_COMPACT_FRACTION = 0.25
+# Índice do dataset (dataset_index.py): descarta imagens corrompidas e agrupa quase-duplicatas pelo
+# dHash; imagens do mesmo grupo nunca ficam em lados diferentes da divisão treino/teste
+DATASET_INDEX_ENABLED = True
+DATASET_INDEX_DIR = os.path.join(BASE_DIR, 'cache', 'dataset_index')
+DATASET_DUPLICATE_DISTANCE = 4 # Bits de diferença (de 64) no dHash para considerar quase-duplicata
+DATASET_DEDUPLICATE = True # Mantém só uma imagem por grupo de quase-duplicatas (e rótulo)
+
+# Features entregues ao classificador (a etapa fica salva dentro do Pipeline do modelo):
+#   'raw'       - 64x64x3 pixels originais (12.288 valores)
+#   'gray'      - luminância em tons de cinza (4.096 valores)
+#   'pca'       - padronização + PCA com PCA_COMPONENTS componentes
+#   'gray_pca'  - tons de cinza + padronização + PCA
+FEATURE_PIPELINE = 'raw'
+PCA_COMPONENTS = 100
+FEATURE_FIT_SAMPLES = 2000 # Amostra usada para ajustar PCA/Nystroem nos motores incrementais
+
+# Motor de treinamento:
+#   'svc'       - SVC com kernel RBF (padrão; custo cresce de forma quadrática/cúbica com o nº de imagens)
+#   'sgd'       - Regressão logística linear treinada com SGDClassifier.partial_fit em mini-lotes
+#   'nystroem'  - Aproximação do kernel RBF (Nystroem) + regressão logística via SGD em mini-lotes
+TRAINING_ENGINE = 'svc'
+SGD_EPOCHS = 5
+SGD_BATCH_SIZE = 1024
+SGD_ALPHA = 1e-4
+NYSTROEM_COMPONENTS = 500
+CALIBRATION_SIZE = 0.1 # Fração do treino reservada para calibrar as probabilidades (sigmoid/Platt) nos motores incrementais
+CALIBRATION_MAX_SAMPLES = 10000
+# Busca de hiperparâmetros (python model_training.py --tune): validação cruzada sobre C, gamma
+# e o conjunto de features, usando todos os núcleos. Com TUNING_SUCCESSIVE_HALVING as
+# configurações ruins são descartadas cedo, treinadas só com uma parte das imagens.
+TUNING_C = [0.1, 1, 10, 100]
+TUNING_GAMMA = ['scale', 1e-3, 1e-2]
+TUNING_FEATURE_PIPELINES = ['raw', 'gray', 'pca', 'gray_pca']
+TUNING_CV_FOLDS = 3
+TUNING_N_JOBS = -1 # -1 usa todos os núcleos
+TUNING_SUCCESSIVE_HALVING = True
+TUNING_HALVING_FACTOR = 3
+TUNING_SVC_CACHE_MB = 500 # Cache de kernel do libsvm por ajuste
+TUNING_CACHE_DIR = os.path.join(BASE_DIR, 'cache', 'tuning') # Matriz de features e etapas de features já ajustadas
+TUNING_LEADERBOARD_SIZE = 10
+
+# Treinamento out-of-core: as imagens são lidas do disco em mini-lotes a cada época, sem
+# carregar o dataset inteiro na memória. Requer um motor incremental ('sgd' ou 'nystroem').
+STREAMING_TRAINING = False
+# Pico de memória por época no modo streaming medido com tracemalloc (exato, mas deixa cada alocação
+# bem mais lenta). Desligado, o log mostra o pico de RSS do processo (resource.getrusage), sem custo.
+STREAMING_TRACE_MEMORY = False
+
+# --- Configurações de Inferência ---
+PREDICT_BATCH_SIZE = 256 # Imagens por chamada de predict_proba em predict_batch
+# Arrays grandes do modelo (ex.: vetores de suporte) são mapeados do arquivo em vez de copiados.
+# 'c' (copy-on-write) e não 'r': o libsvm exige buffers graváveis, embora não escreva neles.
+# Use None para carregar tudo na memória.
+MODEL_MMAP_MODE = 'c'
+# Avalia SVCs RBF com o kernel em NumPy (RBFKernelSVM) em vez do libsvm: 'float64' (resultados
+# idênticos ao scikit-learn), 'float32' (mais rápido, diferença desprezível) ou None (desligado).
+# Modelos .svm sempre usam o kernel NumPy; com None, na precisão em que foram gravados
+NUMPY_KERNEL_DTYPE = None
+# Cache de resultados de predict_image (e do servidor), pela hash do conteúdo da imagem + impressão
+# digital do modelo: trocar o arquivo do modelo invalida as entradas automaticamente
+PREDICTION_CACHE_ENABLED = True
+PREDICTION_CACHE_SIZE = 4096 # Entradas no LRU em memória
+PREDICTION_CACHE_TTL_S = 24 * 3600 # Validade de cada entrada (memória e disco); None = sem expiração
+PREDICTION_CACHE_DB_PATH = None # Ex.: os.path.join(BASE_DIR, 'cache', 'previsoes.sqlite3') para um nível em disco
+
+# --- Exportação compacta do modelo (python model_export.py) ---
+# Compressão do joblib em save_model: 0 (padrão) carrega mais rápido e permite MODEL_MMAP_MODE;
+# valores como 3 ou ('lz4', 3) reduzem o arquivo, mas o modelo passa a ser lido inteiro na memória.
+MODEL_JOBLIB_COMPRESS = 0
+# Armazenamento dos vetores de suporte no .svm: 'float64', 'float32' ou 'uint8'. float64 e float32
+# são usados direto do memory-map, compartilhados entre processos; uint8 reduz o arquivo, mas cada
+# processo materializa uma cópia decodificada dos vetores de suporte em float64 (ou NUMPY_KERNEL_DTYPE)
+MODEL_EXPORT_DTYPE = 'float32'
+MODEL_EXPORT_MAX_DISAGREEMENT = 0.01 # Fração máxima de previsões alteradas pela poda de vetores de suporte
+MODEL_EXPORT_PRUNE_SAMPLES = 2000 # Imagens do treino usadas para medir o efeito da poda
+MODEL_EXPORT_DIR = os.path.join(BASE_DIR, 'cache', 'export') # Variantes geradas pelo relatório
+
+# --- Benchmarks (python benchmark.py suite) ---
+BENCHMARK_SYNTHETIC_DIR = os.path.join(BASE_DIR, 'cache', 'benchmark_dataset') # Datasets sintéticos gerados (10k, 100k...)
+BENCHMARK_SYNTHETIC_IMAGE_SIZE = (160, 160)
+BENCHMARK_RESULTS_PATH = os.path.join(LOG_DIR, 'benchmark_resultados.json')
+BENCHMARK_BASELINE_DIR = os.path.join(BASE_DIR, 'benchmarks') # Um baseline por escala: baseline_<escala>.json
+BENCHMARK_REGRESSION_THRESHOLD = 0.2 # Piora relativa tolerada por métrica
+BENCHMARK_MAX_TRAIN_SAMPLES = 2000 # Limite de imagens no treino do benchmark (o SVC cresce de forma superlinear)
+BENCHMARK_LATENCY_SAMPLES = 200 # Imagens usadas nos percentis de latência de predict_image
+BENCHMARK_BATCH_SAMPLES = 2000 # Imagens usadas na vazão de predict_batch
+
+# --- Configurações do Servidor de Inferência ---
+SERVER_HOST = '127.0.0.1'
+SERVER_PORT = 8000
+SERVER_MAX_BATCH_SIZE = 32 # Máximo de requisições agrupadas em uma chamada ao modelo
+SERVER_MAX_WAIT_MS = 5 # Espera máxima para completar um lote
+SERVER_MAX_BODY_BYTES = 20 * 1024 * 1024
 
 # --- Configurações da GUI ---
 WINDOW_TITLE = "Gatinho ou Cachorrinho? - Classificador de Imagem"
 WINDOW_GEOMETRY = "500x750"
+GUI_THUMBNAIL_SIZE = (300, 300)
+GALLERY_THUMBNAIL_SIZE = (128, 128)
+GALLERY_THUMBNAIL_CACHE_SIZE = 500 # Miniaturas mantidas em memória (LRU)
+GALLERY_BATCH_SIZE = 32 # Imagens por lote de classificação na galeria
+GALLERY_WORKERS = 4 # Threads que geram miniaturas
 
 # Cores e temas (CustomTkinter)
 # https://customtkinter.tomsons.icu/documentation/utility/set_default_color_theme
@@ -0,0 +1,254 @@
+# dataset_index.py
+import json
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from PIL import Image
+from config import DATASET_INDEX_DIR, DATASET_DUPLICATE_DISTANCE, LOAD_WORKERS
+
+logger = logging.getLogger(__name__)
+
+INDEX_FILENAME = 'index.json'
+HASH_SIZE = 8 # dHash de 8x8 = 64 bits
+INDEX_VERSION = 1
+
+
+def dhash(path, hash_size=HASH_SIZE):
+    """Hash perceptual por diferença (dHash) de 64 bits, como inteiro.
+
+    Também valida o arquivo: verify() confere a estrutura e a decodificação completa
+    (em escala reduzida para JPEGs) falha em arquivos truncados, então qualquer exceção
+    aqui indica uma imagem que o carregador não conseguiria usar.
+    """
+    with Image.open(path) as img:
+        img.verify()
+    with Image.open(path) as img:
+        if img.format == 'JPEG':
+            img.draft('L', (hash_size * 8, hash_size * 8))
+        small = np.asarray(img.convert('L').resize((hash_size + 1, hash_size), Image.LANCZOS), dtype=np.int16)
+    # Um bit por par de pixels vizinhos na horizontal: 1 se o da esquerda for mais claro
+    bits = small[:, :-1] > small[:, 1:]
+    return int.from_bytes(np.packbits(bits).tobytes(), 'big')
+
+
+def hamming(a, b):
+    return bin(a ^ b).count('1')
+
+
+class BKTree:
+    """Árvore BK para buscar hashes a até `radius` bits de distância de Hamming.
+
+    Pela desigualdade triangular, só os filhos com aresta em [d - radius, d + radius]
+    podem conter resultados, o que evita comparar com todos os hashes.
+    """
+
+    def __init__(self):
+        self.root = None # [hash, item, {distância: nó filho}]
+
+    def add(self, value, item):
+        node = [value, item, {}]
+        if self.root is None:
+            self.root = node
+            return
+        current = self.root
+        while True:
+            distance = hamming(value, current[0])
+            child = current[2].get(distance)
+            if child is None:
+                current[2][distance] = node
+                return
+            current = child
+
+    def search(self, value, radius):
+        """Retorna os itens cujo hash está a no máximo `radius` bits de `value`."""
+        if self.root is None:
+            return []
+        found = []
+        pending = [self.root]
+        while pending:
+            node_value, item, children = pending.pop()
+            distance = hamming(value, node_value)
+            if distance <= radius:
+                found.append(item)
+            for edge, child in children.items():
+                if distance - radius <= edge <= distance + radius:
+                    pending.append(child)
+        return found
+
+
+class DatasetIndex:
+    """Índice persistente de hashes perceptuais do dataset.
+
+    Para cada caminho o índice guarda (tamanho, mtime, dHash ou erro); só arquivos
+    novos ou alterados são lidos de novo, em paralelo. `clean` descarta arquivos
+    corrompidos, agrupa quase-duplicatas (até `max_distance` bits de diferença) e
+    devolve o grupo de cada imagem, para que a divisão treino/teste mantenha cada
+    grupo inteiro de um só lado.
+    """
+
+    def __init__(self, index_dir=DATASET_INDEX_DIR, max_distance=DATASET_DUPLICATE_DISTANCE, workers=LOAD_WORKERS):
+        self.index_dir = index_dir
+        self.index_path = os.path.join(index_dir, INDEX_FILENAME)
+        self.max_distance = max_distance
+        self.workers = max(1, workers)
+
+    def _read_index(self):
+        if not os.path.exists(self.index_path):
+            return {}
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                index = json.load(f)
+            if index.get('metadata') != {'version': INDEX_VERSION, 'hash_size': HASH_SIZE}:
+                return {}
+            return index.get('entries', {})
+        except Exception as e:
+            logger.warning(f"Índice do dataset ilegível em {self.index_path}, será recriado: {e}")
+            return {}
+
+    def _write_index(self, entries):
+        os.makedirs(self.index_dir, exist_ok=True)
+        tmp_path = self.index_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'metadata': {'version': INDEX_VERSION, 'hash_size': HASH_SIZE}, 'entries': entries}, f)
+        os.replace(tmp_path, self.index_path)
+
+    @staticmethod
+    def _describe(path, st):
+        entry = {'size': st.st_size, 'mtime': st.st_mtime_ns, 'dhash': None, 'erro': None}
+        try:
+            entry['dhash'] = format(dhash(path), '016x')
+        except Exception as e:
+            entry['erro'] = f"{type(e).__name__}: {e}"
+        return entry
+
+    def update(self, paths):
+        """Atualiza o índice para `paths` e retorna {caminho: entrada}."""
+        entries = self._read_index()
+        current = {}
+        pending = []
+        for path in paths:
+            try:
+                st = os.stat(path)
+            except OSError as e:
+                current[path] = {'size': None, 'mtime': None, 'dhash': None, 'erro': str(e)}
+                continue
+            entry = entries.get(path)
+            if entry is not None and entry['size'] == st.st_size and entry['mtime'] == st.st_mtime_ns:
+                current[path] = entry
+            else:
+                pending.append((path, st))
+
+        if pending:
+            # O PIL libera o GIL ao decodificar, então threads bastam
+            with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                for (path, _), entry in zip(pending, executor.map(lambda p: self._describe(*p), pending)):
+                    current[path] = entry
+        if pending or set(entries) != set(current):
+            self._write_index(current)
+        logger.info(f"Índice do dataset: {len(paths) - len(pending)} em cache, {len(pending)} imagens indexadas.")
+        return current
+
+    def find_groups(self, hashes):
+        """Agrupa os índices de `hashes` cuja distância de Hamming é <= max_distance (fecho transitivo).
+
+        Retorna uma lista com o id do grupo (o menor índice do grupo) de cada posição.
+        """
+        parent = list(range(len(hashes)))
+
+        def find(i):
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+
+        # Hashes idênticos são unidos direto; a árvore BK só recebe um representante de cada
+        first_with_hash = {}
+        tree = BKTree()
+        for i, value in enumerate(hashes):
+            if value in first_with_hash:
+                parent[find(i)] = find(first_with_hash[value])
+                continue
+            for j in tree.search(value, self.max_distance):
+                a, b = find(i), find(j)
+                if a != b:
+                    parent[max(a, b)] = min(a, b)
+            first_with_hash[value] = i
+            tree.add(value, i)
+        return [find(i) for i in range(len(hashes))]
+
+    def clean(self, paths, labels, deduplicate=True):
+        """Remove arquivos corrompidos e, com `deduplicate`, quase-duplicatas.
+
+        Retorna (paths, labels, groups), onde groups[i] é o caminho representante do
+        grupo de quase-duplicatas de paths[i]. Com `deduplicate` fica uma imagem por
+        grupo e rótulo; grupos com rótulos diferentes são mantidos e registrados no log.
+        """
+        order = sorted(range(len(paths)), key=lambda i: paths[i]) # Resultado independente de os.listdir
+        entries = self.update([paths[i] for i in order])
+
+        valid = []
+        corrupt = []
+        for i in order:
+            entry = entries[paths[i]]
+            (corrupt if entry['dhash'] is None else valid).append(i)
+        for i in corrupt[:10]:
+            logger.warning(f"Imagem corrompida ou ilegível ignorada: {paths[i]} ({entries[paths[i]]['erro']})")
+        if corrupt:
+            logger.warning(f"{len(corrupt)} imagens corrompidas ou ilegíveis ignoradas.")
+
+        group_ids = self.find_groups([int(entries[paths[i]]['dhash'], 16) for i in valid])
+        groups = {}
+        for i, group_id in zip(valid, group_ids):
+            groups.setdefault(group_id, []).append(i)
+
+        kept = []
+        n_conflicts = 0
+        group_of = {}
+        for members in groups.values():
+            representative = paths[members[0]]
+            member_labels = {labels[i] for i in members}
+            if len(member_labels) > 1:
+                n_conflicts += 1
+                logger.warning(f"Quase-duplicatas com rótulos diferentes: {', '.join(paths[i] for i in members[:5])}")
+            seen_labels = set()
+            for i in members:
+                if deduplicate and labels[i] in seen_labels:
+                    continue
+                seen_labels.add(labels[i])
+                kept.append(i)
+                group_of[i] = representative
+
+        kept.sort()
+        n_duplicates = sum(len(m) - 1 for m in groups.values())
+        logger.info(f"Dataset: {len(valid)} imagens válidas, {len(groups)} grupos distintos, "
+                    f"{n_duplicates} quase-duplicatas ({len(valid) - len(kept)} removidas), "
+                    f"{n_conflicts} grupos com rótulos conflitantes.")
+        return [paths[i] for i in kept], [labels[i] for i in kept], [group_of[i] for i in kept]
+
+
+if __name__ == "__main__":
+    import argparse
+    from logging_config import setup_logging
+    from model_training import ImageClassifierTrainer
+    setup_logging()
+
+    parser = argparse.ArgumentParser(description="Indexa o dataset e lista imagens corrompidas e quase-duplicatas.")
+    parser.add_argument('--distancia', type=int, default=DATASET_DUPLICATE_DISTANCE,
+                        help="Bits de diferença no dHash para considerar quase-duplicata")
+    args = parser.parse_args()
+
+    trainer = ImageClassifierTrainer()
+    trainer.dataset_index = None # Lista todos os arquivos, sem filtrar
+    paths, labels = trainer.list_dataset_files()
+    if paths is None:
+        raise SystemExit("Dataset não encontrado.")
+
+    index = DatasetIndex(max_distance=args.distancia)
+    clean_paths, _, groups = index.clean(paths, labels, deduplicate=False)
+    members = {}
+    for path, group in zip(clean_paths, groups):
+        members.setdefault(group, []).append(path)
+    for group, group_paths in sorted(members.items()):
+        if len(group_paths) > 1:
+            logger.info(f"Grupo de {len(group_paths)} quase-duplicatas: {', '.join(group_paths)}")
@@ -0,0 +1,204 @@
+# feature_cache.py
+import hashlib
+import json
+import os
+import logging
+import numpy as np
+from config import FEATURE_CACHE_COMPACT_FRACTION
+from preprocessing import PREPROCESSING_VERSION, feature_length
+
+logger = logging.getLogger(__name__)
+
+INDEX_FILENAME = 'index.json'
+MATRIX_FILENAME = 'features.u8' # Linhas uint8 brutas, sem cabeçalho: o índice guarda quantas existem
+CACHE_FORMAT_VERSION = 2
+
+
+def file_content_hash(path, chunk_size=1 << 20):
+    """Calcula o hash SHA-1 do conteúdo de um arquivo."""
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class FeatureCache:
+    """Cache em disco das imagens pré-processadas do dataset.
+
+    As features ficam em uma matriz uint8 aberta por memory-map e um índice JSON
+    guarda, para cada caminho, (tamanho, mtime, hash, linha). Em cada carregamento
+    só as imagens novas ou alteradas são decodificadas e anexadas ao fim da matriz;
+    as linhas de imagens removidas ou alteradas só deixam de ser referenciadas
+    (linhas mortas). A matriz é reescrita na ordem de `paths` apenas quando a fração
+    de linhas mortas passa de `compact_fraction`. O cache inteiro é descartado quando
+    IMAGE_SIZE ou PREPROCESSING_VERSION mudam.
+    """
+
+    def __init__(self, cache_dir, image_size, compact_fraction=FEATURE_CACHE_COMPACT_FRACTION):
+        self.cache_dir = cache_dir
+        self.image_size = tuple(image_size)
+        self.compact_fraction = compact_fraction
+        self.n_features = feature_length(self.image_size)
+        self.index_path = os.path.join(cache_dir, INDEX_FILENAME)
+        self.matrix_path = os.path.join(cache_dir, MATRIX_FILENAME)
+
+    def _metadata(self):
+        return {
+            'format_version': CACHE_FORMAT_VERSION,
+            'image_size': list(self.image_size),
+            'preprocessing_version': PREPROCESSING_VERSION,
+            'n_features': self.n_features,
+        }
+
+    def _open_matrix(self, n_rows):
+        """Memory-map somente leitura das primeiras `n_rows` linhas da matriz."""
+        if n_rows == 0:
+            return np.empty((0, self.n_features), dtype=np.uint8) # mmap não aceita arquivo vazio
+        return np.memmap(self.matrix_path, mode='r', dtype=np.uint8, shape=(n_rows, self.n_features))
+
+    def _read_index(self):
+        """Lê o índice e a matriz atuais; retorna ({}, None) se o cache não existir ou estiver inválido."""
+        if not (os.path.exists(self.index_path) and os.path.exists(self.matrix_path)):
+            return {}, None
+
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                index = json.load(f)
+            if index.get('metadata') != self._metadata():
+                logger.info("Cache de features invalidado: tamanho da imagem ou receita de pré-processamento mudou.")
+                return {}, None
+            return index['entries'], self._open_matrix(index['rows'])
+        except Exception as e:
+            logger.warning(f"Cache de features ilegível em {self.cache_dir}, será recriado: {e}")
+            return {}, None
+
+    def _write_index(self, entries, n_rows):
+        tmp_path = self.index_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'metadata': self._metadata(), 'rows': n_rows, 'entries': entries}, f)
+        os.replace(tmp_path, self.index_path)
+
+    def _append(self, n_rows, new_rows):
+        """Grava `new_rows` a partir da linha `n_rows`, descartando bytes além do índice.
+
+        Uma execução interrompida depois de anexar e antes de gravar o índice deixa
+        linhas não referenciadas no fim do arquivo; elas são sobrescritas aqui.
+        """
+        mode = 'r+b' if os.path.exists(self.matrix_path) else 'w+b'
+        with open(self.matrix_path, mode) as f:
+            f.truncate(n_rows * self.n_features)
+            f.seek(n_rows * self.n_features)
+            f.write(np.ascontiguousarray(new_rows, dtype=np.uint8).tobytes())
+
+    def _compact(self, source_rows, cached, new_matrix):
+        """Reescreve a matriz só com as linhas vivas, na ordem de `source_rows`.
+
+        source_rows[k] é (True, linha em `cached`) ou (False, linha em `new_matrix`).
+        """
+        tmp_path = self.matrix_path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            for from_cache, row in source_rows:
+                f.write((cached[row] if from_cache else new_matrix[row]).tobytes())
+        return tmp_path
+
+    def load(self, paths, labels, loader):
+        """Retorna (X, y, ok) para `paths`, decodificando via `loader` apenas o que não está em cache.
+
+        `loader(paths)` deve retornar (matriz, máscara_de_sucesso), como
+        ImageClassifierTrainer.load_image_matrix. X tem uma linha por imagem carregada,
+        na mesma ordem de `paths`; ok[i] indica se paths[i] foi carregada (e tem linha em X).
+        Quando as linhas vivas da matriz em disco já estão nessa ordem (sem linhas mortas),
+        X é o próprio memory-map somente leitura, sem cópia; senão é montada em memória a
+        partir dele.
+        """
+        entries, cached = self._read_index()
+        n_rows = len(cached) if cached is not None else 0
+
+        rows = np.full(len(paths), -1, dtype=np.int64)
+        stats = [None] * len(paths)
+        hashes = [None] * len(paths)
+        misses = []
+        refreshed = 0 # Acertos pelo hash com mtime novo: o índice precisa do mtime atualizado
+
+        for i, path in enumerate(paths):
+            try:
+                st = os.stat(path)
+            except OSError as e:
+                logger.error(f"Erro ao processar imagem {path}: {e}")
+                continue
+            stats[i] = (st.st_size, st.st_mtime_ns)
+
+            entry = entries.get(path)
+            if entry is not None and cached is not None:
+                if entry['size'] == st.st_size and entry['mtime'] == st.st_mtime_ns:
+                    rows[i] = entry['row']
+                    hashes[i] = entry['hash']
+                    continue
+                if entry['size'] == st.st_size:
+                    # mtime mudou (ex.: cópia do arquivo); confere o conteúdo antes de decodificar
+                    hashes[i] = file_content_hash(path)
+                    if hashes[i] == entry['hash']:
+                        rows[i] = entry['row']
+                        refreshed += 1
+                        continue
+            misses.append(i)
+
+        n_hits = int((rows >= 0).sum())
+        n_removed = len(set(entries) - set(paths)) if cached is not None else 0
+        logger.info(f"Cache de features: {n_hits} acertos, {len(misses)} falhas, {n_removed} removidas.")
+
+        ok = rows >= 0
+        new_matrix = None
+        loaded_misses = []
+        if misses:
+            new_matrix, new_ok = loader([paths[i] for i in misses])
+            for j, i in enumerate(misses):
+                if new_ok[j]:
+                    ok[i] = True
+                    loaded_misses.append((i, j))
+                    if hashes[i] is None:
+                        hashes[i] = file_content_hash(paths[i])
+
+        y = np.asarray(labels, dtype=np.int64)[ok]
+
+        def entry_for(i, row):
+            size, mtime = stats[i]
+            return {'size': size, 'mtime': mtime, 'hash': hashes[i], 'row': int(row)}
+
+        n_live = int(ok.sum())
+        n_total = n_rows + len(loaded_misses)
+        # Linhas que nenhuma imagem de `paths` referencia: removidas, alteradas ou que falharam agora
+        dead_fraction = (n_total - n_live) / n_total if n_total else 0.0
+        changed = bool(loaded_misses) or refreshed > 0 or len(entries) != n_hits or cached is None
+        compact = dead_fraction > self.compact_fraction
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        if compact:
+            miss_pos = dict(loaded_misses)
+            source_rows = [(True, rows[i]) if rows[i] >= 0 else (False, miss_pos[i]) for i in np.flatnonzero(ok)]
+            tmp_path = self._compact(source_rows, cached, new_matrix)
+            # Libera o memory-map antes de substituir o arquivo (necessário no Windows)
+            del cached
+            os.replace(tmp_path, self.matrix_path)
+            rows[ok] = np.arange(n_live)
+            n_rows = n_live
+            logger.info(f"Cache de features compactado: {n_total - n_live} linhas mortas descartadas.")
+        elif changed:
+            del cached
+            if loaded_misses:
+                misses_idx, new_idx = map(list, zip(*loaded_misses))
+                self._append(n_rows, new_matrix[new_idx])
+                rows[misses_idx] = np.arange(n_rows, n_rows + len(misses_idx))
+                n_rows += len(misses_idx)
+            elif not os.path.exists(self.matrix_path):
+                open(self.matrix_path, 'wb').close()
+
+        if changed or compact:
+            self._write_index({paths[i]: entry_for(i, rows[i]) for i in np.flatnonzero(ok)}, n_rows)
+
+        matrix = self._open_matrix(n_rows)
+        live_rows = rows[ok]
+        if len(live_rows) == n_rows and np.array_equal(live_rows, np.arange(n_rows)):
+            return matrix, y, ok
+        return matrix[live_rows], y, ok
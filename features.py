@@ -0,0 +1,34 @@
+# features.py
+import numpy as np
+from sklearn.decomposition import PCA
+from sklearn.preprocessing import FunctionTransformer, StandardScaler
+
+# Conjuntos de features disponíveis para FEATURE_PIPELINE em config.py
+FEATURE_PIPELINES = ('raw', 'pca', 'gray', 'gray_pca')
+
+
+def to_grayscale(X, image_size):
+    """Converte linhas RGB achatadas (uint8) em luminância float32 no intervalo [0, 1]."""
+    X = np.asarray(X)
+    rgb = X.reshape(len(X), image_size[1], image_size[0], 3)
+    weights = np.array([0.299, 0.587, 0.114], dtype=np.float32) / 255.0
+    return (rgb @ weights).reshape(len(X), -1)
+
+
+def build_feature_steps(kind, image_size, n_components, random_state=None):
+    """Retorna as etapas (não ajustadas) de extração de features que antecedem o classificador.
+
+    'raw' mantém os pixels originais; 'gray' reduz para 1 canal (1/3 das features);
+    'pca' e 'gray_pca' padronizam e projetam em `n_components` componentes principais.
+    """
+    if kind not in FEATURE_PIPELINES:
+        raise ValueError(f"Conjunto de features desconhecido: {kind}. Opções: {', '.join(FEATURE_PIPELINES)}")
+
+    steps = []
+    if kind in ('gray', 'gray_pca'):
+        steps.append(('gray', FunctionTransformer(to_grayscale, kw_args={'image_size': tuple(image_size)})))
+    if kind in ('pca', 'gray_pca'):
+        steps.append(('scaler', StandardScaler()))
+        steps.append(('pca', PCA(n_components=n_components, whiten=True, svd_solver='randomized',
+                                 random_state=random_state)))
+    return steps
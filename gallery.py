@@ -0,0 +1,246 @@
+# gallery.py
+import customtkinter as ctk
+import tkinter as tk
+from PIL import Image, ImageTk
+import queue
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from config import GALLERY_THUMBNAIL_SIZE, GALLERY_THUMBNAIL_CACHE_SIZE, GALLERY_BATCH_SIZE, GALLERY_WORKERS
+
+logger = logging.getLogger(__name__)
+
+CELL_PADDING = 8
+LABEL_HEIGHT = 36
+POLL_INTERVAL_MS = 50
+
+
+def load_thumbnail(path, size=GALLERY_THUMBNAIL_SIZE):
+    """Decodifica só o necessário para gerar uma miniatura (JPEGs usam draft)."""
+    with Image.open(path) as img:
+        if img.format == 'JPEG':
+            img.draft('RGB', size)
+        img = img.convert('RGB')
+    img.thumbnail(size)
+    return img
+
+
+class GalleryWindow(ctk.CTkToplevel):
+    """Galeria de várias imagens com classificação progressiva em lotes.
+
+    A grade é virtualizada em um Canvas: só as células visíveis têm itens
+    desenhados e PhotoImages vivos; as miniaturas (pequenas) ficam em um cache
+    LRU limitado e nenhuma imagem em resolução original é mantida na memória.
+    Miniaturas e previsões são produzidas em threads e entregues à thread do Tk
+    por uma fila consultada com after().
+    """
+
+    def __init__(self, master, predictor, image_paths):
+        super().__init__(master)
+        self.title(f"Galeria - {len(image_paths)} imagens")
+        self.geometry("900x700")
+
+        self.predictor = predictor
+        self.image_paths = list(image_paths)
+        self.results = [None] * len(self.image_paths) # (classe, confianca) ou mensagem de erro
+        self.n_done = 0
+
+        self.cell_width = GALLERY_THUMBNAIL_SIZE[0] + 2 * CELL_PADDING
+        self.cell_height = GALLERY_THUMBNAIL_SIZE[1] + LABEL_HEIGHT + 2 * CELL_PADDING
+        self.columns = 1
+
+        self._thumbnails = OrderedDict() # índice -> PIL.Image (LRU)
+        self._pending_thumbnails = set()
+        self._wanted = set() # Índices visíveis no momento (lido pelas threads para pular pedidos antigos)
+        self._visible = {} # índice -> (id da imagem no canvas, id do texto, PhotoImage ou None)
+        self._events = queue.Queue()
+        self._closed = threading.Event()
+
+        self.thumbnail_executor = ThreadPoolExecutor(max_workers=max(1, GALLERY_WORKERS), thread_name_prefix='thumb')
+        self.classify_thread = threading.Thread(target=self._classify_all, daemon=True)
+
+        self._create_widgets()
+        self.protocol("WM_DELETE_WINDOW", self.close)
+        self.classify_thread.start()
+        self.after(POLL_INTERVAL_MS, self._poll_events)
+
+    def _create_widgets(self):
+        top_frame = ctk.CTkFrame(self, fg_color="transparent")
+        top_frame.pack(fill="x", padx=10, pady=10)
+
+        self.status_label = ctk.CTkLabel(top_frame, text=f"0 de {len(self.image_paths)} classificadas",
+                                         font=ctk.CTkFont(size=14))
+        self.status_label.pack(side="left", padx=10)
+
+        self.progressbar = ctk.CTkProgressBar(top_frame, orientation="horizontal", height=15, corner_radius=8)
+        self.progressbar.set(0)
+        self.progressbar.pack(side="left", fill="x", expand=True, padx=10)
+
+        grid_frame = ctk.CTkFrame(self)
+        grid_frame.pack(fill="both", expand=True, padx=10, pady=(0, 10))
+
+        self.canvas = tk.Canvas(grid_frame, highlightthickness=0, bg="#1d1e1e")
+        self.scrollbar = ctk.CTkScrollbar(grid_frame, command=self._on_scrollbar)
+        self.scrollbar.pack(side="right", fill="y")
+        self.canvas.pack(side="left", fill="both", expand=True)
+        self.canvas.configure(yscrollcommand=self._on_canvas_scroll)
+
+        self.canvas.bind("<Configure>", lambda event: self._layout())
+        self.canvas.bind("<MouseWheel>", self._on_mousewheel) # Windows / macOS
+        self.canvas.bind("<Button-4>", lambda event: self._scroll_units(-1)) # Linux
+        self.canvas.bind("<Button-5>", lambda event: self._scroll_units(1))
+
+    # --- Grade virtualizada ---
+
+    def _layout(self):
+        width = max(self.canvas.winfo_width(), self.cell_width)
+        columns = max(1, width // self.cell_width)
+        if columns != self.columns:
+            self.columns = columns
+            self._clear_visible() # As posições mudam quando o número de colunas muda
+        rows = (len(self.image_paths) + self.columns - 1) // self.columns
+        self.canvas.configure(scrollregion=(0, 0, self.columns * self.cell_width, rows * self.cell_height))
+        self._refresh_visible()
+
+    def _on_scrollbar(self, *args):
+        self.canvas.yview(*args)
+        self._refresh_visible()
+
+    def _on_canvas_scroll(self, first, last):
+        self.scrollbar.set(first, last)
+        self._refresh_visible()
+
+    def _on_mousewheel(self, event):
+        self._scroll_units(-1 if event.delta > 0 else 1)
+
+    def _scroll_units(self, units):
+        self.canvas.yview_scroll(units, "units")
+        self._refresh_visible()
+
+    def _visible_range(self):
+        top = self.canvas.canvasy(0)
+        bottom = top + self.canvas.winfo_height()
+        # Uma linha extra acima e abaixo evita células em branco durante a rolagem
+        first_row = max(0, int(top // self.cell_height) - 1)
+        last_row = int(bottom // self.cell_height) + 1
+        return first_row * self.columns, min(len(self.image_paths), (last_row + 1) * self.columns)
+
+    def _clear_visible(self):
+        for image_id, text_id, _ in self._visible.values():
+            self.canvas.delete(image_id)
+            self.canvas.delete(text_id)
+        self._visible.clear()
+
+    def _refresh_visible(self):
+        start, end = self._visible_range()
+        wanted = set(range(start, end))
+
+        for index in list(self._visible):
+            if index not in wanted:
+                image_id, text_id, _ = self._visible.pop(index)
+                self.canvas.delete(image_id)
+                self.canvas.delete(text_id)
+
+        self._wanted = wanted
+        for index in range(start, end):
+            if index not in self._visible:
+                self._draw_cell(index)
+
+    def _draw_cell(self, index):
+        row, column = divmod(index, self.columns)
+        x = column * self.cell_width + self.cell_width // 2
+        y = row * self.cell_height + CELL_PADDING
+        image_id = self.canvas.create_image(x, y + GALLERY_THUMBNAIL_SIZE[1] // 2, anchor="center")
+        text_id = self.canvas.create_text(x, y + GALLERY_THUMBNAIL_SIZE[1] + LABEL_HEIGHT // 2,
+                                          text=self._result_text(index), fill="white",
+                                          width=self.cell_width - CELL_PADDING, font=("Arial", 10))
+        self._visible[index] = (image_id, text_id, None)
+
+        thumbnail = self._thumbnails.get(index)
+        if thumbnail is not None:
+            self._thumbnails.move_to_end(index)
+            self._show_thumbnail(index, thumbnail)
+        elif index not in self._pending_thumbnails:
+            self._pending_thumbnails.add(index)
+            self.thumbnail_executor.submit(self._load_thumbnail, index)
+
+    def _show_thumbnail(self, index, thumbnail):
+        image_id, text_id, _ = self._visible[index]
+        photo = ImageTk.PhotoImage(thumbnail)
+        self.canvas.itemconfigure(image_id, image=photo)
+        self._visible[index] = (image_id, text_id, photo) # Mantém referência para evitar garbage collection
+
+    def _result_text(self, index):
+        result = self.results[index]
+        if result is None:
+            return "..."
+        classe, confianca = result
+        if "Erro" in classe:
+            return classe
+        return f"{classe} ({confianca:.0%})"
+
+    # --- Trabalho em segundo plano ---
+
+    def _load_thumbnail(self, index):
+        """(Thread) Gera a miniatura se a célula ainda estiver visível."""
+        if self._closed.is_set() or index not in self._wanted:
+            self._events.put(('miniatura', index, None))
+            return
+        try:
+            thumbnail = load_thumbnail(self.image_paths[index])
+        except Exception as e:
+            logger.error(f"Erro ao gerar miniatura de {self.image_paths[index]}: {e}")
+            thumbnail = None
+        self._events.put(('miniatura', index, thumbnail))
+
+    def _classify_all(self):
+        """(Thread) Classifica todas as imagens em lotes de GALLERY_BATCH_SIZE, em ordem."""
+        for start in range(0, len(self.image_paths), GALLERY_BATCH_SIZE):
+            if self._closed.is_set():
+                return
+            batch = self.image_paths[start:start + GALLERY_BATCH_SIZE]
+            results = self.predictor.predict_batch(batch, batch_size=GALLERY_BATCH_SIZE)
+            self._events.put(('previsoes', start, [(r['erro'] or r['classe'], r['confianca']) for r in results]))
+        logger.info(f"Galeria: {len(self.image_paths)} imagens classificadas.")
+
+    def _poll_events(self):
+        if self._closed.is_set():
+            return
+        try:
+            while True:
+                kind, index, payload = self._events.get_nowait()
+                if kind == 'miniatura':
+                    self._on_thumbnail(index, payload)
+                else:
+                    self._on_predictions(index, payload)
+        except queue.Empty:
+            pass
+        self.after(POLL_INTERVAL_MS, self._poll_events)
+
+    def _on_thumbnail(self, index, thumbnail):
+        self._pending_thumbnails.discard(index)
+        if thumbnail is None:
+            return
+        self._thumbnails[index] = thumbnail
+        if len(self._thumbnails) > GALLERY_THUMBNAIL_CACHE_SIZE:
+            self._thumbnails.popitem(last=False)
+        if index in self._visible:
+            self._show_thumbnail(index, thumbnail)
+
+    def _on_predictions(self, start, predictions):
+        for offset, result in enumerate(predictions):
+            index = start + offset
+            self.results[index] = result
+            if index in self._visible:
+                self.canvas.itemconfigure(self._visible[index][1], text=self._result_text(index))
+
+        self.n_done += len(predictions)
+        total = len(self.image_paths)
+        self.progressbar.set(self.n_done / total if total else 1)
+        self.status_label.configure(text=f"{self.n_done} de {total} classificadas")
+
+    def close(self):
+        self._closed.set()
+        self.thumbnail_executor.shutdown(wait=False, cancel_futures=True)
+        self.destroy()
@@ -3,9 +3,15 @@ import customtkinter as ctk
 from tkinter import filedialog, messagebox
 from PIL import Image, ImageTk
 import os
+import io
 import logging
-from model_inference import ImagePredictor
+from concurrent.futures import ThreadPoolExecutor
+from gallery import GalleryWindow
+# model_inference, preprocessing e batch_classify (NumPy, joblib, scikit-learn) são importados
+# sob demanda, fora da thread do Tk, para a janela abrir sem esperar por eles
 from config import MODEL_PATH, GUI_ICON_PATH, WINDOW_TITLE, WINDOW_GEOMETRY, GUI_THEME, IMAGE_SIZE, CLASS_NAMES
+from config import GUI_THUMBNAIL_SIZE
+from logging_config import PREDICTION_LOG
 
 logger = logging.getLogger(__name__)
 
@@ -18,16 +24,51 @@ class ImageClassifierApp(ctk.CTk): # Herda de CTk
         ctk.set_default_color_theme(GUI_THEME) # Define o tema
         ctk.set_appearance_mode("dark") # Ou "light" ou "system"
 
-        self.predictor = ImagePredictor(MODEL_PATH)
+        self.predictor = None # Carregado em segundo plano (ver _start_model_loading)
         self.current_image_path = None # Para armazenar o caminho da última imagem selecionada
+        self.current_image_array = None # Imagem já pré-processada para o modelo
+        self._selection_id = 0 # Identifica a seleção atual para descartar resultados antigos
+        # Decodificação e previsão rodam fora da thread do Tk para a janela não congelar
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='gui-worker')
+        self.protocol("WM_DELETE_WINDOW", self.quit)
         
         self.load_icon()
         self._create_widgets()
-        
-        if self.predictor.model is None:
+        self._start_model_loading()
+
+    def _start_model_loading(self):
+        """Carrega o modelo em uma thread própria enquanto a janela já está visível."""
+        self.status_label.configure(text="Carregando modelo...")
+        loader = ThreadPoolExecutor(max_workers=1, thread_name_prefix='model-loader')
+        self._run_in_background(self._create_predictor, self._on_model_loaded, executor=loader)
+        loader.shutdown(wait=False)
+
+    @staticmethod
+    def _create_predictor():
+        """(Thread de carregamento) Importa as dependências pesadas e carrega o modelo."""
+        from model_inference import ImagePredictor
+        return ImagePredictor(MODEL_PATH)
+
+    def _on_model_loaded(self, future):
+        try:
+            self.predictor = future.result()
+        except Exception as e:
+            logger.error(f"Erro ao inicializar o preditor: {e}", exc_info=True)
+
+        if self.predictor is None or self.predictor.model is None:
+            self.status_label.configure(text="Modelo indisponível", text_color="red")
             messagebox.showerror("Erro de Carregamento", "Não foi possível carregar o modelo de classificação. A aplicação pode não funcionar corretamente.")
             self.predict_button.configure(state="disabled") # Desabilita o botão
             logger.error("Falha ao carregar o modelo no início da aplicação.")
+            return
+
+        self.status_label.configure(text="")
+        logger.info("Modelo pronto para previsões.")
+        if self.current_image_array is not None:
+            self.predict_button.configure(state="normal")
+
+    def _model_ready(self):
+        return self.predictor is not None and self.predictor.model is not None
 
     def load_icon(self):
         """Carrega e define o ícone da janela."""
@@ -51,7 +92,11 @@ class ImageClassifierApp(ctk.CTk): # Herda de CTk
         # Título
         title_label = ctk.CTkLabel(main_frame, text="Classificador de Imagem", 
                                    font=ctk.CTkFont(size=24, weight="bold"))
-        title_label.pack(pady=(0, 20))
+        title_label.pack(pady=(0, 5))
+
+        # Estado do carregamento do modelo
+        self.status_label = ctk.CTkLabel(main_frame, text="", font=ctk.CTkFont(size=12), text_color="gray")
+        self.status_label.pack(pady=(0, 10))
 
         # Texto de instrução
         instruction_label = ctk.CTkLabel(main_frame, text="Selecione uma imagem para prever:", 
@@ -66,6 +111,14 @@ class ImageClassifierApp(ctk.CTk): # Herda de CTk
                                             corner_radius=8)
         choose_image_button.pack(pady=10)
 
+        # Botões da galeria (várias imagens)
+        gallery_frame = ctk.CTkFrame(main_frame, fg_color="transparent")
+        gallery_frame.pack(pady=(0, 10))
+        ctk.CTkButton(gallery_frame, text="Abrir Pasta", command=self._open_folder_gallery,
+                      font=ctk.CTkFont(size=14), height=32, corner_radius=8).pack(side="left", padx=5)
+        ctk.CTkButton(gallery_frame, text="Várias Imagens", command=self._open_files_gallery,
+                      font=ctk.CTkFont(size=14), height=32, corner_radius=8).pack(side="left", padx=5)
+
         # Label para exibir a imagem
         self.image_display_label = ctk.CTkLabel(main_frame, text="", bg_color="transparent")
         self.image_display_label.pack(pady=10)
@@ -104,53 +157,150 @@ class ImageClassifierApp(ctk.CTk): # Herda de CTk
                                     corner_radius=8)
         exit_button.pack(pady=20)
 
+    def quit(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        super().quit()
+
+    def _run_in_background(self, func, callback, *args, executor=None):
+        """Executa func(*args) no executor e chama callback(future) na thread do Tk.
+
+        O Tk não é thread-safe, então o resultado é consultado com after() em vez
+        de ser entregue diretamente pela thread de trabalho.
+        """
+        future = (executor or self.executor).submit(func, *args)
+
+        def check():
+            if future.done():
+                callback(future)
+            else:
+                self.after(30, check)
+
+        self.after(30, check)
+        return future
+
+    @staticmethod
+    def _load_image(path):
+        """(Thread de trabalho) Lê o arquivo uma única vez e gera a miniatura e o array do modelo."""
+        with open(path, 'rb') as f:
+            data = f.read()
+        with Image.open(io.BytesIO(data)) as img:
+            if img.format == 'JPEG':
+                img.draft('RGB', GUI_THUMBNAIL_SIZE) # Decodifica JPEGs grandes já em escala reduzida
+            thumbnail = img.copy()
+        thumbnail.thumbnail(GUI_THUMBNAIL_SIZE) # Redimensiona para exibição
+        # Os mesmos bytes alimentam o modelo, com a receita de pré-processamento do treino
+        from preprocessing import load_image_array
+        img_array = load_image_array(data, IMAGE_SIZE)
+        return thumbnail, img_array
+
+    def _open_folder_gallery(self):
+        """Abre a galeria com todas as imagens de uma pasta (busca recursiva)."""
+        folder = filedialog.askdirectory(title="Selecione uma pasta de imagens")
+        if folder:
+            from batch_classify import iter_image_paths
+            self._open_gallery(list(iter_image_paths(folder)))
+
+    def _open_files_gallery(self):
+        """Abre a galeria com várias imagens selecionadas."""
+        from batch_classify import IMAGE_EXTENSIONS
+        paths = filedialog.askopenfilenames(
+            title="Selecione as imagens",
+            filetypes=[("Arquivos de imagem", " ".join(f"*{ext}" for ext in IMAGE_EXTENSIONS))]
+        )
+        if paths:
+            self._open_gallery(list(paths))
+
+    def _open_gallery(self, paths):
+        if not self._model_ready():
+            messagebox.showwarning("Modelo Indisponível", "O modelo ainda não foi carregado.")
+            return
+        if not paths:
+            messagebox.showwarning("Nenhuma Imagem", "Nenhuma imagem encontrada.")
+            return
+        logger.info(f"Abrindo galeria com {len(paths)} imagens.")
+        GalleryWindow(self, self.predictor, paths)
+
     def _choose_image(self):
-        """Abre a caixa de diálogo para seleção de imagem e a exibe."""
+        """Abre a caixa de diálogo para seleção de imagem e a carrega em segundo plano."""
         self.current_image_path = filedialog.askopenfilename(
             title="Selecione uma imagem",
             filetypes=[("Arquivos de imagem", "*.jpg *.jpeg *.png *.bmp")]
         )
+        self._selection_id += 1
+        self.current_image_array = None
+        # Uma previsão em andamento da imagem anterior é descartada (ver _on_prediction_done)
+        self.predict_button.configure(state="disabled", text="Prever")
+
         if self.current_image_path:
             logger.info(f"Imagem selecionada: {self.current_image_path}")
-            try:
-                img = Image.open(self.current_image_path)
-                img.thumbnail((300, 300)) # Redimensiona para exibição
-                img_tk = ImageTk.PhotoImage(img)
-                self.image_display_label.configure(image=img_tk, text="")
-                self.image_display_label.image = img_tk # Mantém referência para evitar garbage collection
-                self.predict_button.configure(state="normal") # Habilita o botão de previsão
-                self.result_label.configure(text="") # Limpa resultado anterior
-                self.confidence_progressbar.set(0) # Reseta barra
-            except Exception as e:
-                messagebox.showerror("Erro ao Abrir Imagem", f"Não foi possível abrir a imagem: {e}")
-                logger.error(f"Erro ao abrir imagem {self.current_image_path}: {e}")
-                self.image_display_label.configure(image=None, text="Erro ao carregar imagem")
-                self.predict_button.configure(state="disabled")
+            self.result_label.configure(text="Carregando imagem...", text_color="white")
+            self.confidence_progressbar.set(0) # Reseta barra
+            selection_id = self._selection_id
+            self._run_in_background(self._load_image,
+                                    lambda future: self._on_image_loaded(future, selection_id),
+                                    self.current_image_path)
         else:
             logger.info("Seleção de imagem cancelada.")
-            self.predict_button.configure(state="disabled") # Garante que está desabilitado se não escolheu
+
+    def _on_image_loaded(self, future, selection_id):
+        if selection_id != self._selection_id:
+            return # Outra imagem foi escolhida enquanto esta carregava
+
+        try:
+            thumbnail, self.current_image_array = future.result()
+            img_tk = ImageTk.PhotoImage(thumbnail)
+            self.image_display_label.configure(image=img_tk, text="")
+            self.image_display_label.image = img_tk # Mantém referência para evitar garbage collection
+            self.result_label.configure(text="") # Limpa resultado anterior
+            if self._model_ready():
+                self.predict_button.configure(state="normal") # Habilita o botão de previsão
+        except Exception as e:
+            messagebox.showerror("Erro ao Abrir Imagem", f"Não foi possível abrir a imagem: {e}")
+            logger.error(f"Erro ao abrir imagem {self.current_image_path}: {e}")
+            self.image_display_label.configure(image=None, text="Erro ao carregar imagem")
+            self.result_label.configure(text="")
+
+    def _predict_array(self, img_array):
+        """(Thread de trabalho) Previsão sobre a imagem já pré-processada.
+
+        Imagens repetidas são respondidas pelo cache de resultados do ImagePredictor
+        (PredictionCache, indexado pelo conteúdo), sem avaliar o modelo de novo.
+        """
+        return self.predictor.predict_image(img_array)
 
     def _perform_prediction(self):
-        """Realiza a previsão da imagem selecionada."""
-        if self.current_image_path:
-            logger.info(f"Realizando previsão para: {self.current_image_path}")
-            # Desabilita o botão enquanto processa para evitar cliques múltiplos
-            self.predict_button.configure(state="disabled", text="Prevendo...")
-            
-            # Aqui, para operações mais longas, você usaria threading para evitar congelamento
-            # Por simplicidade, faremos diretamente para este exemplo com SVM
-            classe, confianca = self.predictor.predict_image(self.current_image_path)
-            
-            self.predict_button.configure(state="normal", text="Prever") # Reabilita
-
-            if "Erro" in classe:
-                self.result_label.configure(text=f"Erro: {classe}", text_color="red")
-                self.confidence_progressbar.set(0)
-                logger.error(f"Erro na previsão: {classe}")
-            else:
-                self.result_label.configure(text=f"{classe}\n({confianca:.2%} de certeza)", text_color="white")
-                self.confidence_progressbar.set(confianca) # Atualiza a barra
-                logger.info(f"Previsão: {classe} com {confianca:.2%} de certeza.")
-        else:
+        """Realiza a previsão da imagem selecionada sem bloquear a janela."""
+        if self.current_image_array is None:
             messagebox.showwarning("Nenhuma Imagem", "Por favor, selecione uma imagem primeiro.")
-            logger.warning("Tentativa de previsão sem imagem selecionada.")
\ No newline at end of file
+            logger.warning("Tentativa de previsão sem imagem selecionada.")
+            return
+
+        logger.info(f"Realizando previsão para: {self.current_image_path}", extra=PREDICTION_LOG)
+        # Desabilita o botão enquanto processa para evitar cliques múltiplos
+        self.predict_button.configure(state="disabled", text="Prevendo...")
+        selection_id = self._selection_id
+        self._run_in_background(self._predict_array,
+                                lambda future: self._on_prediction_done(future, selection_id),
+                                self.current_image_array)
+
+    def _on_prediction_done(self, future, selection_id):
+        try:
+            classe, confianca = future.result()
+        except Exception as e:
+            logger.error(f"Erro durante a previsão: {e}", exc_info=True)
+            classe, confianca = "Erro na previsão", 0.0
+
+        if selection_id != self._selection_id:
+            return # O resultado é de uma imagem que não está mais na tela; _choose_image já restaurou o botão
+        self.predict_button.configure(state="normal", text="Prever") # Reabilita
+        self._show_prediction(classe, confianca)
+
+    def _show_prediction(self, classe, confianca):
+        if "Erro" in classe:
+            self.result_label.configure(text=f"Erro: {classe}", text_color="red")
+            self.confidence_progressbar.set(0)
+            logger.error(f"Erro na previsão: {classe}")
+        else:
+            self.result_label.configure(text=f"{classe}\n({confianca:.2%} de certeza)", text_color="white")
+            self.confidence_progressbar.set(confianca) # Atualiza a barra
+            logger.info(f"Previsão: {classe} com {confianca:.2%} de certeza.", extra=PREDICTION_LOG)
@@ -0,0 +1,303 @@
+# inference_server.py
+import argparse
+import asyncio
+import collections
+import json
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from config import MODEL_PATH, IMAGE_SIZE, LOAD_WORKERS
+from config import SERVER_HOST, SERVER_PORT, SERVER_MAX_BATCH_SIZE, SERVER_MAX_WAIT_MS, SERVER_MAX_BODY_BYTES
+from model_inference import ImagePredictor
+from preprocessing import load_image_array
+
+logger = logging.getLogger(__name__)
+
+HTTP_STATUS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+               413: 'Payload Too Large', 500: 'Internal Server Error', 503: 'Service Unavailable'}
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def extract_multipart_file(body, content_type):
+    """Retorna o conteúdo da primeira parte com arquivo de um corpo multipart/form-data."""
+    params = dict(p.strip().split('=', 1) for p in content_type.split(';')[1:] if '=' in p)
+    boundary = params.get('boundary', '').strip('"')
+    if not boundary:
+        raise HTTPError(400, "multipart sem boundary")
+
+    for part in body.split(b'--' + boundary.encode('latin-1')):
+        head, sep, content = part.partition(b'\r\n\r\n')
+        if not sep or b'filename=' not in head and b'name="imagem"' not in head:
+            continue
+        # O conteúdo termina com o CRLF que antecede o próximo delimitador
+        return content[:-2] if content.endswith(b'\r\n') else content
+    raise HTTPError(400, "Nenhum arquivo encontrado no multipart")
+
+
+class ServerMetrics:
+    """Latências recentes (janela deslizante) e contadores do servidor."""
+
+    def __init__(self, window=10000):
+        self.latencies = collections.deque(maxlen=window)
+        self.requests = 0
+        self.errors = 0
+        self.batches = 0
+        self.batched_images = 0
+
+    def snapshot(self, queue_depth):
+        latencies = np.fromiter(self.latencies, dtype=np.float64)
+        p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) * 1000 if len(latencies) else (0.0, 0.0, 0.0)
+        return {
+            'requisicoes': self.requests,
+            'erros': self.errors,
+            'fila': queue_depth,
+            'lotes': self.batches,
+            'tamanho_medio_lote': self.batched_images / self.batches if self.batches else 0.0,
+            'latencia_ms': {'p50': float(p50), 'p95': float(p95), 'p99': float(p99)},
+        }
+
+
+class MicroBatcher:
+    """Agrupa requisições concorrentes em lotes de até max_batch_size imagens.
+
+    Um lote é enviado quando enche ou quando a requisição mais antiga esperou
+    max_wait_ms. A previsão roda em uma thread dedicada para não bloquear o loop.
+    """
+
+    def __init__(self, predictor, metrics, max_batch_size=SERVER_MAX_BATCH_SIZE, max_wait_ms=SERVER_MAX_WAIT_MS):
+        self.predictor = predictor
+        self.metrics = metrics
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max_wait_ms / 1000.0
+        self.queue = asyncio.Queue()
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='predict')
+        self._task = None
+
+    def start(self):
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+        self.executor.shutdown(wait=False)
+
+    async def predict(self, img_array):
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((img_array, future))
+        return await future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            matrix = np.stack([item[0] for item in batch])
+            try:
+                results = await loop.run_in_executor(self.executor, self.predictor.predict_arrays, matrix)
+            except Exception as e:
+                logger.error(f"Erro durante a previsão de um lote: {e}", exc_info=True)
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            self.metrics.batches += 1
+            self.metrics.batched_images += len(batch)
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+
+
+class InferenceServer:
+    """Servidor HTTP asyncio que carrega o modelo uma vez e atende:
+
+    POST /predict  - imagem como corpo bruto ou multipart/form-data
+    GET  /metrics  - latências p50/p95/p99, profundidade da fila, tamanho médio dos lotes e
+                     estatísticas do cache de resultados
+    GET  /health   - estado do modelo
+    """
+
+    def __init__(self, predictor, host=SERVER_HOST, port=SERVER_PORT,
+                 max_batch_size=SERVER_MAX_BATCH_SIZE, max_wait_ms=SERVER_MAX_WAIT_MS, decode_workers=LOAD_WORKERS):
+        self.predictor = predictor
+        self.host = host
+        self.port = port
+        self.metrics = ServerMetrics()
+        self.batcher = MicroBatcher(predictor, self.metrics, max_batch_size, max_wait_ms)
+        self.decode_executor = ThreadPoolExecutor(max_workers=max(1, decode_workers), thread_name_prefix='decode')
+        self.server = None
+
+    async def start(self):
+        self.batcher.start()
+        self.server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1] # Resolve a porta quando port=0
+        logger.info(f"Servidor de inferência ouvindo em http://{self.host}:{self.port}")
+
+    async def stop(self):
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+        await self.batcher.stop()
+        self.decode_executor.shutdown(wait=False)
+
+    async def serve_forever(self):
+        await self.start()
+        try:
+            await self.server.serve_forever()
+        finally:
+            await self.stop()
+
+    async def _read_request(self, reader):
+        request_line = await reader.readline()
+        if not request_line:
+            return None
+        method, target, version = request_line.decode('latin-1').split()
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+
+        length = int(headers.get('content-length', 0))
+        if length > SERVER_MAX_BODY_BYTES:
+            raise HTTPError(413, "Imagem excede o tamanho máximo permitido")
+        body = await reader.readexactly(length) if length else b''
+        return method, target.split('?', 1)[0], version, headers, body
+
+    async def _handle_connection(self, reader, writer):
+        try:
+            while True:
+                try:
+                    request = await self._read_request(reader)
+                except (HTTPError, ValueError) as e:
+                    status = e.status if isinstance(e, HTTPError) else 400
+                    await self._send(writer, status, {'erro': str(e)}, keep_alive=False)
+                    break
+                if request is None:
+                    break
+
+                method, path, version, headers, body = request
+                keep_alive = headers.get('connection', '').lower() != 'close' and version == 'HTTP/1.1'
+                status, payload = await self._dispatch(method, path, headers, body)
+                await self._send(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def _dispatch(self, method, path, headers, body):
+        if path == '/metrics' and method == 'GET':
+            snapshot = self.metrics.snapshot(self.batcher.queue.qsize())
+            if self.predictor.result_cache is not None:
+                snapshot['cache'] = self.predictor.result_cache.stats()
+            return 200, snapshot
+        if path == '/health' and method == 'GET':
+            return 200, {'modelo_carregado': self.predictor.model is not None}
+        if path != '/predict':
+            return 404, {'erro': "Rota não encontrada"}
+        if method != 'POST':
+            return 405, {'erro': "Use POST"}
+
+        start = time.perf_counter()
+        self.metrics.requests += 1
+        try:
+            status, payload = await self._predict(headers, body)
+        except HTTPError as e:
+            status, payload = e.status, {'erro': str(e)}
+        except Exception as e:
+            logger.error(f"Erro ao atender /predict: {e}", exc_info=True)
+            status, payload = 500, {'erro': "Erro na previsão"}
+        if status != 200:
+            self.metrics.errors += 1
+        self.metrics.latencies.append(time.perf_counter() - start)
+        return status, payload
+
+    async def _predict(self, headers, body):
+        if self.predictor.model is None:
+            raise HTTPError(503, "Modelo não carregado")
+        content_type = headers.get('content-type', '')
+        if content_type.startswith('multipart/form-data'):
+            body = extract_multipart_file(body, content_type)
+        if not body:
+            raise HTTPError(400, "Corpo da requisição vazio")
+
+        loop = asyncio.get_running_loop()
+        cache = self.predictor.result_cache
+        key = None
+        if cache is not None:
+            # Hash e consulta fora do loop: o nível em SQLite pode esperar pelo lock de outro processo
+            key, cached = await loop.run_in_executor(self.decode_executor, self._cache_lookup, body)
+            if cached is not None:
+                return 200, {'classe': cached[0], 'confianca': cached[1]}
+
+        try:
+            img_array = await loop.run_in_executor(self.decode_executor, load_image_array, body, IMAGE_SIZE)
+        except Exception as e:
+            raise HTTPError(400, f"Falha ao processar imagem: {e}")
+
+        classe, confianca = await self.batcher.predict(img_array)
+        if key is not None:
+            await loop.run_in_executor(self.decode_executor, cache.put, key, (classe, confianca))
+        return 200, {'classe': classe, 'confianca': confianca}
+
+    def _cache_lookup(self, body):
+        """(Thread de decodificação) Retorna (chave, resultado em cache ou None)."""
+        _, key = self.predictor.cache_key(body)
+        return key, self.predictor.result_cache.get(key)
+
+    async def _send(self, writer, status, payload, keep_alive):
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        head = (f"HTTP/1.1 {status} {HTTP_STATUS.get(status, '')}\r\n"
+                f"Content-Type: application/json; charset=utf-8\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+        writer.write(head.encode('latin-1') + body)
+        await writer.drain()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Servidor HTTP de inferência com agrupamento dinâmico de requisições.")
+    parser.add_argument('--host', default=SERVER_HOST)
+    parser.add_argument('--port', type=int, default=SERVER_PORT)
+    parser.add_argument('--modelo', default=MODEL_PATH)
+    parser.add_argument('--max-batch-size', type=int, default=SERVER_MAX_BATCH_SIZE)
+    parser.add_argument('--max-wait-ms', type=float, default=SERVER_MAX_WAIT_MS)
+    args = parser.parse_args(argv)
+
+    predictor = ImagePredictor(args.modelo)
+    if predictor.model is None:
+        logger.error("Modelo não carregado. O servidor não será iniciado.")
+        return 1
+
+    server = InferenceServer(predictor, args.host, args.port, args.max_batch_size, args.max_wait_ms)
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        logger.info("Servidor encerrado.")
+    return 0
+
+
+if __name__ == "__main__":
+    import sys
+    from logging_config import setup_logging
+    setup_logging()
+    sys.exit(main())
@@ -3,9 +3,15 @@ from tkinter import filedialog
 from tkinter import ttk
 from PIL import Image, ImageTk
 import numpy as np
-import joblib
 
-model = joblib.load('modelo_sklearn_gato_cachorro.joblib')
+model = None # Carregado na primeira previsão, para a janela abrir imediatamente
+
+def carregar_modelo():
+    global model
+    if model is None:
+        import joblib # Importado sob demanda: joblib/scikit-learn atrasam a abertura da janela
+        model = joblib.load('modelo_sklearn_gato_cachorro.joblib', mmap_mode='c')
+    return model
 
 def prever_imagem(caminho_imagem):
     image_size = (64, 64)
@@ -15,7 +21,7 @@ def prever_imagem(caminho_imagem):
     img = img.resize(image_size)
     img_array = np.array(img).flatten().reshape(1, -1)
 
-    proba = model.predict_proba(img_array)[0]
+    proba = carregar_modelo().predict_proba(img_array)[0]
     indice = np.argmax(proba)
     classe = class_names[indice]
     confianca = proba[indice]
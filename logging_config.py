@@ -1,24 +1,103 @@
 # logging_config.py
+import atexit
+import itertools
 import logging
 import os
-from config import LOG_DIR, LOG_FILE_NAME
+import queue
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from config import LOG_DIR, LOG_FILE_NAME, LOG_ASYNC, LOG_MAX_BYTES, LOG_BACKUP_COUNT, LOG_PREDICTION_SAMPLE_RATE
 
-def setup_logging(level=logging.INFO):
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+# Use como `logger.info(..., extra=PREDICTION_LOG)` nas linhas emitidas a cada previsão,
+# para que LOG_PREDICTION_SAMPLE_RATE possa amostrá-las.
+PREDICTION_LOG = {'por_previsao': True}
+
+_listener = None
+
+
+class PredictionSampleFilter(logging.Filter):
+    """Mantém só uma fração das linhas INFO (ou abaixo) marcadas com PREDICTION_LOG.
+
+    A amostragem é determinística (1 a cada round(1 / rate) linhas); avisos, erros e
+    linhas não marcadas sempre passam. A decisão fica guardada no próprio registro, então
+    o mesmo filtro pode ser usado em vários handlers: todos mantêm as mesmas linhas e
+    cada linha avança o contador uma única vez.
+    """
+
+    def __init__(self, rate):
+        super().__init__()
+        self.rate = rate
+        self.every = round(1 / rate) if rate > 0 else 0
+        self._counter = itertools.count()
+
+    def filter(self, record):
+        if self.rate >= 1 or record.levelno > logging.INFO or not getattr(record, 'por_previsao', False):
+            return True
+        keep = getattr(record, 'amostrado', None)
+        if keep is None:
+            keep = record.amostrado = self.every > 0 and next(self._counter) % self.every == 0
+        return keep
+
+
+def create_handlers(log_path, async_mode=LOG_ASYNC, sample_rate=LOG_PREDICTION_SAMPLE_RATE, stream=None):
+    """Cria os handlers de arquivo (com rotação por tamanho) e de console.
+
+    Com `async_mode`, retorna um único QueueHandler e o QueueListener que grava nos
+    handlers reais em uma thread própria: quem loga só formata a mensagem e a coloca
+    na fila. Retorna (handlers, listener), com listener None no modo síncrono.
+    """
+    formatter = logging.Formatter(LOG_FORMAT)
+    sample_filter = PredictionSampleFilter(sample_rate)
+    handlers = [
+        RotatingFileHandler(log_path, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT, encoding='utf-8'),
+        logging.StreamHandler(stream),
+    ]
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    if not async_mode:
+        for handler in handlers:
+            handler.addFilter(sample_filter)
+        return handlers, None
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = QueueHandler(log_queue)
+    # Só a mensagem (e o traceback) é formatada na thread que loga; o prefixo com a data
+    # é aplicado pelos handlers do listener a partir de record.created
+    queue_handler.setFormatter(logging.Formatter('%(message)s'))
+    queue_handler.addFilter(sample_filter) # Linhas descartadas nem chegam à fila
+    listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    return [queue_handler], listener
+
+
+def setup_logging(level=logging.INFO, async_mode=LOG_ASYNC):
     """
     Configura o sistema de logging para a aplicação.
-    Logs serão salvos em um arquivo e também exibidos no console.
+    Logs serão salvos em um arquivo (com rotação por tamanho) e também exibidos no console.
+    Com `async_mode` a escrita acontece em uma thread separada (ver create_handlers).
     """
+    global _listener
+    if logging.getLogger().handlers:
+        return # Mesmo comportamento de logging.basicConfig: não reconfigura
+
     os.makedirs(LOG_DIR, exist_ok=True) # Garante que a pasta de logs existe
     log_path = os.path.join(LOG_DIR, LOG_FILE_NAME)
 
-    logging.basicConfig(
-        level=level,
-        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-        handlers=[
-            logging.FileHandler(log_path), # Salva logs em arquivo
-            logging.StreamHandler()        # Exibe logs no console
-        ]
-    )
+    handlers, _listener = create_handlers(log_path, async_mode)
+    if _listener is not None:
+        _listener.start()
+        atexit.register(shutdown_logging)
+
+    logging.basicConfig(level=level, handlers=handlers)
     # Opcional: configurar loggers específicos para suprimir mensagens de bibliotecas
     logging.getLogger('PIL').setLevel(logging.WARNING)
-    logging.getLogger('matplotlib').setLevel(logging.WARNING) # Se fosse usar matplotlib
\ No newline at end of file
+    logging.getLogger('matplotlib').setLevel(logging.WARNING) # Se fosse usar matplotlib
+
+
+def shutdown_logging():
+    """Esvazia a fila do modo assíncrono e para o listener (chamado automaticamente ao sair)."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
@@ -1,7 +1,6 @@
 # main.py
 import logging
 import logging_config
-import customtkinter as ctk
 from gui import ImageClassifierApp
 
 if __name__ == "__main__":
@@ -11,7 +10,7 @@ if __name__ == "__main__":
 
     logger.info("Iniciando a aplicação Gatinho ou Cachorrinho?")
 
-    # Cria a janela principal da aplicação usando CustomTkinter
+    # Cria a janela principal da aplicação usando CustomTkinter (o modelo carrega em segundo plano)
     app = ImageClassifierApp()
     app.mainloop() # Inicia o loop principal da GUI
 
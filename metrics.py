@@ -0,0 +1,243 @@
+# metrics.py
+import os
+import json
+import time
+import atexit
+import bisect
+import logging
+import threading
+import functools
+from contextlib import contextmanager
+from config import LOG_DIR, METRICS_ENABLED, METRICS_FILE_NAME, METRICS_FLUSH_INTERVAL_S
+from config import METRICS_PROFILER, METRICS_PROFILE_SPANS
+
+logger = logging.getLogger(__name__)
+
+# Limites superiores (ms) dos baldes do histograma: 0,01 ms a ~168 s em progressão geométrica (x2)
+BUCKET_BOUNDS_MS = [0.01 * 2 ** i for i in range(25)]
+
+
+class Histogram:
+    """Histograma de durações em baldes fixos: custo constante por registro, sem guardar amostras."""
+
+    __slots__ = ('counts', 'count', 'total', 'min', 'max', 'mem_peak_kb')
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKET_BOUNDS_MS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.min = float('inf')
+        self.max = 0.0
+        self.mem_peak_kb = None
+
+    def record(self, ms, mem_peak_kb=None):
+        self.counts[bisect.bisect_left(BUCKET_BOUNDS_MS, ms)] += 1
+        self.count += 1
+        self.total += ms
+        self.min = min(self.min, ms)
+        self.max = max(self.max, ms)
+        if mem_peak_kb is not None:
+            self.mem_peak_kb = max(self.mem_peak_kb or 0.0, mem_peak_kb)
+
+    def percentile(self, q):
+        """Percentil aproximado: limite superior do balde que contém o q-ésimo registro."""
+        if not self.count:
+            return 0.0
+        target = q / 100 * self.count
+        acumulado = 0
+        for i, n in enumerate(self.counts):
+            acumulado += n
+            if acumulado >= target:
+                bound = BUCKET_BOUNDS_MS[i] if i < len(BUCKET_BOUNDS_MS) else self.max
+                return min(bound, self.max)
+        return self.max
+
+    def summary(self):
+        resumo = {
+            'contagem': self.count,
+            'soma_ms': round(self.total, 3),
+            'media_ms': round(self.total / self.count, 3) if self.count else 0.0,
+            'min_ms': round(self.min, 3) if self.count else 0.0,
+            'max_ms': round(self.max, 3),
+            'p50_ms': round(self.percentile(50), 3),
+            'p95_ms': round(self.percentile(95), 3),
+            'p99_ms': round(self.percentile(99), 3),
+        }
+        if self.mem_peak_kb is not None:
+            resumo['pico_memoria_kb'] = round(self.mem_peak_kb, 1)
+        return resumo
+
+
+class MetricsRegistry:
+    """Agrega a duração dos spans por nome e grava janelas periódicas em JSON lines.
+
+    A cada METRICS_FLUSH_INTERVAL_S segundos (e ao sair do processo) o resumo dos
+    histogramas da janela é acrescentado a logs/METRICS_FILE_NAME, uma linha por janela,
+    e os histogramas recomeçam do zero.
+    """
+
+    def __init__(self, output_path, flush_interval=METRICS_FLUSH_INTERVAL_S):
+        self.output_path = output_path
+        self.flush_interval = flush_interval
+        self._histograms = {}
+        self._lock = threading.Lock()
+        self._window_start = time.time()
+        self._last_flush = time.perf_counter()
+
+    def record(self, name, ms, mem_peak_kb=None):
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = Histogram()
+            histogram.record(ms, mem_peak_kb)
+            due = time.perf_counter() - self._last_flush >= self.flush_interval
+        if due:
+            self.flush()
+
+    def snapshot(self):
+        """Resumo da janela atual sem zerá-la."""
+        with self._lock:
+            return {name: h.summary() for name, h in self._histograms.items()}
+
+    def flush(self):
+        with self._lock:
+            histograms, self._histograms = self._histograms, {}
+            window_start, self._window_start = self._window_start, time.time()
+            self._last_flush = time.perf_counter()
+        if not histograms:
+            return
+
+        line = {
+            'inicio': window_start,
+            'fim': self._window_start,
+            'pid': os.getpid(),
+            'spans': {name: h.summary() for name, h in histograms.items()},
+        }
+        try:
+            os.makedirs(os.path.dirname(self.output_path), exist_ok=True)
+            with open(self.output_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(line, ensure_ascii=False) + '\n')
+        except OSError as e:
+            logger.warning(f"Não foi possível gravar as métricas em {self.output_path}: {e}")
+
+
+class _Profiler:
+    """Gancho opcional (METRICS_PROFILER) aplicado só ao span mais externo de cada thread.
+
+    'cprofile'    - acumula as estatísticas por span e grava logs/profile_<span>.prof ao sair
+    'tracemalloc' - registra no histograma o pico de memória do processo durante o span
+
+    Os dois medem o processo inteiro (no Python 3.12+ só um cProfile pode estar ativo e o
+    pico do tracemalloc é global), então só um span é perfilado por vez: spans que
+    começam enquanto outro está sendo perfilado, em outra thread, são apenas cronometrados.
+    O pico inclui as alocações das threads auxiliares do próprio span (ex.: as do
+    carregamento paralelo de imagens), mas nunca as de outro span perfilado.
+    """
+
+    def __init__(self, kind, spans):
+        self.kind = kind
+        self.spans = set(spans or ())
+        self._local = threading.local()
+        self._stats = {}
+        self._lock = threading.Lock()
+        self._busy = threading.Lock() # Mantido pelo span perfilado no momento
+        if kind == 'tracemalloc':
+            import tracemalloc
+            self._tracemalloc = tracemalloc
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+
+    def wants(self, name):
+        return not getattr(self._local, 'active', False) and (not self.spans or name in self.spans)
+
+    @contextmanager
+    def profile(self, name, result):
+        if not self._busy.acquire(blocking=False):
+            yield # Outro span está sendo perfilado
+            return
+        self._local.active = True
+        try:
+            if self.kind == 'cprofile':
+                import cProfile
+                profiler = cProfile.Profile()
+                try:
+                    profiler.enable()
+                except (ValueError, RuntimeError): # Outra ferramenta de profiling já está ativa
+                    profiler = None
+                try:
+                    yield
+                finally:
+                    if profiler is not None:
+                        profiler.disable()
+                        self._add_stats(name, profiler)
+            else:
+                self._tracemalloc.reset_peak()
+                before = self._tracemalloc.get_traced_memory()[0]
+                try:
+                    yield
+                finally:
+                    result['mem_peak_kb'] = (self._tracemalloc.get_traced_memory()[1] - before) / 1024
+        finally:
+            self._local.active = False
+            self._busy.release()
+
+    def _add_stats(self, name, profiler):
+        import pstats
+        with self._lock:
+            if name in self._stats:
+                self._stats[name].add(profiler)
+            else:
+                self._stats[name] = pstats.Stats(profiler)
+
+    def dump(self):
+        with self._lock:
+            for name, stats in self._stats.items():
+                path = os.path.join(LOG_DIR, f"profile_{name}.prof")
+                stats.dump_stats(path)
+                logger.info(f"Perfil cProfile do span '{name}' salvo em: {path}")
+
+
+registry = MetricsRegistry(os.path.join(LOG_DIR, METRICS_FILE_NAME))
+_profiler = _Profiler(METRICS_PROFILER, METRICS_PROFILE_SPANS) if METRICS_ENABLED and METRICS_PROFILER else None
+
+
+@contextmanager
+def span(name):
+    """Mede a duração do bloco e a registra no histograma `name`.
+
+    Uso: `with span('predict'): ...`. Não faz nada quando METRICS_ENABLED é False.
+    """
+    if not METRICS_ENABLED:
+        yield
+        return
+
+    result = {}
+    start = time.perf_counter()
+    try:
+        if _profiler is not None and _profiler.wants(name):
+            with _profiler.profile(name, result):
+                yield
+        else:
+            yield
+    finally:
+        registry.record(name, (time.perf_counter() - start) * 1000, result.get('mem_peak_kb'))
+
+
+def timed(name=None):
+    """Decorador equivalente a `span`; o nome padrão é o __qualname__ da função."""
+    def decorator(func):
+        span_name = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(span_name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+@atexit.register
+def _flush_at_exit():
+    registry.flush()
+    if _profiler is not None and _profiler.kind == 'cprofile':
+        _profiler.dump()
@@ -0,0 +1,176 @@
+# model_export.py
+import os
+import time
+import logging
+import numpy as np
+import joblib
+from config import MODEL_PATH, SHARED_MODEL_PATH, RANDOM_STATE
+from config import MODEL_EXPORT_DTYPE, MODEL_EXPORT_MAX_DISAGREEMENT, MODEL_EXPORT_PRUNE_SAMPLES, MODEL_EXPORT_DIR
+from model_inference import RBFKernelSVM, SharedSVCModel, export_shared_model, SHARED_MODEL_STORAGE_DTYPES
+
+logger = logging.getLogger(__name__)
+
+# Níveis de compressão do joblib comparados no relatório (o lz4 só entra se estiver instalado)
+JOBLIB_COMPRESSIONS = [0, ('zlib', 1), ('zlib', 3), ('lz4', 3)]
+
+
+def prune_support_vectors(evaluator, X, max_disagreement=MODEL_EXPORT_MAX_DISAGREEMENT):
+    """Remove os vetores de suporte de menor |coeficiente dual| com perda limitada.
+
+    Remove o maior número de vetores (dos menos importantes para os mais importantes)
+    tal que a classe prevista mude em no máximo `max_disagreement` das imagens de X
+    em relação ao modelo completo. Como a acurácia só muda onde a previsão muda, a
+    perda de acurácia em X também fica limitada a esse valor. O kernel entre X e os
+    vetores de suporte é calculado uma única vez.
+    Retorna (avaliador podado, fração de previsões alteradas).
+    """
+    K = evaluator.kernel(X)
+    coef = np.asarray(evaluator.dual_coef, dtype=K.dtype)
+    reference = K @ coef + evaluator.intercept > 0
+    order = np.argsort(np.abs(coef), kind='stable') # Menos importantes primeiro
+
+    def disagreement(n_removed):
+        keep = order[n_removed:]
+        return float(np.mean((K[:, keep] @ coef[keep] + evaluator.intercept > 0) != reference))
+
+    # Busca binária no número de vetores removidos. A discordância não é estritamente
+    # monótona, então o resultado é aproximado, mas sempre respeita o limite.
+    low, high = 0, len(order) - 1
+    while low < high:
+        middle = (low + high + 1) // 2
+        if disagreement(middle) <= max_disagreement:
+            low = middle
+        else:
+            high = middle - 1
+
+    keep = np.sort(order[low:])
+    logger.info(f"Poda: {low} de {len(order)} vetores de suporte removidos "
+                f"({disagreement(low):.2%} das previsões alteradas em {len(X)} imagens).")
+    return evaluator.subset(keep), disagreement(low)
+
+
+def _file_size_mb(path):
+    return os.path.getsize(path) / 2**20
+
+
+def _time_to_first_prediction(load, X_one, repeat=3):
+    """Mediana do tempo para carregar o artefato e prever uma imagem (ms)."""
+    tempos = []
+    for _ in range(repeat):
+        inicio = time.perf_counter()
+        model = load()
+        model.predict_proba(X_one)
+        tempos.append(time.perf_counter() - inicio)
+    return float(np.median(tempos)) * 1000, model
+
+
+def _accuracy(model, X, y):
+    proba = model.predict_proba(X)
+    return float(np.mean(np.asarray(model.classes_)[np.argmax(proba, axis=1)] == y))
+
+
+def compare_artifacts(model, X_test, y_test, X_prune, max_disagreement=MODEL_EXPORT_MAX_DISAGREEMENT,
+                      output_dir=MODEL_EXPORT_DIR):
+    """Gera as variantes do artefato e mede tamanho, tempo até a primeira previsão e acurácia.
+
+    Variantes: joblib com cada nível de JOBLIB_COMPRESSIONS e o formato .svm com cada
+    tipo de armazenamento, com e sem poda de vetores de suporte. A diferença de acurácia
+    é em relação ao modelo original, no conjunto de teste.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    X_one = X_test[:1]
+    base_accuracy = _accuracy(model, X_test, y_test)
+    resultados = []
+
+    def registrar(nome, path, load, vetores):
+        carregamento_ms, loaded = _time_to_first_prediction(load, X_one)
+        acuracia = _accuracy(loaded, X_test, y_test)
+        resultados.append({'artefato': nome, 'tamanho_mb': _file_size_mb(path), 'carregamento_ms': carregamento_ms,
+                           'acuracia': acuracia, 'delta_acuracia': acuracia - base_accuracy,
+                           'vetores_suporte': vetores})
+
+    full = RBFKernelSVM.from_sklearn(model)
+    n_vectors = len(full.support_vectors)
+    for compress in JOBLIB_COMPRESSIONS:
+        if isinstance(compress, tuple) and compress[0] == 'lz4':
+            try:
+                import lz4 # noqa: F401
+            except ImportError:
+                continue
+        nome = 'joblib' if not compress else f"joblib {compress[0]}-{compress[1]}"
+        path = os.path.join(output_dir, nome.replace(' ', '_') + '.joblib')
+        joblib.dump(model, path, compress=compress)
+        mmap_mode = None if compress else 'c'
+        registrar(nome, path, lambda: joblib.load(path, mmap_mode=mmap_mode), n_vectors)
+
+    pruned, _ = prune_support_vectors(full, X_prune, max_disagreement)
+    for evaluator, sufixo in ((full, ''), (pruned, ' podado')):
+        for storage_dtype in SHARED_MODEL_STORAGE_DTYPES:
+            nome = f"svm {storage_dtype}{sufixo}"
+            path = os.path.join(output_dir, nome.replace(' ', '_') + '.svm')
+            export_shared_model(evaluator, path, storage_dtype=storage_dtype)
+            # Carregado na mesma precisão do armazenamento (uint8 é convertido para float32)
+            dtype = np.float64 if storage_dtype == 'float64' else np.float32
+            registrar(nome, path, lambda: SharedSVCModel.load(path, dtype=dtype), len(evaluator.support_vectors))
+
+    logger.info(f"Acurácia do modelo original no teste: {base_accuracy:.3f} ({len(X_test)} imagens)")
+    logger.info("artefato                 tamanho(MB)  carregar+prever(ms)  acurácia  delta    vetores")
+    for r in resultados:
+        logger.info(f"{r['artefato']:<24} {r['tamanho_mb']:>11.2f}  {r['carregamento_ms']:>19.1f}  "
+                    f"{r['acuracia']:>8.3f}  {r['delta_acuracia']:>+6.3f}  {r['vetores_suporte']:>7}")
+    logger.info(f"Artefatos gerados em: {output_dir}")
+
+    # Sugestão: o menor arquivo dentro do limite de perda que carrega em até 2x o tempo do mais rápido
+    fastest = min(r['carregamento_ms'] for r in resultados)
+    candidates = [r for r in resultados
+                  if r['delta_acuracia'] >= -max_disagreement and r['carregamento_ms'] <= 2 * fastest]
+    if candidates:
+        best = min(candidates, key=lambda r: (r['tamanho_mb'], r['carregamento_ms']))
+        logger.info(f"Sugestão para implantação: {best['artefato']} ({best['tamanho_mb']:.2f} MB, "
+                    f"{best['carregamento_ms']:.1f} ms, delta de acurácia {best['delta_acuracia']:+.3f})")
+    return resultados
+
+
+def export_compact_model(model, path, storage_dtype=MODEL_EXPORT_DTYPE, X_prune=None,
+                         max_disagreement=MODEL_EXPORT_MAX_DISAGREEMENT):
+    """Exporta o modelo no formato .svm com `storage_dtype`, podando vetores de suporte se X_prune for dado."""
+    evaluator = RBFKernelSVM.from_sklearn(model)
+    if X_prune is not None:
+        evaluator, _ = prune_support_vectors(evaluator, X_prune, max_disagreement)
+    export_shared_model(evaluator, path, storage_dtype=storage_dtype)
+
+
+if __name__ == "__main__":
+    import argparse
+    from logging_config import setup_logging
+    from model_training import ImageClassifierTrainer
+    setup_logging()
+
+    parser = argparse.ArgumentParser(
+        description="Compara tamanho, tempo de carregamento e acurácia das formas de exportar o modelo "
+                    "e, com --destino, exporta a variante escolhida.")
+    parser.add_argument('--modelo', default=MODEL_PATH)
+    parser.add_argument('--perda-maxima', type=float, default=MODEL_EXPORT_MAX_DISAGREEMENT,
+                        help="Fração máxima de previsões alteradas pela poda")
+    parser.add_argument('--destino', nargs='?', const=SHARED_MODEL_PATH,
+                        help=f"Exporta o modelo .svm para este caminho (padrão: {SHARED_MODEL_PATH})")
+    parser.add_argument('--dtype', default=MODEL_EXPORT_DTYPE, choices=SHARED_MODEL_STORAGE_DTYPES)
+    parser.add_argument('--podar', action='store_true', help="Com --destino: poda vetores de suporte")
+    parser.add_argument('--sem-relatorio', action='store_true')
+    args = parser.parse_args()
+
+    model = joblib.load(args.modelo)
+    trainer = ImageClassifierTrainer()
+    X, y = trainer.load_and_preprocess_data()
+    if X is None:
+        raise SystemExit("Não foi possível carregar o dataset.")
+    # Mesma divisão de run_training_pipeline: o teste não foi visto no treinamento. A poda
+    # usa só imagens do treino, para que a diferença de acurácia no teste não seja otimista
+    X_train, X_test, _, y_test = trainer.split_train_test(X, y)
+    sample = np.random.default_rng(RANDOM_STATE).permutation(len(X_train))[:MODEL_EXPORT_PRUNE_SAMPLES]
+    X_prune = np.asarray(X_train[np.sort(sample)])
+
+    if not args.sem_relatorio:
+        compare_artifacts(model, X_test, y_test, X_prune, args.perda_maxima)
+    if args.destino:
+        export_compact_model(model, args.destino, args.dtype, X_prune if args.podar else None, args.perda_maxima)
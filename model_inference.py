@@ -1,18 +1,35 @@
 # model_inference.py
-import joblib
 import numpy as np
-from PIL import Image
 import os
+import io
+import json
+import time
+import pickle
+import struct
+import hashlib
 import logging
-from config import IMAGE_SIZE, CLASS_NAMES
+import threading
+from collections import OrderedDict
+from config import IMAGE_SIZE, CLASS_NAMES, PREDICT_BATCH_SIZE, MODEL_MMAP_MODE, NUMPY_KERNEL_DTYPE
+from config import PREDICTION_CACHE_ENABLED, PREDICTION_CACHE_SIZE, PREDICTION_CACHE_TTL_S, PREDICTION_CACHE_DB_PATH
+from preprocessing import load_image_array, feature_length, describe_image_source
+from metrics import timed
 
 logger = logging.getLogger(__name__)
 
 class ImagePredictor:
-    def __init__(self, model_path):
+    def __init__(self, model_path, mmap_mode=MODEL_MMAP_MODE, numpy_kernel_dtype=NUMPY_KERNEL_DTYPE, result_cache=None):
         self.model = None # Inicializa o modelo como None
         self.image_size = IMAGE_SIZE
         self.class_names = CLASS_NAMES
+        self.mmap_mode = mmap_mode
+        self.numpy_kernel_dtype = numpy_kernel_dtype # None: usa o modelo do scikit-learn como está
+        self.model_fingerprint = None
+        # Qualquer objeto com get(chave) e put(chave, (classe, confianca)); None + PREDICTION_CACHE_ENABLED
+        # cria um PredictionCache com as configurações padrão. Atribua None depois para desligar.
+        if result_cache is None and PREDICTION_CACHE_ENABLED:
+            result_cache = PredictionCache()
+        self.result_cache = result_cache
         
         self._load_model(model_path)
 
@@ -24,32 +41,85 @@ class ImagePredictor:
             return
 
         try:
-            self.model = joblib.load(model_path)
+            if is_shared_model_file(model_path):
+                # Sem NUMPY_KERNEL_DTYPE, usa o tipo gravado: converter criaria uma cópia por processo
+                self.model = SharedSVCModel.load(model_path, dtype=self.numpy_kernel_dtype)
+                logger.info(f"Modelo compartilhável com vetores de suporte em {self.model.dtype.name}.")
+            else:
+                import joblib # Importado aqui: joblib (e o scikit-learn, ao deserializar) é pesado
+                self.model = joblib.load(model_path, mmap_mode=self.mmap_mode)
+                if self.numpy_kernel_dtype is not None:
+                    self._use_numpy_kernel()
+            # A precisão do kernel NumPy entra na impressão digital: muda (pouco) as probabilidades
+            self.model_fingerprint = f"{model_fingerprint(model_path)}:{self.numpy_kernel_dtype}"
             logger.info("Modelo carregado com sucesso.")
         except Exception as e:
             logger.error(f"Erro ao carregar o modelo de {model_path}: {e}", exc_info=True)
 
-    def preprocess_image(self, image_path):
-        """Pré-processa uma única imagem para a previsão."""
+    def _use_numpy_kernel(self):
+        """Troca o SVC do scikit-learn pelo avaliador NumPy (RBFKernelSVM), quando compatível."""
         try:
-            img = Image.open(image_path).convert('RGB')
-            img = img.resize(self.image_size)
-            img_array = np.array(img).flatten().reshape(1, -1)
+            self.model = RBFKernelSVM.from_sklearn(self.model, dtype=self.numpy_kernel_dtype)
+            logger.info(f"Usando kernel RBF em NumPy ({np.dtype(self.numpy_kernel_dtype).name}).")
+        except ValueError as e:
+            logger.warning(f"Kernel NumPy indisponível para este modelo, mantendo o scikit-learn: {e}")
+
+    def preprocess_image(self, image_source):
+        """Pré-processa uma única imagem para a previsão.
+
+        Aceita caminho, bytes, objeto de arquivo, PIL.Image ou array NumPy.
+        """
+        return self._preprocess(image_source, image_source)
+
+    @timed('ImagePredictor.preprocess_image')
+    def _preprocess(self, image_data, image_source):
+        """Pré-processa `image_data`; os logs de erro identificam a imagem por `image_source`."""
+        try:
+            img_array = load_image_array(image_data, self.image_size).reshape(1, -1)
             return img_array
         except FileNotFoundError:
-            logger.error(f"Erro: Imagem não encontrada no caminho: {image_path}")
+            logger.error(f"Erro: Imagem não encontrada no caminho: {describe_image_source(image_source)}")
             return None
         except Exception as e:
-            logger.error(f"Erro ao pré-processar a imagem {image_path}: {e}", exc_info=True)
+            logger.error(f"Erro ao pré-processar a imagem {describe_image_source(image_source)}: {e}", exc_info=True)
             return None
 
-    def predict_image(self, image_path):
-        """Realiza a previsão em uma imagem."""
+    def cache_key(self, image_source):
+        """Chave do cache de resultados para `image_source`.
+
+        Retorna (origem, chave). Caminhos e objetos de arquivo são lidos uma única vez e
+        a origem devolvida passa a ser os bytes lidos, para não abrir o arquivo de novo.
+        """
+        image_source, digest = image_content_hash(image_source)
+        return image_source, f"{digest}:{self.model_fingerprint}"
+
+    @timed()
+    def predict_image(self, image_source):
+        """Realiza a previsão em uma imagem (mesmos tipos de entrada de preprocess_image).
+
+        Com self.result_cache, imagens com o mesmo conteúdo são respondidas do cache
+        sem decodificar nem avaliar o modelo de novo.
+        """
         if self.model is None:
             logger.warning("Erro: Modelo não carregado. Não é possível fazer a previsão.")
             return "Erro: Modelo não carregado", 0.0
 
-        img_array = self.preprocess_image(image_path)
+        key = None
+        image_data = image_source # Nos logs a imagem continua identificada pela origem recebida
+        if self.result_cache is not None:
+            try:
+                image_data, key = self.cache_key(image_source)
+            except FileNotFoundError:
+                logger.error(f"Erro: Imagem não encontrada no caminho: {describe_image_source(image_source)}")
+                return "Erro: Falha ao processar imagem", 0.0
+            except Exception as e:
+                logger.error(f"Erro ao ler a imagem {describe_image_source(image_source)}: {e}")
+                return "Erro: Falha ao processar imagem", 0.0
+            cached = self.result_cache.get(key)
+            if cached is not None:
+                return cached
+
+        img_array = self._preprocess(image_data, image_source)
         if img_array is None:
             return "Erro: Falha ao processar imagem", 0.0
 
@@ -57,8 +127,518 @@ class ImagePredictor:
             proba = self.model.predict_proba(img_array)[0]
             indice = np.argmax(proba)
             classe = self.class_names[indice]
-            confianca = proba[indice]
-            return classe, confianca
+            confianca = float(proba[indice]) # float em todos os caminhos, inclusive no acerto do cache
         except Exception as e:
-            logger.error(f"Erro durante a previsão da imagem {image_path}: {e}", exc_info=True)
-            return "Erro na previsão", 0.0
\ No newline at end of file
+            logger.error(f"Erro durante a previsão da imagem {describe_image_source(image_source)}: {e}", exc_info=True)
+            return "Erro na previsão", 0.0
+
+        if key is not None:
+            self.result_cache.put(key, (classe, confianca))
+        return classe, confianca
+
+    def predict_arrays(self, img_matrix):
+        """Classifica uma matriz (n_imagens, n_features) com uma única chamada a predict_proba.
+
+        Retorna uma lista de tuplas (classe, confianca), uma por linha.
+        """
+        proba = self.model.predict_proba(img_matrix)
+        indices = np.argmax(proba, axis=1)
+        confiancas = proba[np.arange(len(indices)), indices]
+        return [(self.class_names[i], float(c)) for i, c in zip(indices, confiancas)]
+
+    def predict_batch(self, image_sources, batch_size=PREDICT_BATCH_SIZE):
+        """Realiza a previsão de várias imagens (caminhos, bytes, PIL.Image ou arrays) em lotes.
+
+        As imagens de cada lote são decodificadas em uma matriz uint8 pré-alocada e
+        classificadas com uma única chamada a predict_proba. Retorna uma lista de
+        dicionários na mesma ordem de `image_sources`, com as chaves 'caminho',
+        'classe', 'confianca' e 'erro' (None quando a imagem foi classificada).
+        """
+        image_sources = list(image_sources)
+        if self.model is None:
+            logger.warning("Erro: Modelo não carregado. Não é possível fazer a previsão.")
+            return [self._batch_result(path, erro="Erro: Modelo não carregado") for path in image_sources]
+
+        batch_size = max(1, int(batch_size))
+        n_features = feature_length(self.image_size)
+        buffer = np.empty((min(batch_size, len(image_sources)), n_features), dtype=np.uint8)
+        resultados = []
+
+        for inicio in range(0, len(image_sources), batch_size):
+            lote = image_sources[inicio:inicio + batch_size]
+            lote_resultados = [None] * len(lote)
+            linhas_validas = []
+
+            for i, path in enumerate(lote):
+                try:
+                    buffer[len(linhas_validas)] = load_image_array(path, self.image_size)
+                    linhas_validas.append(i)
+                except FileNotFoundError:
+                    logger.error(f"Erro: Imagem não encontrada no caminho: {describe_image_source(path)}")
+                    lote_resultados[i] = self._batch_result(path, erro="Erro: Falha ao processar imagem")
+                except Exception as e:
+                    logger.error(f"Erro ao pré-processar a imagem {describe_image_source(path)}: {e}")
+                    lote_resultados[i] = self._batch_result(path, erro="Erro: Falha ao processar imagem")
+
+            if linhas_validas:
+                try:
+                    previsoes = self.predict_arrays(buffer[:len(linhas_validas)])
+                    for i, (classe, confianca) in zip(linhas_validas, previsoes):
+                        lote_resultados[i] = self._batch_result(lote[i], classe, confianca)
+                except Exception as e:
+                    logger.error(f"Erro durante a previsão do lote iniciado em {describe_image_source(lote[0])}: {e}", exc_info=True)
+                    for i in linhas_validas:
+                        lote_resultados[i] = self._batch_result(lote[i], erro="Erro na previsão")
+
+            resultados.extend(lote_resultados)
+
+        return resultados
+
+    @staticmethod
+    def _batch_result(path, classe=None, confianca=0.0, erro=None):
+        return {'caminho': path, 'classe': classe, 'confianca': confianca, 'erro': erro}
+
+
+# --- Cache de resultados ---
+
+def model_fingerprint(path, sample_bytes=1 << 20):
+    """Impressão digital barata de um arquivo de modelo.
+
+    Combina caminho absoluto, tamanho, mtime e o SHA-256 do primeiro e do último MB:
+    qualquer troca do arquivo em MODEL_PATH (novo treinamento, cópia de outro modelo)
+    gera outra impressão digital, sem ler um modelo grande inteiro.
+    """
+    st = os.stat(path)
+    digest = hashlib.sha256(f"{os.path.abspath(path)}:{st.st_size}:{st.st_mtime_ns}".encode('utf-8'))
+    with open(path, 'rb') as f:
+        digest.update(f.read(sample_bytes))
+        if st.st_size > sample_bytes:
+            f.seek(max(sample_bytes, st.st_size - sample_bytes))
+            digest.update(f.read(sample_bytes))
+    return digest.hexdigest()[:16]
+
+
+def image_content_hash(image_source):
+    """SHA-256 do conteúdo bruto da imagem. Retorna (origem, hash).
+
+    Caminhos e objetos de arquivo são lidos e a origem devolvida são os bytes; arrays
+    e PIL.Images são identificados pelos pixels, formato e dimensões.
+    """
+    if isinstance(image_source, (str, os.PathLike)):
+        with open(image_source, 'rb') as f:
+            image_source = f.read()
+    elif hasattr(image_source, 'read'):
+        image_source = image_source.read()
+
+    if isinstance(image_source, (bytes, bytearray, memoryview)):
+        return image_source, hashlib.sha256(image_source).hexdigest()
+    if isinstance(image_source, np.ndarray):
+        digest = hashlib.sha256(f"{image_source.dtype}{image_source.shape}".encode('utf-8'))
+        digest.update(np.ascontiguousarray(image_source).data)
+        return image_source, digest.hexdigest()
+    # PIL.Image
+    digest = hashlib.sha256(f"{image_source.mode}{image_source.size}".encode('utf-8'))
+    digest.update(image_source.tobytes())
+    return image_source, digest.hexdigest()
+
+
+class PredictionCache:
+    """Cache de previsões (classe, confianca) com LRU + TTL em memória e nível opcional em SQLite.
+
+    Seguro para várias threads. O LRU e o SQLite têm locks separados: uma consulta ao disco
+    que espera pelo lock de escrita de outro processo não bloqueia os acertos em memória nem
+    stats(). O nível em disco sobrevive a reinícios e pode ser compartilhado por vários
+    processos; um acerto no disco é promovido para a memória. stats() informa acertos por
+    nível e a taxa de acerto.
+    """
+
+    def __init__(self, max_size=PREDICTION_CACHE_SIZE, ttl=PREDICTION_CACHE_TTL_S, db_path=PREDICTION_CACHE_DB_PATH):
+        self.max_size = max(1, max_size)
+        self.ttl = ttl
+        self._items = OrderedDict() # chave -> (instante de gravação, resultado)
+        self._lock = threading.Lock() # LRU e contadores
+        self._db_lock = threading.Lock() # Conexão SQLite
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._db = self._open_db(db_path) if db_path else None
+
+    def _open_db(self, db_path):
+        import sqlite3
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        db = sqlite3.connect(db_path, check_same_thread=False, timeout=5.0)
+        db.execute("PRAGMA journal_mode=WAL") # Leitores não bloqueiam o processo que grava
+        db.execute("CREATE TABLE IF NOT EXISTS previsoes "
+                   "(chave TEXT PRIMARY KEY, classe TEXT NOT NULL, confianca REAL NOT NULL, criado REAL NOT NULL)")
+        if self.ttl is not None:
+            db.execute("DELETE FROM previsoes WHERE criado < ?", (time.time() - self.ttl,))
+        db.commit()
+        return db
+
+    def _expired(self, created, now):
+        return self.ttl is not None and now - created > self.ttl
+
+    def get(self, key):
+        """Retorna (classe, confianca) ou None. Com o nível em disco, pode bloquear (chame fora de um loop asyncio)."""
+        now = time.time()
+        with self._lock:
+            item = self._items.get(key)
+            if item is not None:
+                if not self._expired(item[0], now):
+                    self._items.move_to_end(key)
+                    self.memory_hits += 1
+                    return item[1]
+                del self._items[key]
+
+        row = None
+        with self._db_lock:
+            if self._db is not None:
+                row = self._db.execute("SELECT classe, confianca, criado FROM previsoes WHERE chave = ?",
+                                       (key,)).fetchone()
+        with self._lock:
+            if row is not None and not self._expired(row[2], now):
+                result = (row[0], row[1])
+                self._store(key, result, row[2])
+                self.disk_hits += 1
+                return result
+            self.misses += 1
+            return None
+
+    def put(self, key, result):
+        now = time.time()
+        with self._lock:
+            self._store(key, result, now)
+        with self._db_lock:
+            if self._db is not None:
+                self._db.execute("INSERT OR REPLACE INTO previsoes VALUES (?, ?, ?, ?)",
+                                 (key, result[0], float(result[1]), now))
+                self._db.commit()
+
+    def _store(self, key, result, created):
+        self._items[key] = (created, result)
+        self._items.move_to_end(key)
+        if len(self._items) > self.max_size:
+            self._items.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                'acertos_memoria': self.memory_hits,
+                'acertos_disco': self.disk_hits,
+                'falhas': self.misses,
+                'taxa_acerto': (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+                'itens_memoria': len(self._items),
+            }
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+        with self._db_lock:
+            if self._db is not None:
+                self._db.execute("DELETE FROM previsoes")
+                self._db.commit()
+
+    def close(self):
+        with self._db_lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+
+# --- Formato de modelo compartilhável entre processos ---
+#
+# Layout do arquivo: SHARED_MODEL_MAGIC, tamanho do cabeçalho (uint64 little-endian),
+# cabeçalho JSON e, a seguir, os arrays brutos alinhados em SHARED_MODEL_ALIGNMENT bytes.
+# Os arrays são abertos com np.memmap somente leitura, então vários processos que
+# carregam o mesmo arquivo compartilham as mesmas páginas do cache do sistema operacional.
+
+SHARED_MODEL_MAGIC = b'GCSVM\x00\x01\x00'
+SHARED_MODEL_ALIGNMENT = 64
+
+
+def is_shared_model_file(path):
+    """Indica se `path` está no formato de modelo compartilhável (e não é um joblib)."""
+    with open(path, 'rb') as f:
+        return f.read(len(SHARED_MODEL_MAGIC)) == SHARED_MODEL_MAGIC
+
+
+def _split_svc_pipeline(model):
+    """Separa um SVC (ou Pipeline terminado em SVC) em (etapas anteriores ou None, SVC)."""
+    from sklearn.pipeline import Pipeline
+    from sklearn.svm import SVC
+
+    preprocessing = None
+    svc = model
+    if isinstance(model, Pipeline):
+        svc = model.steps[-1][1]
+        if len(model.steps) > 1:
+            preprocessing = model[:-1]
+    if not isinstance(svc, SVC) or svc.kernel != 'rbf' or len(svc.classes_) != 2:
+        raise ValueError("Só é possível exportar SVC binário com kernel RBF (opcionalmente dentro de um Pipeline).")
+    # Confere os parâmetros de Platt ajustados, e não o parâmetro probability: no scikit-learn 1.9
+    # ele está depreciado e o valor padrão deixou de ser False
+    if not np.size(getattr(svc, '_probA', ())):
+        raise ValueError("O SVC precisa ter sido treinado com probability=True.")
+    return preprocessing, svc
+
+
+SHARED_MODEL_STORAGE_DTYPES = ('float64', 'float32', 'uint8')
+
+
+def _encode_support_vectors(support_vectors, storage_dtype):
+    """Converte os vetores de suporte para o tipo de armazenamento.
+
+    Retorna (arrays a gravar, vetores decodificados em float64). Em 'uint8', vetores que
+    já são pixels inteiros de 0 a 255 (features 'raw') são gravados sem perda; os demais
+    são quantizados por dimensão: v = q * sv_scale + sv_offset.
+    """
+    if storage_dtype not in SHARED_MODEL_STORAGE_DTYPES:
+        raise ValueError(f"Tipo de armazenamento desconhecido: {storage_dtype}. Use um de {SHARED_MODEL_STORAGE_DTYPES}.")
+    support_vectors = np.asarray(support_vectors, dtype=np.float64)
+
+    if storage_dtype != 'uint8':
+        stored = np.ascontiguousarray(support_vectors, dtype=storage_dtype)
+        return {'support_vectors': stored}, stored.astype(np.float64)
+
+    if np.all((support_vectors >= 0) & (support_vectors <= 255) & (support_vectors == np.rint(support_vectors))):
+        stored = np.ascontiguousarray(support_vectors, dtype=np.uint8)
+        return {'support_vectors': stored}, support_vectors
+
+    offset = support_vectors.min(axis=0)
+    scale = (support_vectors.max(axis=0) - offset) / 255.0
+    scale[scale == 0] = 1.0
+    stored = np.ascontiguousarray(np.rint((support_vectors - offset) / scale), dtype=np.uint8)
+    return {'support_vectors': stored, 'sv_scale': scale, 'sv_offset': offset}, stored * scale + offset
+
+
+def export_shared_model(model, path, storage_dtype='float64'):
+    """Exporta um SVC RBF treinado (ou um RBFKernelSVM) para o formato compartilhável por memory-map.
+
+    Vetores de suporte, coeficientes duais, normas ao quadrado dos vetores de suporte
+    e os parâmetros de Platt ficam como arrays brutos. Etapas de pré-processamento de
+    um Pipeline (ex.: PCA) são guardadas serializadas no próprio arquivo.
+    `storage_dtype` ('float64', 'float32' ou 'uint8') define como os vetores de suporte
+    são gravados; ver _encode_support_vectors.
+    """
+    evaluator = model if isinstance(model, RBFKernelSVM) else RBFKernelSVM.from_sklearn(model)
+    arrays, decoded = _encode_support_vectors(evaluator.support_vectors, storage_dtype)
+    arrays['dual_coef'] = np.ascontiguousarray(evaluator.dual_coef, dtype=np.float64)
+    arrays['sv_sq_norms'] = np.einsum('ij,ij->i', decoded, decoded)
+    preprocessing = evaluator.preprocessing
+    blob = pickle.dumps(preprocessing, protocol=pickle.HIGHEST_PROTOCOL) if preprocessing is not None else b''
+
+    header = {
+        'gamma': float(evaluator.gamma),
+        'intercept': float(evaluator.intercept),
+        'prob_a': float(evaluator.prob_a),
+        'prob_b': float(evaluator.prob_b),
+        'classes': evaluator.classes_.tolist(),
+        'arrays': {},
+        'preprocessing': None,
+    }
+
+    # O cabeçalho guarda os offsets, que dependem do tamanho do próprio cabeçalho: calcula
+    # com espaço reservado e ajusta até estabilizar
+    header_size = 4096
+    while True:
+        offset = _align(len(SHARED_MODEL_MAGIC) + 8 + header_size)
+        for name, array in arrays.items():
+            header['arrays'][name] = {'dtype': array.dtype.str, 'shape': list(array.shape), 'offset': offset}
+            offset = _align(offset + array.nbytes)
+        header['preprocessing'] = {'offset': offset, 'size': len(blob)} if blob else None
+        encoded = json.dumps(header).encode('utf-8')
+        if len(encoded) <= header_size:
+            break
+        header_size = len(encoded)
+
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(SHARED_MODEL_MAGIC)
+        f.write(struct.pack('<Q', header_size))
+        f.write(encoded.ljust(header_size, b' '))
+        for name, array in arrays.items():
+            f.seek(header['arrays'][name]['offset'])
+            f.write(array.tobytes())
+        if blob:
+            f.seek(header['preprocessing']['offset'])
+            f.write(blob)
+    os.replace(tmp_path, path)
+    logger.info(f"Modelo exportado no formato compartilhável: {path} "
+                f"({len(decoded)} vetores de suporte, {storage_dtype})")
+
+
+def _align(offset):
+    return (offset + SHARED_MODEL_ALIGNMENT - 1) // SHARED_MODEL_ALIGNMENT * SHARED_MODEL_ALIGNMENT
+
+
+def _libsvm_binary_probability(r01, max_iter=100):
+    """Reproduz multiclass_probability do libsvm embutido no scikit-learn para 2 classes.
+
+    Essa versão do libsvm não usa o sigmoide diretamente como probabilidade: resolve
+    o acoplamento par a par de forma iterativa (tolerância 0.005/k), o que desloca o
+    resultado em até ~1e-2. Repetir o mesmo método, vetorizado por amostra, dá os
+    mesmos valores que SVC.predict_proba.
+    """
+    r10 = 1.0 - r01
+    Q = np.empty((len(r01), 2, 2))
+    Q[:, 0, 0] = r10 * r10
+    Q[:, 1, 1] = r01 * r01
+    Q[:, 0, 1] = Q[:, 1, 0] = -r01 * r10
+    p = np.full((len(r01), 2), 0.5)
+    eps = 0.005 / 2
+    active = np.arange(len(r01))
+
+    for _ in range(max_iter):
+        Qa, pa = Q[active], p[active]
+        Qp = np.einsum('nij,nj->ni', Qa, pa)
+        pQp = np.einsum('ni,ni->n', pa, Qp)
+        pending = np.abs(Qp - pQp[:, None]).max(axis=1) >= eps
+        active, Qa, pa, Qp, pQp = active[pending], Qa[pending], pa[pending], Qp[pending], pQp[pending]
+        if not len(active):
+            break
+        for t in range(2):
+            diff = (pQp - Qp[:, t]) / Qa[:, t, t]
+            pa[:, t] += diff
+            pQp = (pQp + diff * (diff * Qa[:, t, t] + 2 * Qp[:, t])) / (1 + diff) / (1 + diff)
+            Qp = (Qp + diff[:, None] * Qa[:, t, :]) / (1 + diff)[:, None]
+            pa /= (1 + diff)[:, None]
+        p[active] = pa
+    return p
+
+
+class RBFKernelSVM:
+    """Avaliador NumPy de um SVC RBF binário, sem a sobrecarga do scikit-learn por chamada.
+
+    As normas ao quadrado dos vetores de suporte são calculadas uma vez, no carregamento,
+    e o kernel de um lote inteiro sai de um único GEMM (X @ SV.T). Com dtype=np.float32
+    os vetores de suporte são convertidos (cópia) e o GEMM roda em precisão simples; o
+    erro no expoente do kernel fica na ordem de 1e-6 para pixels de 0 a 255.
+    """
+
+    def __init__(self, support_vectors, dual_coef, gamma, intercept, prob_a, prob_b, classes,
+                 preprocessing=None, sv_sq_norms=None, dtype=np.float64):
+        self.dtype = np.dtype(dtype)
+        if support_vectors.dtype != self.dtype:
+            support_vectors = support_vectors.astype(self.dtype)
+            sv_sq_norms = None # Recalcula na nova precisão
+        self.support_vectors = support_vectors
+        if sv_sq_norms is None:
+            sv_sq_norms = np.einsum('ij,ij->i', support_vectors, support_vectors)
+        self.sv_sq_norms = np.asarray(sv_sq_norms, dtype=self.dtype)
+        self.dual_coef = np.asarray(dual_coef, dtype=self.dtype)
+        self.gamma = gamma
+        self.intercept = intercept
+        self.prob_a = prob_a
+        self.prob_b = prob_b
+        self.classes_ = np.asarray(classes)
+        self.preprocessing = preprocessing
+
+    @classmethod
+    def from_sklearn(cls, model, dtype=np.float64):
+        """Cria o avaliador a partir de um SVC (ou Pipeline terminado em SVC) já treinado."""
+        preprocessing, svc = _split_svc_pipeline(model)
+        # _probA/_probB: os atributos públicos probA_/probB_ estão depreciados no scikit-learn 1.9
+        return cls(np.ascontiguousarray(svc.support_vectors_), svc.dual_coef_[0], float(svc._gamma),
+                   float(svc.intercept_[0]), float(svc._probA[0]), float(svc._probB[0]), svc.classes_,
+                   preprocessing=preprocessing, dtype=dtype)
+
+    def subset(self, keep):
+        """Novo avaliador só com os vetores de suporte selecionados por `keep` (índices ou máscara)."""
+        return RBFKernelSVM(self.support_vectors[keep], self.dual_coef[keep], self.gamma, self.intercept,
+                            self.prob_a, self.prob_b, self.classes_, preprocessing=self.preprocessing,
+                            sv_sq_norms=self.sv_sq_norms[keep], dtype=self.dtype)
+
+    def kernel(self, X):
+        """Matriz do kernel entre as imagens de X (após o pré-processamento) e os vetores de suporte."""
+        if self.preprocessing is not None:
+            X = self.preprocessing.transform(X)
+        X = np.asarray(X, dtype=self.dtype)
+        # ||x - sv||^2 = ||x||^2 + ||sv||^2 - 2 x.sv, com um único produto de matrizes
+        sq_dist = X @ self.support_vectors.T
+        sq_dist *= -2.0
+        sq_dist += np.einsum('ij,ij->i', X, X)[:, None]
+        sq_dist += self.sv_sq_norms[None, :]
+        np.maximum(sq_dist, 0.0, out=sq_dist)
+        sq_dist *= -self.gamma
+        return np.exp(sq_dist, out=sq_dist)
+
+    def decision_function(self, X):
+        """Mesmo valor que SVC.decision_function: positivo favorece classes_[1]."""
+        return (self.kernel(X) @ self.dual_coef).astype(np.float64) + self.intercept
+
+    def predict_proba(self, X):
+        """Probabilidades calibradas com o sigmoide de Platt guardado pelo libsvm."""
+        # O libsvm calibra sobre o valor de decisão com o sinal invertido em relação ao scikit-learn
+        f_ab = -self.decision_function(X) * self.prob_a + self.prob_b
+        pairwise = np.empty_like(f_ab)
+        positive = f_ab >= 0 # Mesma formulação numericamente estável do libsvm
+        pairwise[positive] = np.exp(-f_ab[positive]) / (1.0 + np.exp(-f_ab[positive]))
+        pairwise[~positive] = 1.0 / (1.0 + np.exp(f_ab[~positive]))
+        np.clip(pairwise, 1e-7, 1 - 1e-7, out=pairwise)
+        return _libsvm_binary_probability(pairwise)
+
+    def predict(self, X):
+        return self.classes_[(self.decision_function(X) > 0).astype(int)]
+
+
+class SharedSVCModel(RBFKernelSVM):
+    """RBFKernelSVM cujos arrays vêm de um arquivo exportado por export_shared_model.
+
+    Quando o tipo gravado é o mesmo de `dtype`, os arrays são usados direto do np.memmap
+    somente leitura, sem copiar os vetores de suporte para cada processo. Vetores gravados
+    em outro tipo são convertidos para `dtype` no carregamento. Com dtype=None vale o tipo
+    gravado (float64 ou float32); uint8 sempre vira uma cópia em float64 por processo.
+    """
+
+    @classmethod
+    def load(cls, path, dtype=None):
+        with open(path, 'rb') as f:
+            if f.read(len(SHARED_MODEL_MAGIC)) != SHARED_MODEL_MAGIC:
+                raise ValueError(f"{path} não está no formato de modelo compartilhável.")
+            header_size, = struct.unpack('<Q', f.read(8))
+            header = json.loads(f.read(header_size).decode('utf-8'))
+            preprocessing = None
+            if header['preprocessing']:
+                f.seek(header['preprocessing']['offset'])
+                preprocessing = pickle.load(io.BytesIO(f.read(header['preprocessing']['size'])))
+
+        arrays = {
+            name: np.memmap(path, mode='r', dtype=np.dtype(spec['dtype']), offset=spec['offset'],
+                            shape=tuple(spec['shape']))
+            for name, spec in header['arrays'].items()
+        }
+        support_vectors = arrays['support_vectors']
+        if dtype is None:
+            dtype = support_vectors.dtype if support_vectors.dtype.kind == 'f' else np.float64
+        if 'sv_scale' in arrays: # uint8 quantizado (ver _encode_support_vectors)
+            support_vectors = support_vectors * arrays['sv_scale'] + arrays['sv_offset']
+        return cls(support_vectors, arrays['dual_coef'], header['gamma'], header['intercept'],
+                   header['prob_a'], header['prob_b'], header['classes'], preprocessing=preprocessing,
+                   sv_sq_norms=arrays['sv_sq_norms'], dtype=dtype)
+
+
+if __name__ == "__main__":
+    import argparse
+    from logging_config import setup_logging
+    from config import MODEL_PATH, SHARED_MODEL_PATH, DATASET_DIR
+    setup_logging()
+
+    parser = argparse.ArgumentParser(description="Exporta o modelo joblib para o formato compartilhável por memory-map.")
+    parser.add_argument('--origem', default=MODEL_PATH)
+    parser.add_argument('--destino', default=SHARED_MODEL_PATH)
+    parser.add_argument('--dtype', default='float64', choices=SHARED_MODEL_STORAGE_DTYPES,
+                        help="Tipo de armazenamento dos vetores de suporte")
+    args = parser.parse_args()
+
+    import glob
+    import joblib
+    model = joblib.load(args.origem)
+    export_shared_model(model, args.destino, storage_dtype=args.dtype)
+
+    # Confere se o modelo exportado reproduz o original nas imagens do dataset
+    paths = sorted(glob.glob(os.path.join(DATASET_DIR, '*', '*')))[:200]
+    predictor = ImagePredictor(args.destino)
+    X = np.array([a for a in (predictor.preprocess_image(p) for p in paths) if a is not None]).reshape(-1, feature_length(IMAGE_SIZE))
+    diff = np.abs(model.predict_proba(X) - predictor.model.predict_proba(X)).max()
+    logger.info(f"Diferença máxima de probabilidade em {len(X)} imagens: {diff:.2e}")
@@ -1,16 +1,50 @@
 # model_training.py
 import os
+import json
+import time
+import hashlib
+import sys
+import argparse
+import tracemalloc
 import numpy as np
-from PIL import Image
-from sklearn.model_selection import train_test_split
+from concurrent.futures import ThreadPoolExecutor
+from sklearn.model_selection import train_test_split, GroupShuffleSplit, GridSearchCV, StratifiedKFold
 from sklearn.svm import SVC
+from sklearn.linear_model import SGDClassifier
+from sklearn.kernel_approximation import Nystroem
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import FunctionTransformer
+from sklearn.calibration import CalibratedClassifierCV
 from sklearn.metrics import classification_report
 import joblib
 import logging
-from config import IMAGE_SIZE, DATASET_DIR, MODEL_PATH, TEST_SIZE, RANDOM_STATE, CLASS_LABELS, CLASS_NAMES
+from config import IMAGE_SIZE, DATASET_DIR, MODEL_PATH, TEST_SIZE, RANDOM_STATE, CLASS_LABELS, CLASS_NAMES, LOAD_WORKERS
+from config import FEATURE_CACHE_ENABLED, FEATURE_CACHE_DIR, DATASET_INDEX_ENABLED, DATASET_DEDUPLICATE
+from config import TRAINING_ENGINE, SGD_EPOCHS, SGD_BATCH_SIZE, SGD_ALPHA, NYSTROEM_COMPONENTS
+from config import CALIBRATION_SIZE, CALIBRATION_MAX_SAMPLES, STREAMING_TRAINING, STREAMING_TRACE_MEMORY
+from config import FEATURE_PIPELINE, PCA_COMPONENTS, FEATURE_FIT_SAMPLES, LOG_DIR
+from config import TUNING_C, TUNING_GAMMA, TUNING_FEATURE_PIPELINES, TUNING_CV_FOLDS, TUNING_N_JOBS
+from config import TUNING_SUCCESSIVE_HALVING, TUNING_HALVING_FACTOR, TUNING_SVC_CACHE_MB, TUNING_CACHE_DIR
+from config import TUNING_LEADERBOARD_SIZE, MODEL_JOBLIB_COMPRESS
+from preprocessing import load_image_array, feature_length, scale_pixels
+from feature_cache import FeatureCache
+from dataset_index import DatasetIndex
+from features import build_feature_steps, FEATURE_PIPELINES
+from metrics import timed
 
 logger = logging.getLogger(__name__)
 
+
+def peak_rss_mb():
+    """Pico de memória residente (RSS) do processo até agora, em MB; None sem o módulo resource (Windows)."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss vem em KB no Linux e em bytes no macOS
+    return peak / 2**20 if sys.platform == 'darwin' else peak / 2**10
+
 class ImageClassifierTrainer:
     def __init__(self):
         self.image_size = IMAGE_SIZE
@@ -18,14 +52,25 @@ class ImageClassifierTrainer:
         self.model_output_path = MODEL_PATH
         self.class_labels = CLASS_LABELS # Nomes das pastas no dataset
         self.class_names_for_report = CLASS_NAMES # Nomes para o relatório de classificação
+        self.load_workers = LOAD_WORKERS # Threads para decodificação paralela das imagens
+        self.feature_cache = FeatureCache(FEATURE_CACHE_DIR, IMAGE_SIZE) if FEATURE_CACHE_ENABLED else None
+        self.engine = TRAINING_ENGINE # 'svc', 'sgd' ou 'nystroem'
+        self.streaming = STREAMING_TRAINING
+        self.feature_pipeline = FEATURE_PIPELINE # 'raw', 'gray', 'pca' ou 'gray_pca'
+        self.dataset_index = DatasetIndex() if DATASET_INDEX_ENABLED else None
+        self.deduplicate = DATASET_DEDUPLICATE
+        self.groups = None # Grupo de quase-duplicatas de cada arquivo da última listagem (ver split_train_test)
 
-    def load_and_preprocess_data(self):
-        """Carrega e pré-processa as imagens do dataset."""
-        X = []
-        y = []
+    def list_dataset_files(self):
+        """Lista os arquivos do dataset e seus rótulos, na ordem de os.listdir de cada classe.
+
+        Com o índice do dataset ativo, arquivos corrompidos (e quase-duplicatas, se
+        self.deduplicate) são descartados e self.groups recebe o grupo de cada arquivo.
+        """
+        paths = []
+        labels = []
+        self.groups = None
 
-        logger.info(f"Iniciando carregamento de dados do diretório: {self.dataset_dir}")
-        
         if not os.path.isdir(self.dataset_dir):
             logger.error(f"Diretório do dataset não encontrado: {self.dataset_dir}")
             return None, None
@@ -37,28 +82,89 @@ class ImageClassifierTrainer:
                 continue
 
             for file in os.listdir(class_dir):
-                img_path = os.path.join(class_dir, file)
-                try:
-                    img = Image.open(img_path).convert('RGB')
-                    img = img.resize(self.image_size)
-                    img_array = np.array(img).flatten()
-                    X.append(img_array)
-                    y.append(label)
-                except Exception as e:
-                    logger.error(f"Erro ao processar imagem {img_path}: {e}")
-        
-        if not X:
+                paths.append(os.path.join(class_dir, file))
+                labels.append(label)
+
+        if self.dataset_index is not None:
+            paths, labels, self.groups = self.dataset_index.clean(paths, labels, self.deduplicate)
+        return paths, labels
+
+    def load_image_matrix(self, paths):
+        """Decodifica as imagens em paralelo direto em uma matriz uint8 pré-alocada.
+
+        Retorna a matriz (len(paths), n_features) e uma máscara booleana indicando
+        quais linhas foram carregadas com sucesso. A linha i sempre corresponde a paths[i].
+        """
+        X = np.empty((len(paths), feature_length(self.image_size)), dtype=np.uint8)
+        ok = np.zeros(len(paths), dtype=bool)
+
+        def carregar(i):
+            try:
+                X[i] = load_image_array(paths[i], self.image_size)
+                ok[i] = True
+            except Exception as e:
+                logger.error(f"Erro ao processar imagem {paths[i]}: {e}")
+
+        # O PIL libera o GIL durante decodificação e redimensionamento, então threads bastam
+        with ThreadPoolExecutor(max_workers=max(1, self.load_workers)) as executor:
+            list(executor.map(carregar, range(len(paths))))
+
+        return X, ok
+
+    @timed()
+    def load_and_preprocess_data(self):
+        """Carrega e pré-processa as imagens do dataset."""
+        logger.info(f"Iniciando carregamento de dados do diretório: {self.dataset_dir}")
+
+        paths, labels = self.list_dataset_files()
+        if paths is None:
+            return None, None
+
+        if self.feature_cache is not None:
+            X, y, ok = self.feature_cache.load(paths, labels, self.load_image_matrix)
+        else:
+            X, ok = self.load_image_matrix(paths)
+            y = np.asarray(labels, dtype=np.int64)
+            if not ok.all():
+                X, y = X[ok], y[ok]
+        if self.groups is not None and not ok.all():
+            # Mantém um grupo por linha de X: imagens que falharam ao carregar saem dos grupos também
+            self.groups = [group for group, loaded in zip(self.groups, ok) if loaded]
+
+        if len(X) == 0:
             logger.error("Nenhuma imagem carregada. Verifique o caminho do dataset e as permissões.")
             return None, None
 
         logger.info(f"Dados carregados: {len(X)} imagens encontradas.")
-        return np.array(X), np.array(y)
+        return X, y
 
+    def split_train_test(self, X, y):
+        """Divide (X, y) em treino e teste sem separar quase-duplicatas.
+
+        Com o índice do dataset ativo, usa GroupShuffleSplit com os grupos de
+        load_and_preprocess_data (um por linha de X); sem ele, train_test_split comum.
+        """
+        if self.groups is None:
+            return train_test_split(X, y, test_size=TEST_SIZE, random_state=RANDOM_STATE)
+        if len(self.groups) != len(X):
+            raise ValueError(f"Há {len(self.groups)} grupos de quase-duplicatas para {len(X)} imagens; "
+                             "use o X retornado por load_and_preprocess_data.")
+        splitter = GroupShuffleSplit(n_splits=1, test_size=TEST_SIZE, random_state=RANDOM_STATE)
+        train_idx, test_idx = next(splitter.split(X, y, groups=self.groups))
+        return X[train_idx], X[test_idx], y[train_idx], y[test_idx]
+
+    @timed()
     def train_model(self, X_train, y_train):
-        """Treina o modelo SVM."""
-        logger.info("Iniciando treinamento do modelo SVC...")
-        model = SVC(probability=True, random_state=RANDOM_STATE)
+        """Treina o modelo com o motor configurado em TRAINING_ENGINE."""
+        if self.engine in ('sgd', 'nystroem'):
+            return self._train_incremental_model(X_train, y_train)
+        if self.engine != 'svc':
+            logger.error(f"Motor de treinamento desconhecido: {self.engine}")
+            return None
+
+        logger.info(f"Iniciando treinamento do modelo SVC (features '{self.feature_pipeline}')...")
         try:
+            model = Pipeline(self._feature_steps(len(X_train)) + [('clf', SVC(probability=True, random_state=RANDOM_STATE))])
             model.fit(X_train, y_train)
             logger.info("Treinamento do modelo concluído com sucesso.")
             return model
@@ -66,6 +172,100 @@ class ImageClassifierTrainer:
             logger.error(f"Erro durante o treinamento do modelo: {e}")
             return None
 
+    def _feature_steps(self, n_samples):
+        """Etapas de extração de features configuradas em FEATURE_PIPELINE (ainda não ajustadas)."""
+        # O PCA não pode ter mais componentes que amostras de ajuste
+        return build_feature_steps(self.feature_pipeline, self.image_size, min(PCA_COMPONENTS, n_samples),
+                                   random_state=RANDOM_STATE)
+
+    def _feature_sample_size(self, n_available):
+        return min(n_available, max(FEATURE_FIT_SAMPLES, NYSTROEM_COMPONENTS))
+
+    def _fit_feature_steps(self, X_sample):
+        """Cria e ajusta as etapas de transformação que antecedem o classificador incremental.
+
+        Só uma amostra do treino é usada no ajuste (FEATURE_FIT_SAMPLES linhas para
+        PCA/Nystroem), então a memória não cresce com o dataset.
+        """
+        steps = self._feature_steps(len(X_sample))
+        if steps:
+            sample = Pipeline(steps).fit_transform(X_sample)
+        else:
+            steps = [('scale', FunctionTransformer(scale_pixels))]
+            sample = scale_pixels(X_sample)
+
+        if self.engine == 'nystroem':
+            # Mesmo gamma que o SVC usa por padrão (gamma='scale')
+            gamma = 1.0 / (sample.shape[1] * max(float(sample.var()), 1e-12))
+            nystroem = Nystroem(gamma=gamma, n_components=min(NYSTROEM_COMPONENTS, len(sample)),
+                                random_state=RANDOM_STATE)
+            nystroem.fit(sample)
+            steps.append(('nystroem', nystroem))
+        return steps
+
+    def _new_incremental_classifier(self):
+        # loss='log_loss' é uma regressão logística: predict_proba já sai calibrado pela própria perda
+        return SGDClassifier(loss='log_loss', alpha=SGD_ALPHA, random_state=RANDOM_STATE)
+
+    def _partial_fit_epochs(self, clf, features, make_batches):
+        """Executa SGD_EPOCHS épocas de partial_fit sobre os mini-lotes gerados por make_batches(epoch)."""
+        classes = np.arange(len(self.class_labels))
+        for epoch in range(SGD_EPOCHS):
+            for X_batch, y_batch in make_batches(epoch):
+                clf.partial_fit(features.transform(X_batch), y_batch, classes=classes)
+            logger.info(f"Época {epoch + 1}/{SGD_EPOCHS} concluída.")
+
+    def _train_incremental_model(self, X_train, y_train):
+        """Treina uma regressão logística com partial_fit em mini-lotes de SGD_BATCH_SIZE imagens.
+
+        Cada mini-lote é convertido para float só no momento do uso, então o pico de
+        memória depende do tamanho do lote e não do número de imagens. Uma fração do
+        treino (CALIBRATION_SIZE) fica de fora para calibrar as probabilidades.
+        """
+        logger.info(f"Iniciando treinamento incremental (motor '{self.engine}', {SGD_EPOCHS} épocas)...")
+        try:
+            rng = np.random.RandomState(RANDOM_STATE)
+            order = rng.permutation(len(X_train))
+            n_cal = min(int(len(order) * CALIBRATION_SIZE), CALIBRATION_MAX_SAMPLES)
+            cal_idx, fit_idx = np.sort(order[:n_cal]), order[n_cal:]
+
+            sample_idx = np.sort(rng.choice(fit_idx, size=self._feature_sample_size(len(fit_idx)), replace=False))
+            feature_steps = self._fit_feature_steps(X_train[sample_idx])
+
+            def make_batches(epoch):
+                rng.shuffle(fit_idx)
+                for start in range(0, len(fit_idx), SGD_BATCH_SIZE):
+                    # Índices ordenados mantêm a leitura sequencial quando X_train é um memory-map
+                    idx = np.sort(fit_idx[start:start + SGD_BATCH_SIZE])
+                    yield X_train[idx], y_train[idx]
+
+            clf = self._new_incremental_classifier()
+            self._partial_fit_epochs(clf, Pipeline(feature_steps), make_batches)
+
+            model = Pipeline(feature_steps + [('clf', clf)])
+            model = self._calibrate_model(model, X_train[cal_idx], y_train[cal_idx])
+            logger.info("Treinamento do modelo concluído com sucesso.")
+            return model
+        except Exception as e:
+            logger.error(f"Erro durante o treinamento do modelo: {e}")
+            return None
+
+    def _calibrate_model(self, model, X_cal, y_cal):
+        """Calibra as probabilidades de um modelo já treinado (sigmoid/Platt) em dados separados."""
+        # CalibratedClassifierCV divide a calibração em 5 partes estratificadas
+        if np.bincount(y_cal, minlength=len(self.class_labels)).min() < 5:
+            logger.warning("Dados de calibração insuficientes (mínimo de 5 por classe). Probabilidades não calibradas.")
+            return model
+
+        try:
+            from sklearn.frozen import FrozenEstimator
+            calibrated = CalibratedClassifierCV(FrozenEstimator(model), method='sigmoid')
+        except ImportError: # scikit-learn < 1.6
+            calibrated = CalibratedClassifierCV(model, method='sigmoid', cv='prefit')
+        calibrated.fit(X_cal, y_cal)
+        logger.info(f"Probabilidades calibradas com {len(y_cal)} amostras.")
+        return calibrated
+
     def evaluate_model(self, model, X_test, y_test):
         """Avalia o modelo e imprime o relatório de classificação."""
         if model is None:
@@ -82,6 +282,7 @@ class ImageClassifierTrainer:
             logger.error(f"Erro durante a avaliação do modelo: {e}")
             return None
 
+    @timed()
     def save_model(self, model):
         """Salva o modelo treinado em um arquivo."""
         if model is None:
@@ -90,13 +291,16 @@ class ImageClassifierTrainer:
 
         os.makedirs(os.path.dirname(self.model_output_path), exist_ok=True)
         try:
-            joblib.dump(model, self.model_output_path)
+            joblib.dump(model, self.model_output_path, compress=MODEL_JOBLIB_COMPRESS)
             logger.info(f"Modelo salvo com sucesso em: {self.model_output_path}")
         except Exception as e:
             logger.error(f"Erro ao salvar o modelo em {self.model_output_path}: {e}")
 
     def run_training_pipeline(self):
         """Executa todo o pipeline de treinamento."""
+        if self.streaming:
+            return self.run_streaming_pipeline()
+
         logger.info("Iniciando pipeline de treinamento do classificador de imagens.")
         X, y = self.load_and_preprocess_data()
         
@@ -104,7 +308,7 @@ class ImageClassifierTrainer:
             logger.error("Não foi possível carregar os dados para o treinamento. Abortando.")
             return
 
-        X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=TEST_SIZE, random_state=RANDOM_STATE)
+        X_train, X_test, y_train, y_test = self.split_train_test(X, y)
         logger.info(f"Dados divididos: Treino={len(X_train)} amostras, Teste={len(X_test)} amostras.")
 
         model = self.train_model(X_train, y_train)
@@ -114,10 +318,320 @@ class ImageClassifierTrainer:
         else:
             logger.error("Treinamento falhou, modelo não foi salvo.")
 
+    def _as_memmap(self, X):
+        """Garante que X seja um memory-map em disco.
+
+        Os processos do joblib/loky recebem memory-maps por referência ao arquivo, em
+        vez de uma cópia serializada da matriz inteira para cada worker. A matriz do
+        FeatureCache já é um memory-map; sem o cache, X é gravado uma vez em TUNING_CACHE_DIR.
+        """
+        if isinstance(X, np.memmap):
+            return X
+        os.makedirs(TUNING_CACHE_DIR, exist_ok=True)
+        path = os.path.join(TUNING_CACHE_DIR, 'X.npy')
+        np.save(path, X)
+        return np.load(path, mmap_mode='r')
+
+    def _fold_train_size(self, n_samples):
+        """Menor número de amostras de treino de um fold da validação cruzada sobre n_samples."""
+        return n_samples - -(-n_samples // TUNING_CV_FOLDS)
+
+    def _halving_min_resources(self, n_samples, n_candidates):
+        """Amostras da primeira rodada do successive halving.
+
+        Mesmo cálculo de min_resources='exhaust' do scikit-learn (a última rodada usa
+        quase todas as amostras), mas garantindo que os folds da primeira rodada tenham
+        amostras de treino suficientes para o PCA com PCA_COMPONENTS componentes; senão
+        todos os candidatos com PCA falhariam já na primeira rodada.
+        """
+        n_rounds = 1
+        while TUNING_HALVING_FACTOR ** n_rounds <= n_candidates:
+            n_rounds += 1
+        min_resources = max(n_samples // TUNING_HALVING_FACTOR ** (n_rounds - 1),
+                            2 * TUNING_CV_FOLDS * len(self.class_labels)) # 'smallest' do scikit-learn
+        if any(kind in ('pca', 'gray_pca') for kind in TUNING_FEATURE_PIPELINES):
+            while min_resources < n_samples and self._fold_train_size(min_resources) <= PCA_COMPONENTS:
+                min_resources += 1
+        return min(min_resources, n_samples)
+
+    def _tuning_param_grid(self, n_train):
+        """Grade de busca: conjunto de features x C x gamma.
+
+        `n_train` é o menor número de amostras de treino de um ajuste na busca (fold da
+        primeira rodada, no successive halving): o PCA não pode ter mais componentes que isso.
+        """
+        n_components = min(PCA_COMPONENTS, n_train - 1)
+        feature_options = []
+        for kind in TUNING_FEATURE_PIPELINES:
+            if kind not in FEATURE_PIPELINES:
+                logger.warning(f"Conjunto de features desconhecido na busca: {kind}. Ignorando.")
+                continue
+            steps = build_feature_steps(kind, self.image_size, n_components, random_state=RANDOM_STATE)
+            feature_options.append(Pipeline(steps) if steps else 'passthrough')
+        return {'features': feature_options, 'clf__C': TUNING_C, 'clf__gamma': TUNING_GAMMA}
+
+    def tune_hyperparameters(self, X_train, y_train):
+        """Busca C, gamma e conjunto de features por validação cruzada em paralelo.
+
+        Os candidatos são avaliados sem probability=True (a calibração interna de Platt
+        multiplicaria o custo); o vencedor é retreinado com probabilidades no final.
+        As etapas de features ajustadas ficam em cache (Pipeline(memory=...)), então PCA
+        não é recalculado para cada combinação de C e gamma.
+        Retorna (modelo_vencedor, leaderboard).
+        """
+        from joblib import Memory
+
+        X_train = self._as_memmap(X_train)
+        estimator = Pipeline(
+            [('features', 'passthrough'), ('clf', SVC(cache_size=TUNING_SVC_CACHE_MB, random_state=RANDOM_STATE))],
+            memory=Memory(os.path.join(TUNING_CACHE_DIR, 'pipeline'), verbose=0),
+        )
+        cv = StratifiedKFold(n_splits=TUNING_CV_FOLDS, shuffle=True, random_state=RANDOM_STATE)
+        common = dict(cv=cv, n_jobs=TUNING_N_JOBS, scoring='accuracy', error_score=np.nan, refit=False)
+        n_candidates = len(TUNING_FEATURE_PIPELINES) * len(TUNING_C) * len(TUNING_GAMMA)
+
+        if TUNING_SUCCESSIVE_HALVING:
+            from sklearn.experimental import enable_halving_search_cv # noqa: F401 (habilita a classe)
+            from sklearn.model_selection import HalvingGridSearchCV
+            min_resources = self._halving_min_resources(len(X_train), n_candidates)
+            param_grid = self._tuning_param_grid(self._fold_train_size(min_resources))
+            search = HalvingGridSearchCV(estimator, param_grid, factor=TUNING_HALVING_FACTOR,
+                                         min_resources=min_resources, random_state=RANDOM_STATE, **common)
+        else:
+            param_grid = self._tuning_param_grid(self._fold_train_size(len(X_train)))
+            search = GridSearchCV(estimator, param_grid, **common)
+
+        n_candidates = len(param_grid['features']) * len(TUNING_C) * len(TUNING_GAMMA)
+        logger.info(f"Iniciando busca de hiperparâmetros: {n_candidates} combinações, {TUNING_CV_FOLDS} folds, "
+                    f"{'successive halving' if TUNING_SUCCESSIVE_HALVING else 'grade completa'}.")
+        inicio = time.perf_counter()
+        search.fit(X_train, y_train)
+        logger.info(f"Busca concluída em {time.perf_counter() - inicio:.1f}s.")
+
+        failed = np.isnan(search.cv_results_['mean_test_score'])
+        if failed.any():
+            rounds = np.asarray(search.cv_results_.get('iter', np.zeros(len(failed), dtype=int)))
+            per_round = ', '.join(f"rodada {r}: {int(np.sum(failed & (rounds == r)))}/{int(np.sum(rounds == r))}"
+                                  for r in np.unique(rounds))
+            logger.warning(f"{int(failed.sum())} de {len(failed)} avaliações de candidatos falharam e foram "
+                           f"descartadas ({per_round}).")
+
+        leaderboard = self._build_leaderboard(search, len(X_train))
+        if not leaderboard or np.isnan(leaderboard[0]['acuracia_media']):
+            logger.error("Nenhuma combinação de hiperparâmetros pôde ser avaliada.")
+            return None, leaderboard
+
+        best_params = search.cv_results_['params'][leaderboard[0]['indice']]
+        best = Pipeline([('features', best_params['features']),
+                         ('clf', SVC(C=best_params['clf__C'], gamma=best_params['clf__gamma'],
+                                     probability=True, random_state=RANDOM_STATE))])
+        logger.info(f"Retreinando o vencedor com probabilidades: {leaderboard[0]['configuracao']}")
+        best.fit(X_train, y_train)
+        return best, leaderboard
+
+    def _build_leaderboard(self, search, n_samples):
+        """Ordena os candidatos pela acurácia na última rodada em que foram avaliados."""
+        results = search.cv_results_
+        n_candidates = len(results['params'])
+        # GridSearchCV não tem rodadas: todos usam as n_samples amostras
+        n_rounds = results.get('iter', np.zeros(n_candidates, dtype=int))
+        n_resources = results.get('n_resources', np.full(n_candidates, n_samples))
+
+        rows = []
+        for i, params in enumerate(results['params']):
+            kind = params['features']
+            kind_name = 'raw' if kind == 'passthrough' else '+'.join(name for name, _ in kind.steps)
+            # Latência por imagem: tempo de score dividido pelo tamanho do fold de validação
+            n_val = n_resources[i] / search.n_splits_
+            rows.append({
+                'indice': i,
+                'rodada': int(n_rounds[i]),
+                'configuracao': f"features={kind_name} C={params['clf__C']} gamma={params['clf__gamma']}",
+                'acuracia_media': float(results['mean_test_score'][i]),
+                'acuracia_desvio': float(results['std_test_score'][i]),
+                'ajuste_s': float(results['mean_fit_time'][i]),
+                'latencia_ms_por_imagem': float(results['mean_score_time'][i] / max(n_val, 1) * 1000),
+            })
+
+        # Só a última rodada de cada candidato importa no successive halving
+        latest = {}
+        for row in rows:
+            key = row['configuracao']
+            if key not in latest or row['rodada'] > latest[key]['rodada']:
+                latest[key] = row
+        return sorted(latest.values(),
+                      key=lambda r: (-r['rodada'], -np.nan_to_num(r['acuracia_media'], nan=-1.0), r['ajuste_s']))
+
+    def log_leaderboard(self, leaderboard, output_path=None):
+        """Registra o leaderboard no log e, opcionalmente, grava-o em JSON."""
+        lines = [f"{'#':>2}  {'rodada':>6}  {'acurácia':>15}  {'ajuste(s)':>9}  {'lat.(ms/img)':>12}  configuração"]
+        for pos, row in enumerate(leaderboard[:TUNING_LEADERBOARD_SIZE], start=1):
+            lines.append(f"{pos:>2}  {row['rodada']:>6}  {row['acuracia_media']:>7.3f} ± {row['acuracia_desvio']:<5.3f}  "
+                         f"{row['ajuste_s']:>9.2f}  {row['latencia_ms_por_imagem']:>12.3f}  {row['configuracao']}")
+        logger.info("\nLeaderboard da busca de hiperparâmetros:\n" + "\n".join(lines))
+
+        if output_path:
+            os.makedirs(os.path.dirname(output_path), exist_ok=True)
+            with open(output_path, 'w', encoding='utf-8') as f:
+                json.dump(leaderboard, f, indent=2, ensure_ascii=False)
+            logger.info(f"Leaderboard salvo em: {output_path}")
+
+    def run_tuning_pipeline(self):
+        """Busca hiperparâmetros, avalia o vencedor no conjunto de teste e o salva em MODEL_PATH."""
+        logger.info("Iniciando pipeline de busca de hiperparâmetros.")
+        X, y = self.load_and_preprocess_data()
+        if X is None or y is None:
+            logger.error("Não foi possível carregar os dados para a busca. Abortando.")
+            return
+
+        X_train, X_test, y_train, y_test = self.split_train_test(X, y)
+        logger.info(f"Dados divididos: Treino={len(X_train)} amostras, Teste={len(X_test)} amostras.")
+
+        try:
+            model, leaderboard = self.tune_hyperparameters(X_train, y_train)
+        except Exception as e:
+            logger.error(f"Erro durante a busca de hiperparâmetros: {e}", exc_info=True)
+            return
+        self.log_leaderboard(leaderboard, os.path.join(LOG_DIR, 'tuning_leaderboard.json'))
+
+        if model:
+            self.evaluate_model(model, X_test, y_test)
+            self.save_model(model)
+        else:
+            logger.error("Busca falhou, modelo não foi salvo.")
+
+    def split_bucket(self, path):
+        """Valor determinístico em [0, 1) derivado do caminho relativo da imagem.
+
+        Usado no lugar de train_test_split no modo streaming: a mesma imagem cai
+        sempre no mesmo conjunto, independente da ordem de leitura ou da máquina.
+        """
+        rel_path = os.path.relpath(path, self.dataset_dir).replace(os.sep, '/')
+        digest = hashlib.md5(f"{RANDOM_STATE}:{rel_path}".encode('utf-8')).digest()
+        return int.from_bytes(digest[:8], 'big') / 2.0 ** 64
+
+    def iter_image_batches(self, paths, labels, batch_size=SGD_BATCH_SIZE):
+        """Gera mini-lotes (X, y) pré-processados lendo as imagens do disco sob demanda."""
+        labels = np.asarray(labels, dtype=np.int64)
+        for start in range(0, len(paths), batch_size):
+            X, ok = self.load_image_matrix(paths[start:start + batch_size])
+            y = labels[start:start + batch_size]
+            if not ok.all():
+                X, y = X[ok], y[ok]
+            if len(X):
+                yield X, y
+
+    def _load_subset(self, paths, labels):
+        """Carrega um subconjunto pequeno (amostra/calibração) inteiro na memória."""
+        X, ok = self.load_image_matrix(paths)
+        return X[ok], np.asarray(labels, dtype=np.int64)[ok]
+
+    def run_streaming_pipeline(self):
+        """Pipeline de treinamento out-of-core com partial_fit sobre mini-lotes lidos do disco.
+
+        O pico de memória é limitado por SGD_BATCH_SIZE (e pelas amostras de ajuste do
+        Nystroem e de calibração), não pelo tamanho do dataset. A cada época é registrado o
+        pico de RSS do processo ou, com STREAMING_TRACE_MEMORY, o pico da época via tracemalloc.
+        """
+        logger.info("Iniciando pipeline de treinamento em streaming.")
+        if self.engine not in ('sgd', 'nystroem'):
+            logger.warning(f"Motor '{self.engine}' não suporta treinamento incremental. Usando 'sgd'.")
+            self.engine = 'sgd'
+
+        paths, labels = self.list_dataset_files()
+        if not paths:
+            logger.error("Não foi possível carregar os dados para o treinamento. Abortando.")
+            return
+
+        # O bucket vem do representante do grupo: quase-duplicatas caem sempre no mesmo conjunto
+        groups = self.groups if self.groups is not None else paths
+        train, cal, test = [], [], []
+        for path, label, group in zip(paths, labels, groups):
+            bucket = self.split_bucket(group)
+            if bucket < TEST_SIZE:
+                test.append((path, label))
+            elif bucket < TEST_SIZE + (1 - TEST_SIZE) * CALIBRATION_SIZE and len(cal) < CALIBRATION_MAX_SAMPLES:
+                cal.append((path, label))
+            else:
+                train.append((path, label))
+        logger.info(f"Dados divididos: Treino={len(train)}, Calibração={len(cal)}, Teste={len(test)} arquivos.")
+        if not train:
+            logger.error("Nenhuma imagem de treino após a divisão. Abortando.")
+            return
+
+        started_tracing = STREAMING_TRACE_MEMORY and not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start()
+        try:
+            rng = np.random.RandomState(RANDOM_STATE)
+            sample = [train[i] for i in np.sort(rng.choice(len(train), size=self._feature_sample_size(len(train)), replace=False))]
+            X_sample, _ = self._load_subset(*zip(*sample))
+            feature_steps = self._fit_feature_steps(X_sample)
+            del X_sample
+
+            def make_batches(epoch):
+                if STREAMING_TRACE_MEMORY:
+                    tracemalloc.reset_peak()
+                order = rng.permutation(len(train))
+                epoch_paths = [train[i][0] for i in order]
+                epoch_labels = [train[i][1] for i in order]
+                n_images = 0
+                for X_batch, y_batch in self.iter_image_batches(epoch_paths, epoch_labels):
+                    n_images += len(y_batch)
+                    yield X_batch, y_batch
+                if STREAMING_TRACE_MEMORY:
+                    memoria = f"pico de memória da época {tracemalloc.get_traced_memory()[1] / 2**20:.1f} MB"
+                else:
+                    rss = peak_rss_mb()
+                    memoria = f"pico de RSS do processo {rss:.1f} MB" if rss is not None else "pico de RSS indisponível"
+                logger.info(f"Época {epoch + 1}: {n_images} imagens, {memoria}.")
+
+            clf = self._new_incremental_classifier()
+            self._partial_fit_epochs(clf, Pipeline(feature_steps), make_batches)
+            model = Pipeline(feature_steps + [('clf', clf)])
+
+            if cal:
+                model = self._calibrate_model(model, *self._load_subset(*zip(*cal)))
+        except Exception as e:
+            logger.error(f"Erro durante o treinamento do modelo: {e}")
+            return
+        finally:
+            if started_tracing:
+                tracemalloc.stop()
+        logger.info("Treinamento do modelo concluído com sucesso.")
+
+        if test:
+            self.evaluate_streaming(model, *zip(*test))
+        self.save_model(model)
+
+    def evaluate_streaming(self, model, paths, labels):
+        """Avalia o modelo lendo o conjunto de teste em mini-lotes."""
+        logger.info("Avaliando o modelo...")
+        try:
+            y_true, y_pred = [], []
+            for X_batch, y_batch in self.iter_image_batches(list(paths), list(labels)):
+                y_true.append(y_batch)
+                y_pred.append(model.predict(X_batch))
+            report = classification_report(np.concatenate(y_true), np.concatenate(y_pred),
+                                           labels=np.arange(len(self.class_labels)),
+                                           target_names=self.class_names_for_report)
+            logger.info(f"\nRelatório de Classificação:\n{report}")
+            return report
+        except Exception as e:
+            logger.error(f"Erro durante a avaliação do modelo: {e}")
+            return None
+
 # Para executar o treinamento diretamente a partir deste arquivo
 if __name__ == "__main__":
     from logging_config import setup_logging
     setup_logging()
-    
+
+    parser = argparse.ArgumentParser(description="Treina o classificador de imagens.")
+    parser.add_argument('--tune', action='store_true', help="Busca hiperparâmetros antes de salvar o modelo")
+    args = parser.parse_args()
+
     trainer = ImageClassifierTrainer()
-    trainer.run_training_pipeline()
\ No newline at end of file
+    if args.tune:
+        trainer.run_tuning_pipeline()
+    else:
+        trainer.run_training_pipeline()
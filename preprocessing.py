@@ -0,0 +1,106 @@
+# preprocessing.py
+import io
+import os
+import numpy as np
+from PIL import Image
+from metrics import span
+
+# Versão da receita de pré-processamento. Incremente sempre que load_image_array mudar
+# de forma a alterar os valores gerados, para invalidar caches de features no disco.
+PREPROCESSING_VERSION = 2
+
+
+def _resize_to_array(img, image_size):
+    # A decodificação do PIL é preguiçosa: acontece no convert
+    with span('preprocessing.decode'):
+        img = img.convert('RGB')
+    with span('preprocessing.resize'):
+        if img.size != tuple(image_size):
+            img = img.resize(image_size)
+        return np.asarray(img, dtype=np.uint8).reshape(-1)
+
+
+def _array_to_pixels(array, image_size):
+    """Valida um array de imagem e o converte para pixels uint8 (HxW, HxWx3 ou HxWx4).
+
+    Arrays achatados só são aceitos com o tamanho final (largura x altura x 3). Floats
+    em [0, 1] são escalados para 0-255 e os demais são arredondados e limitados a
+    0-255; inteiros fora de 0-255 são rejeitados.
+    """
+    width, height = image_size
+    if array.ndim == 1:
+        if array.size != feature_length(image_size):
+            raise ValueError(f"Array achatado com {array.size} valores; esperado {feature_length(image_size)} "
+                             f"({width}x{height}x3). Passe arrays de outros tamanhos como HxW ou HxWxC.")
+        array = array.reshape(height, width, 3)
+    elif array.ndim == 3 and array.shape[2] == 1:
+        array = array[:, :, 0]
+    if not (array.ndim == 2 or array.ndim == 3 and array.shape[2] in (3, 4)):
+        raise ValueError(f"Formato de array não suportado: {array.shape}. Use HxW, HxWx3 ou HxWx4.")
+
+    if array.dtype == np.uint8:
+        return array
+    if array.dtype == np.bool_:
+        return array.astype(np.uint8) * 255
+    if np.issubdtype(array.dtype, np.integer):
+        if array.size and (array.min() < 0 or array.max() > 255):
+            raise ValueError(f"Valores inteiros fora do intervalo 0-255 (mín. {array.min()}, máx. {array.max()}).")
+        return array.astype(np.uint8)
+    if np.issubdtype(array.dtype, np.floating):
+        if not np.all(np.isfinite(array)):
+            raise ValueError("Array de imagem contém NaN ou infinito.")
+        if array.size and array.min() >= 0 and array.max() <= 1:
+            array = array * 255.0
+        return np.clip(np.rint(array), 0, 255).astype(np.uint8)
+    raise ValueError(f"Tipo de array não suportado: {array.dtype}.")
+
+
+def load_image_array(image_source, image_size):
+    """Converte uma imagem para RGB, redimensiona e retorna o vetor uint8 achatado.
+
+    `image_source` pode ser um caminho, bytes, um objeto de arquivo, uma PIL.Image
+    ou um array NumPy (HxW, HxWx3, HxWx4 ou já achatado no tamanho final; ver
+    _array_to_pixels). Arrays uint8 que já estão no tamanho final são devolvidos sem
+    cópia. JPEGs são decodificados em escala reduzida (draft) quando a imagem é muito
+    maior que `image_size`.
+    """
+    if isinstance(image_source, np.ndarray):
+        width, height = image_size
+        if image_source.dtype == np.uint8 and image_source.shape in ((height, width, 3), (width * height * 3,)):
+            return image_source.reshape(-1)
+        return _resize_to_array(Image.fromarray(_array_to_pixels(image_source, image_size)), image_size)
+
+    if isinstance(image_source, Image.Image):
+        return _resize_to_array(image_source, image_size)
+
+    if isinstance(image_source, (bytes, bytearray, memoryview)):
+        image_source = io.BytesIO(image_source)
+
+    with Image.open(image_source) as img:
+        if img.format == 'JPEG':
+            # O decodificador JPEG reduz a escala (1/2 a 1/8) mantendo pelo menos image_size
+            img.draft('RGB', tuple(image_size))
+        return _resize_to_array(img, image_size)
+
+
+def describe_image_source(image_source):
+    """Descrição curta da origem da imagem para mensagens de log."""
+    if isinstance(image_source, (str, os.PathLike)):
+        return str(image_source)
+    if isinstance(image_source, (bytes, bytearray, memoryview)):
+        return f"<{len(image_source)} bytes>"
+    if isinstance(image_source, np.ndarray):
+        return f"<array {image_source.shape} {image_source.dtype}>"
+    if isinstance(image_source, Image.Image):
+        return f"<PIL.Image {image_source.size} {image_source.mode}>"
+    return getattr(image_source, 'name', None) or f"<{type(image_source).__name__}>"
+
+
+def feature_length(image_size):
+    """Número de valores por imagem após o pré-processamento (largura x altura x 3 canais)."""
+    return image_size[0] * image_size[1] * 3
+
+
+def scale_pixels(X):
+    """Converte pixels uint8 para float32 no intervalo [0, 1]."""
+    return np.asarray(X, dtype=np.float32) / 255.0
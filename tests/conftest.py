@@ -0,0 +1,41 @@
+# tests/conftest.py
+import os
+import sys
+import numpy as np
+import pytest
+
+# Os módulos do projeto ficam na raiz do repositório
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import IMAGE_SIZE, RANDOM_STATE # noqa: E402
+from preprocessing import feature_length # noqa: E402
+
+
+def make_images(n, seed=RANDOM_STATE):
+    """Imagens sintéticas (n, 64*64*3) uint8 de duas classes: escuras (0) e claras (1), com ruído."""
+    rng = np.random.default_rng(seed)
+    y = np.arange(n) % 2
+    centers = np.where(y == 1, 160.0, 95.0)[:, None]
+    X = rng.normal(centers, 45.0, size=(n, feature_length(IMAGE_SIZE)))
+    return np.clip(np.rint(X), 0, 255).astype(np.uint8), y
+
+
+@pytest.fixture(scope='session')
+def dataset():
+    return make_images(80)
+
+
+@pytest.fixture(scope='session')
+def svc_model(dataset):
+    """SVC RBF binário com probabilidades, como o salvo por model_training.py com features 'raw'."""
+    from sklearn.svm import SVC
+    X, y = dataset
+    return SVC(probability=True, random_state=RANDOM_STATE).fit(X, y)
+
+
+@pytest.fixture(scope='session')
+def model_path(svc_model, tmp_path_factory):
+    import joblib
+    path = str(tmp_path_factory.mktemp('modelo') / 'modelo.joblib')
+    joblib.dump(svc_model, path)
+    return path
@@ -0,0 +1,82 @@
+# tests/test_batch_classify.py
+import csv
+import threading
+import numpy as np
+import pytest
+from PIL import Image
+from config import IMAGE_SIZE
+from model_inference import ImagePredictor
+from batch_classify import BatchClassifier, ResultWriter, OUTPUT_FIELDS
+from conftest import make_images
+
+
+@pytest.fixture
+def image_paths(tmp_path):
+    X, _ = make_images(6, seed=11)
+    paths = []
+    for i, row in enumerate(X):
+        path = str(tmp_path / f'imagem_{i}.png')
+        Image.fromarray(row.reshape(IMAGE_SIZE[1], IMAGE_SIZE[0], 3)).save(path)
+        paths.append(path)
+    return paths
+
+
+def read_csv(path):
+    with open(path, newline='', encoding='utf-8') as f:
+        return list(csv.reader(f))
+
+
+def test_classifies_all_paths_to_csv(model_path, image_paths, tmp_path):
+    output = str(tmp_path / 'saida.csv')
+    writer = ResultWriter(output, 'csv')
+    try:
+        total = BatchClassifier(ImagePredictor(model_path), batch_size=4, workers=2).run(iter(image_paths), writer)
+    finally:
+        writer.close()
+
+    rows = read_csv(output)
+    assert total == len(image_paths)
+    assert rows[0] == OUTPUT_FIELDS
+    assert sorted(row[0] for row in rows[1:]) == sorted(image_paths)
+
+
+def test_failing_path_iterator_is_raised_instead_of_hanging(model_path, image_paths, tmp_path):
+    def paths():
+        yield from image_paths[:3]
+        raise OSError("falha ao listar o diretório")
+
+    writer = ResultWriter(str(tmp_path / 'saida.jsonl'), 'jsonl')
+    errors = []
+
+    def run():
+        try:
+            BatchClassifier(ImagePredictor(model_path), batch_size=2, workers=2).run(paths(), writer)
+        except OSError as e:
+            errors.append(e)
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    thread.join(timeout=10)
+    writer.close()
+    assert not thread.is_alive()
+    assert len(errors) == 1 and "listar" in str(errors[0])
+
+
+def test_resume_from_empty_csv_writes_header(model_path, image_paths, tmp_path):
+    output = tmp_path / 'saida.csv'
+    output.touch() # Execução anterior interrompida antes do primeiro lote
+    writer = ResultWriter(str(output), 'csv', resume=True)
+    try:
+        BatchClassifier(ImagePredictor(model_path), workers=1).run(iter(image_paths), writer)
+    finally:
+        writer.close()
+
+    rows = read_csv(output)
+    assert rows[0] == OUTPUT_FIELDS
+    assert len(rows) == len(image_paths) + 1
+
+    # Retomar um arquivo já com cabeçalho não o repete
+    writer = ResultWriter(str(output), 'csv', resume=True)
+    writer.close()
+    assert writer.done == set(image_paths)
+    assert read_csv(output).count(OUTPUT_FIELDS) == 1
@@ -0,0 +1,63 @@
+# tests/test_dataset_split.py
+import os
+import numpy as np
+import pytest
+from PIL import Image
+from config import IMAGE_SIZE
+from dataset_index import DatasetIndex
+from feature_cache import FeatureCache
+from model_training import ImageClassifierTrainer
+from conftest import make_images
+
+
+@pytest.fixture
+def dataset_dir(tmp_path):
+    """Dataset com 20 imagens por classe, cada uma com uma cópia (grupos de 2 quase-duplicatas)."""
+    X, y = make_images(40, seed=11)
+    for i, (row, label) in enumerate(zip(X, y)):
+        class_dir = tmp_path / 'dataset' / ('gato', 'cachorro')[label]
+        class_dir.mkdir(parents=True, exist_ok=True)
+        image = Image.fromarray(row.reshape(IMAGE_SIZE[1], IMAGE_SIZE[0], 3))
+        image.save(class_dir / f"{i:03d}.png")
+        image.save(class_dir / f"{i:03d}_copia.png")
+    return str(tmp_path / 'dataset')
+
+
+class FailingLoaderTrainer(ImageClassifierTrainer):
+    """Simula imagens que passam pelo índice, mas falham ao carregar."""
+
+    failing = ('003.png', '010_copia.png')
+
+    def load_image_matrix(self, paths):
+        X, ok = super().load_image_matrix(paths)
+        for i, path in enumerate(paths):
+            if os.path.basename(path) in self.failing:
+                ok[i] = False
+        return X, ok
+
+
+@pytest.mark.parametrize('use_feature_cache', [False, True])
+def test_groups_survive_load_failures(dataset_dir, tmp_path, use_feature_cache):
+    trainer = FailingLoaderTrainer()
+    trainer.dataset_dir = dataset_dir
+    trainer.dataset_index = DatasetIndex(str(tmp_path / 'indice'))
+    trainer.deduplicate = False
+    trainer.feature_cache = FeatureCache(str(tmp_path / 'features'), IMAGE_SIZE) if use_feature_cache else None
+
+    X, y = trainer.load_and_preprocess_data()
+    assert len(X) == 78
+    assert len(trainer.groups) == len(X)
+
+    # As linhas de X são identificadas pelo conteúdo: cópias têm os mesmos pixels
+    X_train, X_test, _, _ = trainer.split_train_test(np.asarray(X), y)
+    train_rows = {row.tobytes() for row in X_train}
+    assert not any(row.tobytes() in train_rows for row in X_test)
+    assert len(X_train) + len(X_test) == len(X)
+
+
+def test_split_rejects_mismatched_groups():
+    trainer = ImageClassifierTrainer()
+    trainer.groups = ['a', 'b']
+    X, y = make_images(4)
+    with pytest.raises(ValueError):
+        trainer.split_train_test(X, y)
@@ -0,0 +1,112 @@
+# tests/test_feature_cache.py
+import os
+import numpy as np
+import pytest
+from feature_cache import FeatureCache
+from preprocessing import feature_length
+
+SIZE = (8, 6)
+N_FEATURES = feature_length(SIZE)
+
+
+class Loader:
+    """Loader falso: a linha de cada arquivo é o primeiro byte do conteúdo repetido."""
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, paths):
+        self.calls.append(list(paths))
+        X = np.empty((len(paths), N_FEATURES), dtype=np.uint8)
+        for i, path in enumerate(paths):
+            with open(path, 'rb') as f:
+                X[i] = f.read(1)[0]
+        return X, np.ones(len(paths), dtype=bool)
+
+
+def write_images(directory, values):
+    paths = []
+    for value in values:
+        path = str(directory / f'imagem_{value:03d}.bin')
+        with open(path, 'wb') as f:
+            f.write(bytes([value]))
+        paths.append(path)
+    return paths
+
+
+def expected(paths):
+    return np.array([[open(p, 'rb').read(1)[0]] * N_FEATURES for p in paths], dtype=np.uint8)
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return FeatureCache(str(tmp_path / 'cache'), SIZE, compact_fraction=0.25)
+
+
+def matrix_rows(cache):
+    return os.path.getsize(cache.matrix_path) // N_FEATURES
+
+
+def test_unchanged_dataset_is_memory_mapped_without_decoding(cache, tmp_path):
+    paths = write_images(tmp_path, range(10))
+    loader = Loader()
+    cache.load(paths, [0] * 10, loader)
+    X, y, ok = cache.load(paths, [0] * 10, loader)
+
+    assert len(loader.calls) == 1
+    assert isinstance(X, np.memmap) and ok.all()
+    np.testing.assert_array_equal(X, expected(paths))
+
+
+def test_new_images_are_appended_and_removed_ones_marked_dead(cache, tmp_path):
+    paths = write_images(tmp_path, range(0, 20, 2))
+    loader = Loader()
+    cache.load(paths, [0] * len(paths), loader)
+    before = open(cache.matrix_path, 'rb').read()
+
+    # Uma imagem nova no meio da ordem e uma removida: só a nova é decodificada e anexada
+    added = write_images(tmp_path, [5])
+    paths = sorted(paths[1:] + added)
+    X, _, ok = cache.load(paths, [0] * len(paths), loader)
+
+    assert loader.calls[-1] == added
+    assert matrix_rows(cache) == 11
+    assert open(cache.matrix_path, 'rb').read()[:len(before)] == before
+    assert ok.all()
+    np.testing.assert_array_equal(X, expected(paths))
+
+    # Sem mudanças, o mesmo resultado sem decodificar nada
+    X, _, _ = cache.load(paths, [0] * len(paths), loader)
+    assert len(loader.calls) == 2
+    np.testing.assert_array_equal(X, expected(paths))
+
+
+def test_compacts_when_dead_fraction_exceeds_threshold(cache, tmp_path):
+    paths = write_images(tmp_path, range(12))
+    loader = Loader()
+    cache.load(paths, [0] * 12, loader)
+
+    cache.load(paths[2:], [0] * 10, loader) # 2/12 mortas: abaixo do limite
+    assert matrix_rows(cache) == 12
+
+    paths = paths[5:] # 5/12 mortas: compacta na ordem de paths
+    X, _, _ = cache.load(paths, [0] * 7, loader)
+    assert matrix_rows(cache) == 7
+    assert len(loader.calls) == 1
+    np.testing.assert_array_equal(X, expected(paths))
+    X, _, _ = cache.load(paths, [0] * 7, loader)
+    assert isinstance(X, np.memmap)
+
+
+def test_rows_left_by_an_interrupted_append_are_overwritten(cache, tmp_path):
+    paths = write_images(tmp_path, range(4))
+    loader = Loader()
+    cache.load(paths, [0] * 4, loader)
+    with open(cache.matrix_path, 'ab') as f:
+        f.write(b'\xff' * N_FEATURES * 3) # Anexado, mas o índice não chegou a ser gravado
+
+    paths += write_images(tmp_path, [200])
+    X, _, _ = cache.load(paths, [0] * 5, loader)
+    assert matrix_rows(cache) == 5
+    assert isinstance(X, np.memmap)
+    np.testing.assert_array_equal(X, expected(paths))
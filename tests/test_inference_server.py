@@ -0,0 +1,157 @@
+# tests/test_inference_server.py
+import io
+import json
+import time
+import asyncio
+import numpy as np
+import pytest
+from PIL import Image
+from config import IMAGE_SIZE
+from model_inference import ImagePredictor, PredictionCache
+from inference_server import InferenceServer
+from conftest import make_images
+
+N_REQUESTS = 16
+
+
+def encode_png(row):
+    buffer = io.BytesIO()
+    Image.fromarray(row.reshape(IMAGE_SIZE[1], IMAGE_SIZE[0], 3)).save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+def multipart(content, boundary='limite-de-teste'):
+    body = (f"--{boundary}\r\n"
+            f'Content-Disposition: form-data; name="imagem"; filename="imagem.png"\r\n'
+            f"Content-Type: image/png\r\n\r\n").encode('latin-1') + content + f"\r\n--{boundary}--\r\n".encode('latin-1')
+    return body, f"multipart/form-data; boundary={boundary}"
+
+
+async def http_request(port, method, path, body=b'', content_type=None):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    head = f"{method} {path} HTTP/1.1\r\nHost: 127.0.0.1\r\nContent-Length: {len(body)}\r\nConnection: close\r\n"
+    if content_type:
+        head += f"Content-Type: {content_type}\r\n"
+    writer.write(head.encode('latin-1') + b'\r\n' + body)
+    await writer.drain()
+    response = await reader.read() # Connection: close, lê até o servidor fechar
+    writer.close()
+    status_line, _, payload = response.partition(b'\r\n\r\n')
+    return int(status_line.split()[1]), json.loads(payload)
+
+
+@pytest.fixture
+def predictor(model_path):
+    predictor = ImagePredictor(model_path)
+    predictor.result_cache = None # Todas as requisições passam pelo micro-batching
+    return predictor
+
+
+def run_with_server(predictor, scenario, **kwargs):
+    async def main():
+        server = InferenceServer(predictor, host='127.0.0.1', port=0, **kwargs)
+        await server.start()
+        try:
+            return await scenario(server)
+        finally:
+            await server.stop()
+    return asyncio.run(main())
+
+
+def test_concurrent_raw_and_multipart_requests_are_batched(predictor):
+    X, _ = make_images(N_REQUESTS, seed=7)
+    bodies = [encode_png(row) for row in X]
+    expected = predictor.predict_arrays(X)
+
+    async def scenario(server):
+        requests = []
+        for i, body in enumerate(bodies):
+            if i % 2:
+                body, content_type = multipart(body)
+                requests.append(http_request(server.port, 'POST', '/predict', body, content_type))
+            else:
+                requests.append(http_request(server.port, 'POST', '/predict', body, 'image/png'))
+        responses = await asyncio.gather(*requests)
+        metrics = await http_request(server.port, 'GET', '/metrics')
+        health = await http_request(server.port, 'GET', '/health')
+        return responses, metrics, health
+
+    responses, (metrics_status, metrics), (health_status, health) = run_with_server(
+        predictor, scenario, max_batch_size=8, max_wait_ms=200)
+
+    for (status, payload), (classe, confianca) in zip(responses, expected):
+        assert status == 200
+        assert payload['classe'] == classe
+        assert payload['confianca'] == pytest.approx(confianca)
+
+    assert metrics_status == 200
+    assert metrics['requisicoes'] == N_REQUESTS
+    assert metrics['erros'] == 0
+    assert metrics['fila'] == 0
+    # As requisições simultâneas chegam dentro da janela de 200 ms e são agrupadas
+    assert metrics['lotes'] < N_REQUESTS
+    assert metrics['tamanho_medio_lote'] > 1
+    assert metrics['lotes'] * metrics['tamanho_medio_lote'] == pytest.approx(N_REQUESTS)
+    latencia = metrics['latencia_ms']
+    assert 0 < latencia['p50'] <= latencia['p95'] <= latencia['p99']
+
+    assert health_status == 200
+    assert health == {'modelo_carregado': True}
+
+
+def test_invalid_requests(predictor):
+    async def scenario(server):
+        return await asyncio.gather(
+            http_request(server.port, 'POST', '/predict', b''),
+            http_request(server.port, 'POST', '/predict', b'isto nao e uma imagem'),
+            http_request(server.port, 'GET', '/predict'),
+            http_request(server.port, 'GET', '/inexistente'),
+        )
+
+    statuses = [status for status, _ in run_with_server(predictor, scenario)]
+    assert statuses == [400, 400, 405, 404]
+
+
+def test_health_without_model(predictor):
+    predictor.model = None
+
+    async def scenario(server):
+        return await asyncio.gather(
+            http_request(server.port, 'GET', '/health'),
+            http_request(server.port, 'POST', '/predict', encode_png(np.zeros(IMAGE_SIZE[0] * IMAGE_SIZE[1] * 3, np.uint8))),
+        )
+
+    (health_status, health), (predict_status, _) = run_with_server(predictor, scenario)
+    assert health_status == 200 and health == {'modelo_carregado': False}
+    assert predict_status == 503
+
+
+def test_cached_responses_and_blocked_disk_tier_do_not_stall_the_loop(predictor, tmp_path):
+    predictor.result_cache = PredictionCache(db_path=str(tmp_path / 'previsoes.sqlite3'))
+    X, _ = make_images(1, seed=9)
+    body = encode_png(X[0])
+    [(classe, confianca)] = predictor.predict_arrays(X)
+
+    async def scenario(server):
+        first = await http_request(server.port, 'POST', '/predict', body)
+        second = await http_request(server.port, 'POST', '/predict', body)
+
+        # Simula outro processo segurando o SQLite: a consulta ao disco espera em uma thread
+        # de decodificação, enquanto o loop continua atendendo /health e /metrics
+        predictor.result_cache._db_lock.acquire()
+        try:
+            blocked = asyncio.ensure_future(http_request(server.port, 'POST', '/predict', encode_png(255 - X[0])))
+            inicio = time.perf_counter()
+            health, metrics = await asyncio.gather(http_request(server.port, 'GET', '/health'),
+                                                   http_request(server.port, 'GET', '/metrics'))
+            elapsed = time.perf_counter() - inicio
+            assert not blocked.done()
+        finally:
+            predictor.result_cache._db_lock.release()
+        return first, second, health, metrics, elapsed, await blocked
+
+    first, second, health, (_, metrics), elapsed, blocked = run_with_server(predictor, scenario)
+    assert first == second == (200, {'classe': classe, 'confianca': pytest.approx(confianca)})
+    assert metrics['cache']['acertos_memoria'] == 1
+    assert health[0] == 200 and elapsed < 1.0
+    assert blocked[0] == 200
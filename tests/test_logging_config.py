@@ -0,0 +1,40 @@
+# tests/test_logging_config.py
+import io
+import logging
+import pytest
+from logging_config import PREDICTION_LOG, create_handlers
+
+
+@pytest.mark.parametrize('async_mode', [False, True])
+def test_sampling_keeps_the_same_lines_in_file_and_console(tmp_path, async_mode):
+    log_path = tmp_path / 'app.log'
+    console = io.StringIO()
+    handlers, listener = create_handlers(str(log_path), async_mode=async_mode, sample_rate=0.5, stream=console)
+    logger = logging.getLogger(f'teste_amostragem_{async_mode}')
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    for handler in handlers:
+        logger.addHandler(handler)
+    if listener is not None:
+        listener.start()
+
+    try:
+        for i in range(10):
+            logger.info(f"previsão {i}", extra=PREDICTION_LOG)
+        logger.info("linha comum")
+        logger.warning("aviso por previsão", extra=PREDICTION_LOG)
+    finally:
+        if listener is not None:
+            listener.stop()
+        for handler in handlers:
+            logger.removeHandler(handler)
+            handler.close()
+        if listener is not None:
+            for handler in listener.handlers:
+                handler.close()
+
+    file_lines = log_path.read_text(encoding='utf-8').splitlines()
+    console_lines = console.getvalue().splitlines()
+    assert file_lines == console_lines
+    assert [line.rsplit(' - ', 1)[1] for line in file_lines] == [
+        'previsão 0', 'previsão 2', 'previsão 4', 'previsão 6', 'previsão 8', 'linha comum', 'aviso por previsão']
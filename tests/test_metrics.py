@@ -0,0 +1,54 @@
+# tests/test_metrics.py
+import threading
+import pytest
+import metrics
+from metrics import MetricsRegistry, _Profiler, span
+
+
+@pytest.fixture
+def registry(tmp_path, monkeypatch):
+    registry = MetricsRegistry(str(tmp_path / 'metrics.jsonl'), flush_interval=3600)
+    monkeypatch.setattr(metrics, 'registry', registry)
+    monkeypatch.setattr(metrics, 'METRICS_ENABLED', True)
+    return registry
+
+
+def test_histogram_percentiles(registry):
+    for ms in range(1, 101):
+        registry.record('teste', float(ms))
+    resumo = registry.snapshot()['teste']
+    assert resumo['contagem'] == 100
+    assert resumo['p50_ms'] <= resumo['p95_ms'] <= resumo['p99_ms'] <= resumo['max_ms'] == 100
+
+
+@pytest.mark.parametrize('kind', ['cprofile', 'tracemalloc'])
+def test_profiled_spans_in_parallel_threads(registry, monkeypatch, kind):
+    """Só um span é perfilado por vez; os outros threads continuam sendo cronometrados, sem erro."""
+    profiler = _Profiler(kind, [])
+    monkeypatch.setattr(metrics, '_profiler', profiler)
+    inside = threading.Barrier(4)
+    errors = []
+
+    def work():
+        try:
+            with span('paralelo'):
+                inside.wait(timeout=5) # Os quatro spans ficam abertos ao mesmo tempo
+                bytearray(1 << 20)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert not errors
+    resumo = registry.snapshot()['paralelo']
+    assert resumo['contagem'] == 4
+    if kind == 'cprofile':
+        assert profiler._stats['paralelo'].total_calls > 0
+    else:
+        assert resumo['pico_memoria_kb'] >= 1024
+        profiler._tracemalloc.stop()
+    assert not profiler._busy.locked()
@@ -0,0 +1,50 @@
+# tests/test_numpy_kernel.py
+import numpy as np
+import pytest
+from sklearn.svm import SVC
+from config import RANDOM_STATE
+from model_inference import RBFKernelSVM
+from conftest import make_images
+
+
+@pytest.fixture(scope='module')
+def X_new():
+    return make_images(200, seed=5)[0]
+
+
+def test_sklearn_private_attributes_used_by_from_sklearn(dataset, svc_model):
+    """from_sklearn lê _gamma, _probA e _probB do SVC; se o scikit-learn mudá-los, este teste avisa."""
+    X, _ = dataset
+    assert svc_model._probA.shape == (1,) and svc_model._probB.shape == (1,)
+    assert np.isfinite(svc_model._probA[0]) and np.isfinite(svc_model._probB[0])
+    # gamma='scale' é resolvido no ajuste para 1 / (n_features * X.var())
+    assert float(svc_model._gamma) == pytest.approx(1.0 / (X.shape[1] * X.astype(np.float64).var()))
+
+    numeric = SVC(gamma=1e-5, probability=True, random_state=RANDOM_STATE).fit(*dataset)
+    assert float(numeric._gamma) == 1e-5
+    assert RBFKernelSVM.from_sklearn(numeric).gamma == 1e-5
+
+
+def test_float64_matches_sklearn(svc_model, X_new):
+    evaluator = RBFKernelSVM.from_sklearn(svc_model, dtype=np.float64)
+    np.testing.assert_allclose(evaluator.decision_function(X_new), svc_model.decision_function(X_new),
+                               rtol=0, atol=1e-10)
+    np.testing.assert_allclose(evaluator.predict_proba(X_new), svc_model.predict_proba(X_new), rtol=0, atol=1e-10)
+    np.testing.assert_array_equal(evaluator.predict(X_new), svc_model.predict(X_new))
+
+
+def test_float32_within_tolerance(svc_model, X_new):
+    evaluator = RBFKernelSVM.from_sklearn(svc_model, dtype=np.float32)
+    assert evaluator.support_vectors.dtype == np.float32
+    decision = svc_model.decision_function(X_new)
+    np.testing.assert_allclose(evaluator.decision_function(X_new), decision, rtol=0, atol=2e-3)
+    np.testing.assert_allclose(evaluator.predict_proba(X_new), svc_model.predict_proba(X_new), rtol=0, atol=2e-4)
+    # A classe só pode mudar onde o valor de decisão está praticamente sobre a fronteira
+    confident = np.abs(decision) > 1e-2
+    np.testing.assert_array_equal(evaluator.predict(X_new)[confident], svc_model.predict(X_new)[confident])
+
+
+def test_subset_with_all_vectors_is_identical(svc_model, X_new):
+    evaluator = RBFKernelSVM.from_sklearn(svc_model)
+    subset = evaluator.subset(np.arange(len(evaluator.support_vectors)))
+    np.testing.assert_array_equal(subset.decision_function(X_new), evaluator.decision_function(X_new))
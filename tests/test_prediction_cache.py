@@ -0,0 +1,39 @@
+# tests/test_prediction_cache.py
+import logging
+import numpy as np
+from model_inference import ImagePredictor, PredictionCache
+from conftest import make_images
+
+
+def test_hit_and_miss_return_the_same_types(model_path):
+    predictor = ImagePredictor(model_path, result_cache=PredictionCache())
+    image = make_images(1, seed=13)[0][0]
+    miss = predictor.predict_image(image)
+    hit = predictor.predict_image(image.copy())
+    assert miss == hit
+    assert type(miss[1]) is float and type(hit[1]) is float
+    assert predictor.result_cache.stats()['acertos_memoria'] == 1
+
+
+def test_errors_are_logged_with_the_original_path(model_path, tmp_path, caplog):
+    predictor = ImagePredictor(model_path, result_cache=PredictionCache())
+    path = tmp_path / 'nao_e_imagem.jpg'
+    path.write_bytes(b'conteudo invalido')
+    with caplog.at_level(logging.ERROR, logger='model_inference'):
+        assert predictor.predict_image(str(path)) == ("Erro: Falha ao processar imagem", 0.0)
+    assert str(path) in caplog.text
+    assert 'bytes>' not in caplog.text
+
+
+def test_disk_tier_survives_a_new_cache(tmp_path):
+    db_path = str(tmp_path / 'previsoes.sqlite3')
+    cache = PredictionCache(db_path=db_path)
+    cache.put('chave', ('Gato', 0.9))
+    cache.close()
+
+    reopened = PredictionCache(db_path=db_path)
+    assert reopened.get('chave') == ('Gato', 0.9)
+    assert reopened.get('outra') is None
+    assert reopened.stats()['acertos_disco'] == 1
+    reopened.close()
+    assert np.isclose(reopened.stats()['taxa_acerto'], 0.5)
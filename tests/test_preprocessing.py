@@ -0,0 +1,39 @@
+# tests/test_preprocessing.py
+import numpy as np
+import pytest
+from preprocessing import load_image_array, feature_length
+
+SIZE = (8, 6) # largura x altura
+
+
+def test_uint8_in_final_size_is_returned_without_copy():
+    image = np.arange(6 * 8 * 3, dtype=np.uint8).reshape(6, 8, 3)
+    assert np.shares_memory(load_image_array(image, SIZE), image)
+    assert np.shares_memory(load_image_array(image.reshape(-1), SIZE), image)
+
+
+def test_float_arrays_are_scaled_or_clipped():
+    unit = np.full((6, 8, 3), 0.5)
+    np.testing.assert_array_equal(load_image_array(unit, SIZE), 128)
+    pixels = np.full((6, 8, 3), 300.0)
+    pixels[0, 0] = -20.0
+    result = load_image_array(pixels, SIZE).reshape(6, 8, 3)
+    assert result[0, 0, 0] == 0 and result[1, 1, 1] == 255
+
+
+def test_other_shapes_are_converted_to_rgb():
+    assert load_image_array(np.zeros((12, 16), dtype=np.uint8), SIZE).shape == (feature_length(SIZE),)
+    assert load_image_array(np.zeros((6, 8, 1), dtype=np.int64), SIZE).shape == (feature_length(SIZE),)
+    assert load_image_array(np.zeros((12, 16, 4), dtype=np.uint8), SIZE).shape == (feature_length(SIZE),)
+
+
+@pytest.mark.parametrize('array', [
+    np.zeros(100, dtype=np.uint8), # achatado em outro tamanho
+    np.zeros((6, 8, 2), dtype=np.uint8),
+    np.zeros((2, 6, 8, 3), dtype=np.uint8),
+    np.full((6, 8, 3), 1000, dtype=np.int32),
+    np.full((6, 8, 3), np.nan),
+])
+def test_invalid_arrays_raise_value_error(array):
+    with pytest.raises(ValueError):
+        load_image_array(array, SIZE)
@@ -0,0 +1,90 @@
+# tests/test_shared_model.py
+import numpy as np
+import pytest
+from sklearn.decomposition import PCA
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import StandardScaler
+from sklearn.svm import SVC
+from config import RANDOM_STATE
+from model_inference import (ImagePredictor, SharedSVCModel, export_shared_model, is_shared_model_file,
+                             _libsvm_binary_probability, SHARED_MODEL_STORAGE_DTYPES)
+from conftest import make_images
+
+
+@pytest.fixture(scope='module')
+def X_new():
+    return make_images(200, seed=3)[0]
+
+
+@pytest.mark.parametrize('storage_dtype', SHARED_MODEL_STORAGE_DTYPES)
+def test_svm_file_matches_sklearn(svc_model, X_new, tmp_path, storage_dtype):
+    path = str(tmp_path / 'modelo.svm')
+    export_shared_model(svc_model, path, storage_dtype=storage_dtype)
+    assert is_shared_model_file(path)
+
+    shared = SharedSVCModel.load(path, dtype=np.float64)
+    # Pixels inteiros de 0 a 255 são representados sem perda nos três tipos de armazenamento
+    np.testing.assert_allclose(shared.decision_function(X_new), svc_model.decision_function(X_new), rtol=0, atol=1e-10)
+    np.testing.assert_allclose(shared.predict_proba(X_new), svc_model.predict_proba(X_new), rtol=0, atol=1e-10)
+    np.testing.assert_array_equal(shared.predict(X_new), svc_model.predict(X_new))
+
+
+@pytest.mark.parametrize('storage_dtype', ['float64', 'float32'])
+def test_predictor_keeps_stored_float_dtype_memory_mapped(svc_model, X_new, tmp_path, storage_dtype):
+    path = str(tmp_path / 'modelo.svm')
+    export_shared_model(svc_model, path, storage_dtype=storage_dtype)
+    model = ImagePredictor(path, numpy_kernel_dtype=None).model
+
+    # Os vetores de suporte continuam no arquivo, compartilháveis entre processos
+    assert model.dtype == np.dtype(storage_dtype)
+    assert isinstance(model.support_vectors, np.memmap) and not model.support_vectors.flags.owndata
+    # Mesma tolerância do kernel NumPy em float32 (tests/test_numpy_kernel.py)
+    np.testing.assert_allclose(model.predict_proba(X_new), svc_model.predict_proba(X_new), rtol=0, atol=2e-4)
+
+
+def test_svm_file_with_preprocessing_pipeline(dataset, X_new, tmp_path):
+    X, y = dataset
+    model = Pipeline([('scaler', StandardScaler()), ('pca', PCA(n_components=10, random_state=RANDOM_STATE)),
+                      ('clf', SVC(probability=True, random_state=RANDOM_STATE))]).fit(X, y)
+    path = str(tmp_path / 'modelo.svm')
+    export_shared_model(model, path)
+
+    shared = SharedSVCModel.load(path)
+    np.testing.assert_allclose(shared.decision_function(X_new), model.decision_function(X_new), rtol=0, atol=1e-10)
+    np.testing.assert_allclose(shared.predict_proba(X_new), model.predict_proba(X_new), rtol=0, atol=1e-10)
+
+
+def test_binary_probability_coupling_matches_libsvm(svc_model, X_new):
+    """_libsvm_binary_probability reproduz o acoplamento iterativo do libsvm, não o sigmoide puro."""
+    decision = svc_model.decision_function(X_new)
+    f_ab = -decision * svc_model._probA[0] + svc_model._probB[0]
+    sigmoid = 1.0 / (1.0 + np.exp(f_ab))
+    expected = svc_model.predict_proba(X_new)
+    assert expected[:, 1].min() < 0.1 and expected[:, 1].max() > 0.9 # Cobre as duas classes e a região incerta
+
+    proba = _libsvm_binary_probability(np.clip(sigmoid, 1e-7, 1 - 1e-7))
+    np.testing.assert_allclose(proba, expected, rtol=0, atol=1e-10)
+    np.testing.assert_allclose(proba.sum(axis=1), 1.0)
+    # O sigmoide sozinho difere do predict_proba do scikit-learn: o acoplamento é necessário
+    assert np.abs(sigmoid - expected[:, 1]).max() > 1e-6
+
+
+def test_predictor_loads_svm_file(svc_model, model_path, X_new, tmp_path):
+    path = str(tmp_path / 'modelo.svm')
+    export_shared_model(svc_model, path)
+    joblib_predictor = ImagePredictor(model_path)
+    shared_predictor = ImagePredictor(path)
+    assert isinstance(shared_predictor.model, SharedSVCModel)
+
+    for (classe, confianca), (classe_svm, confianca_svm) in zip(joblib_predictor.predict_arrays(X_new),
+                                                                shared_predictor.predict_arrays(X_new)):
+        assert classe == classe_svm
+        assert confianca == pytest.approx(confianca_svm, abs=1e-10)
+
+
+def test_rejects_unsupported_models(dataset, tmp_path):
+    X, y = dataset
+    with pytest.raises(ValueError):
+        export_shared_model(SVC(kernel='linear', probability=True).fit(X, y), str(tmp_path / 'linear.svm'))
+    with pytest.raises(ValueError):
+        export_shared_model(SVC().fit(X, y), str(tmp_path / 'sem_probabilidade.svm'))
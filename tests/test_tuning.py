@@ -0,0 +1,18 @@
+# tests/test_tuning.py
+import numpy as np
+import model_training
+from model_training import ImageClassifierTrainer
+
+
+def test_pca_candidates_are_evaluated_in_every_halving_round(dataset, tmp_path, monkeypatch):
+    monkeypatch.setattr(model_training, 'TUNING_CACHE_DIR', str(tmp_path))
+    monkeypatch.setattr(model_training, 'TUNING_N_JOBS', 1)
+    X, y = dataset
+    X, y = X[:48], y[:48] # Primeira rodada com menos amostras que PCA_COMPONENTS
+
+    model, leaderboard = ImageClassifierTrainer().tune_hyperparameters(X, y)
+
+    assert model is not None
+    assert len(leaderboard) == 48
+    assert not any(np.isnan(row['acuracia_media']) for row in leaderboard)
+    assert sum('pca' in row['configuracao'] for row in leaderboard) == 24